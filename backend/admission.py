@@ -0,0 +1,183 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import HTTPException
+
+from upstream import SUPABASE_URL, coalesced_get
+from catalog import CATALOG_SCOPE
+
+
+# Per-item admission for POST /reservations. When a popular offer goes up, hundreds of customers
+# try to reserve the same item at once; without this every one of them reaches reserve_item and
+# all but a few are turned away by the database. Here each item keeps the spots it has left (read
+# from Supabase, then kept up to date from reservation outcomes) and the spots currently held by
+# requests that are at the database:
+#   - known sold out (or closed) -> rejected here, no upstream call
+#   - spots left minus held >= quantity -> admitted (the spots are held until the RPC answers)
+#   - otherwise -> queued until a held request finishes (one that fails gives its spots back)
+# so the requests reaching Supabase are bounded by the spots left, not by demand. reserve_item
+# stays the source of truth: a stale count only costs one rejected RPC, which corrects it.
+AVAILABILITY_TTL = float(os.getenv("AVAILABILITY_TTL", "5")) # Seconds a count is trusted before re-reading
+ADMISSION_WAIT = float(os.getenv("ADMISSION_WAIT", "5")) # Seconds a request may queue for an item
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "1000")) # Waiters per item before shedding
+AVAILABILITY_MAX_ITEMS = int(os.getenv("AVAILABILITY_MAX_ITEMS", "10000"))
+
+
+def sold_out(spots: int, quantity: int) -> HTTPException:
+    if spots <= 0:
+        return HTTPException(status_code=409, detail="Oferta agotada!")
+    return HTTPException(status_code=409, detail=f"Only {spots} spot(s) available, but {quantity} requested.")
+
+
+class ItemSlot:
+    def __init__(self):
+        self.spots: Optional[int] = None # spots left in the database (not counting held), None = unknown
+        self.active = True
+        self.known_at = 0.0
+        self.held = 0 # spots taken by admitted requests still waiting for reserve_item
+        self.waiters = 0
+        self.loading = False # one request reads the count, the others wait for it
+        self.changed = asyncio.Event() # replaced on every change; waiters hold the one they saw
+
+    def fresh(self) -> bool:
+        return self.spots is not None and time.monotonic() - self.known_at < AVAILABILITY_TTL
+
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def learn(self, spots: int, active: bool = True):
+        self.spots = max(spots, 0)
+        self.active = active
+        self.known_at = time.monotonic()
+
+
+class AvailabilityTracker:
+    def __init__(self):
+        self._items: dict[str, ItemSlot] = {}
+        self.admitted = 0
+        self.rejected_fast = 0 # answered without calling Supabase
+        self.queued = 0
+        self.shed = 0
+        self.loads = 0
+
+    def _slot(self, item_id: str) -> ItemSlot:
+        slot = self._items.get(item_id)
+        if slot is None:
+            if len(self._items) >= AVAILABILITY_MAX_ITEMS:
+                self._prune()
+            slot = self._items[item_id] = ItemSlot()
+        return slot
+
+    def _prune(self):
+        for item_id, slot in list(self._items.items()):
+            if not slot.held and not slot.waiters and not slot.loading and not slot.fresh():
+                del self._items[item_id]
+
+    async def _load(self, slot: ItemSlot, item_id: str, headers: dict):
+        slot.loading = True
+        try:
+            res = await coalesced_get(
+                f"{SUPABASE_URL}/rest/v1/items",
+                headers=headers,
+                params={"id": f"eq.{item_id}", "select": "status,available_spots"},
+                scope=CATALOG_SCOPE, # item rows are the same for every customer
+            )
+            res.raise_for_status()
+            rows = res.json()
+            self.loads += 1
+            if not rows:
+                raise HTTPException(status_code=404, detail="Item not found")
+            slot.learn(rows[0]["available_spots"], rows[0]["status"] == "active")
+        finally:
+            slot.loading = False
+            slot.notify()
+
+    # Hold quantity spots of item_id for the duration of the block (the reserve_item call).
+    # The block reports the outcome through the yielded Admission.
+    @asynccontextmanager
+    async def admit(self, item_id: str, quantity: int, headers: dict):
+        slot = self._slot(item_id)
+        deadline = time.monotonic() + ADMISSION_WAIT
+        queued = False
+        while True:
+            if not slot.fresh() and not slot.loading:
+                await self._load(slot, item_id, headers)
+                continue
+            if slot.fresh():
+                if not slot.active:
+                    self.rejected_fast += 1
+                    raise HTTPException(status_code=410, detail="La oferta ya no esta disponible!")
+                if slot.spots < quantity: # not enough even if every held request fails
+                    self.rejected_fast += 1
+                    raise sold_out(slot.spots, quantity)
+                if slot.spots - slot.held >= quantity:
+                    break
+            # Count is loading, or the spots we need are held by requests in flight: wait for them
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (not queued and slot.waiters >= ADMISSION_MAX_QUEUE):
+                self.shed += 1
+                raise HTTPException(status_code=503, detail="Demasiadas reservas para esta oferta, reintente", headers={"Retry-After": "1"})
+            if not queued:
+                queued = True
+                self.queued += 1
+            slot.waiters += 1
+            try:
+                await asyncio.wait_for(slot.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                slot.waiters -= 1
+
+        slot.held += quantity
+        self.admitted += 1
+        admission = Admission(slot, quantity)
+        try:
+            yield admission
+        finally:
+            slot.held -= quantity
+            if admission.outcome is None: # unknown (timeout, upstream error): re-read before trusting the count
+                slot.spots = None
+            slot.notify()
+
+    # Something other than a reservation changed the item (cancellation, edit, close): re-read it
+    def forget(self, item_id: str):
+        slot = self._items.get(str(item_id))
+        if slot is not None:
+            slot.spots = None
+            slot.notify()
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self._items),
+            "held": sum(slot.held for slot in self._items.values()),
+            "waiting": sum(slot.waiters for slot in self._items.values()),
+            "admitted": self.admitted,
+            "rejected_fast": self.rejected_fast,
+            "queued": self.queued,
+            "shed": self.shed,
+            "loads": self.loads,
+        }
+
+
+class Admission:
+    def __init__(self, slot: ItemSlot, quantity: int):
+        self.slot = slot
+        self.quantity = quantity
+        self.outcome: Optional[str] = None
+
+    def reserved(self):
+        self.outcome = "reserved"
+        if self.slot.spots is not None:
+            self.slot.spots = max(self.slot.spots - self.quantity, 0)
+
+    # reserve_item said how many spots are left (PT409) or that the item is gone (PT404/PT410)
+    def rejected(self, spots: Optional[int] = None, active: bool = True):
+        self.outcome = "rejected"
+        if spots is not None or not active:
+            self.slot.learn(spots or 0, active)
+
+
+availability = AvailabilityTracker()
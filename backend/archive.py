@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Optional
+
+from catalog import invalidate_catalog
+from resilience import remaining_budget
+from upstream import SUPABASE_URL, SUPABASE_KEY, get_client
+
+
+logger = logging.getLogger(__name__)
+
+# Finished items and reservations are moved to *_archive tables by archive_chunk()
+# (migrations/003_archive.sql), one bounded chunk per RPC call. The checkpoint lives in the
+# database, so a run that is cut short (deploy, timeout, request budget) resumes where it stopped.
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600")) # Seconds between scheduled runs, 0 disables the schedule
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500")) # Rows per chunk (one transaction each)
+ARCHIVE_GRACE = os.getenv("ARCHIVE_GRACE", "2 hours") # Postgres interval: how long after pickup a row stays live
+ARCHIVE_MAX_CHUNKS = int(os.getenv("ARCHIVE_MAX_CHUNKS", "200")) # Per run; the next run picks up the rest
+ARCHIVE_CHUNK_PAUSE = float(os.getenv("ARCHIVE_CHUNK_PAUSE", "0.2")) # Seconds between chunks so live traffic gets the locks
+ARCHIVE_MIN_BUDGET = 2.0 # Seconds of request budget a chunk needs before we start it
+
+
+class Archiver:
+    def __init__(self):
+        self._lock = asyncio.Lock() # one run per process; archive_chunk() takes an advisory lock across instances
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failed_runs = 0
+        self.items_moved = 0
+        self.reservations_moved = 0
+        self.last_run: Optional[dict] = None
+
+    async def _chunk(self) -> dict:
+        headers = {
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Content-Type": "application/json"
+        }
+        client = get_client()
+        res = await client.post(
+            f"{SUPABASE_URL}/rest/v1/rpc/archive_chunk",
+            headers=headers,
+            json={"batch_size": ARCHIVE_BATCH_SIZE, "grace": ARCHIVE_GRACE}
+        )
+        res.raise_for_status()
+        return res.json()
+
+    # Move chunks until both phases have caught up, another instance holds the lock,
+    # or we run out of chunks/request budget. Returns a report with per-chunk timings.
+    async def run_once(self) -> dict:
+        if self._lock.locked():
+            return {"status": "running", "chunks": []}
+
+        async with self._lock:
+            started = time.monotonic()
+            report = {"status": "partial", "items": 0, "reservations": 0, "chunks": []}
+            items_before = self.items_moved
+            try:
+                for _ in range(ARCHIVE_MAX_CHUNKS):
+                    budget = remaining_budget()
+                    if budget is not None and budget < ARCHIVE_MIN_BUDGET:
+                        break # out of time; the checkpoint keeps our place
+
+                    chunk_started = time.monotonic()
+                    result = await self._chunk()
+                    elapsed_ms = round((time.monotonic() - chunk_started) * 1000, 1)
+
+                    phase = result.get("phase")
+                    if phase in ("idle", "locked"):
+                        report["status"] = phase
+                        break
+
+                    items, reservations = result.get("items", 0), result.get("reservations", 0)
+                    report["items"] += items
+                    report["reservations"] += reservations
+                    self.items_moved += items
+                    self.reservations_moved += reservations
+                    report["chunks"].append({"phase": phase, "items": items, "reservations": reservations, "ms": elapsed_ms})
+                    logger.info("Archived chunk: phase=%s items=%d reservations=%d in %.1f ms", phase, items, reservations, elapsed_ms)
+
+                    await asyncio.sleep(ARCHIVE_CHUNK_PAUSE)
+            except Exception:
+                self.failed_runs += 1
+                report["status"] = "failed"
+                raise
+            finally:
+                if self.items_moved != items_before:
+                    invalidate_catalog() # archived items must drop out of /items right away
+                self.runs += 1
+                report["ms"] = round((time.monotonic() - started) * 1000, 1)
+                self.last_run = {key: value for key, value in report.items() if key != "chunks"}
+                self.last_run["chunks"] = len(report["chunks"])
+
+            return report
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(ARCHIVE_INTERVAL * random.uniform(0.9, 1.1)) # jitter so instances don't all fire at once
+            try:
+                report = await self.run_once()
+                logger.info("Archive run %s: %d items, %d reservations in %.1f ms", report["status"], report.get("items", 0), report.get("reservations", 0), report.get("ms", 0.0))
+            except Exception as e:
+                logger.warning("Archive run failed: %s", e)
+
+    # Called from the FastAPI lifespan handler
+    async def start(self):
+        if self._task is None and ARCHIVE_INTERVAL > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._lock.locked(),
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "items_moved": self.items_moved,
+            "reservations_moved": self.reservations_moved,
+            "last_run": self.last_run,
+        }
+
+
+archiver = Archiver()
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import NamedTuple, Optional
+import httpx
+import jwt  # pyjwt to verify JWTs
+from fastapi import Header, HTTPException, Query
+
+from cache import TTLCache
+from upstream import SUPABASE_URL, SUPABASE_KEY, get_client
+
+
+logger = logging.getLogger(__name__)
+
+# Supabase signs user JWTs with the project JWT secret (HS256, legacy) or asymmetric keys published as JWKS.
+# Set SUPABASE_JWT_SECRET for HS256 projects; otherwise keys are read from the JWKS endpoint.
+JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_URL = os.getenv("SUPABASE_JWKS_URL", f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json")
+JWKS_REFRESH_SECONDS = float(os.getenv("SUPABASE_JWKS_REFRESH_SECONDS", "600")) # Background refresh period
+JWKS_MIN_REFETCH_SECONDS = 30.0 # Unknown kid triggers a refetch at most this often
+CLAIMS_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CLAIMS_CACHE_MAX_ENTRIES", "50000"))
+CLAIMS_CACHE_MAX_TTL = float(os.getenv("JWT_CLAIMS_CACHE_MAX_TTL", "3600")) # Never keep claims longer than this
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256", "EdDSA"]
+
+
+# Verified caller, handed to every handler by the current_user dependency
+class AuthUser(NamedTuple):
+    token: str # raw JWT, forwarded to Supabase so row-level security still applies
+    user_id: str # 'sub' claim
+    role: Optional[str] # 'role' claim ("authenticated", "service_role", ...)
+    exp: int
+    claims: dict
+
+
+# Verified claims keyed by token hash until the token expires
+claims_cache = TTLCache("jwt_claims", max_entries=CLAIMS_CACHE_MAX_ENTRIES, ttl=CLAIMS_CACHE_MAX_TTL)
+
+_jwks: dict[str, jwt.PyJWK] = {} # kid -> key
+_jwks_fetched_at = 0.0
+_jwks_lock = asyncio.Lock()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def refresh_jwks(force: bool = False):
+    global _jwks, _jwks_fetched_at
+    async with _jwks_lock:
+        if not force and time.monotonic() - _jwks_fetched_at < JWKS_MIN_REFETCH_SECONDS:
+            return # someone else just refreshed
+        res = await get_client().get(JWKS_URL, headers={"apikey": SUPABASE_KEY})
+        res.raise_for_status()
+        keys = {}
+        for key in jwt.PyJWKSet.from_dict(res.json()).keys:
+            if key.key_id:
+                keys[key.key_id] = key
+        _jwks = keys
+        _jwks_fetched_at = time.monotonic()
+
+
+async def _refresh_jwks_forever():
+    while True:
+        try:
+            await refresh_jwks(force=True)
+        except Exception as e:
+            logger.warning("JWKS refresh failed: %s", e) # keep serving with the keys we already have
+        await asyncio.sleep(JWKS_REFRESH_SECONDS)
+
+
+# Called from the FastAPI lifespan handler; only needed when tokens are verified with JWKS
+async def start_auth():
+    global _refresh_task
+    if JWT_SECRET is None and _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_jwks_forever())
+
+
+async def stop_auth():
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
+
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+async def _signing_key(token: str):
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+    if alg == "HS256":
+        if JWT_SECRET is None:
+            raise jwt.InvalidTokenError("HS256 token but SUPABASE_JWT_SECRET is not set")
+        return JWT_SECRET, ["HS256"]
+    if alg not in ASYMMETRIC_ALGORITHMS:
+        raise jwt.InvalidAlgorithmError(f"Unsupported alg {alg}")
+    kid = header.get("kid")
+    key = _jwks.get(kid)
+    if key is None:
+        await refresh_jwks() # key rotation: fetch the new key set once
+        key = _jwks.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+    return key.key, [alg]
+
+
+# Verify a Supabase JWT locally; verified claims are cached so repeat calls cost one hash + dict lookup
+async def verify_token(token: str) -> AuthUser:
+    key = _token_key(token)
+    user = claims_cache.get(key)
+    if user is not None:
+        if user.exp > time.time():
+            return user
+        claims_cache.pop(key)
+        raise HTTPException(status_code=401, detail="Token expirado")
+
+    try:
+        signing_key, algorithms = await _signing_key(token)
+        claims = jwt.decode(
+            token,
+            signing_key,
+            algorithms=algorithms,
+            audience=JWT_AUDIENCE,
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expirado")
+    except (jwt.InvalidTokenError, httpx.HTTPError) as e: # bad token, or JWKS unreachable for an unknown kid
+        raise HTTPException(status_code=401, detail=f"Token invalido: {e}")
+
+    user = AuthUser(token=token, user_id=claims["sub"], role=claims.get("role"), exp=int(claims["exp"]), claims=claims)
+    claims_cache.set(key, user, ttl=min(user.exp - time.time(), CLAIMS_CACHE_MAX_TTL))
+    return user
+
+
+# FastAPI dependency: every handler gets the verified caller instead of parsing the header itself
+async def current_user(authorization: str = Header(...)) -> AuthUser:
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        raise HTTPException(status_code=401, detail="Invalid token format")
+    return await verify_token(token.strip())
+
+
+# Same as current_user, but also accepts ?access_token= (EventSource and browser WebSockets can't set headers)
+async def stream_user(
+    authorization: Optional[str] = Header(None),
+    access_token: Optional[str] = Query(None),
+) -> AuthUser:
+    if authorization:
+        return await current_user(authorization)
+    if not access_token:
+        raise HTTPException(status_code=401, detail="Invalid token format")
+    return await verify_token(access_token)
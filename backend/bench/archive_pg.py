@@ -0,0 +1,189 @@
+"""Real-Postgres check of the migrations and archive_chunk() (the load test only runs fake_supabase's Python copy).
+
+    python bench/archive_pg.py --dsn postgresql://postgres@127.0.0.1:5432/postgres
+    DATABASE_URL=postgresql://... python bench/archive_pg.py --keep   # leave the scratch database for inspection
+
+Creates a scratch database, a minimal stand-in for the Supabase base schema (auth.uid(), the API roles,
+profiles/items/reservations as they were before migrations/), applies every migrations/*.sql in order,
+seeds finished and live offers and runs archive_chunk() until it is idle. Exits 1 if a migration or
+an archive call fails, or if the archived rows differ from the live rows they came from.
+"""
+import argparse
+import glob
+import os
+import sys
+from urllib.parse import urlsplit, urlunsplit
+
+import psycopg2
+import psycopg2.extras
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(os.path.dirname(BENCH_DIR), "migrations")
+
+# What the project had before migrations/001 (Supabase creates auth and the roles itself)
+BASE_SCHEMA = """
+do $$ begin
+    create role anon nologin;
+exception when duplicate_object then null;
+end $$;
+do $$ begin
+    create role authenticated nologin;
+exception when duplicate_object then null;
+end $$;
+do $$ begin
+    create role service_role nologin bypassrls;
+exception when duplicate_object then null;
+end $$;
+create schema if not exists auth;
+create or replace function auth.uid() returns uuid language sql stable as $$
+    select nullif(current_setting('request.jwt.claim.sub', true), '')::uuid
+$$;
+
+create table public.profiles (
+    user_id uuid primary key,
+    role text not null,
+    name text,
+    profile_picture text
+);
+create table public.items (
+    id uuid primary key default gen_random_uuid(),
+    restaurant_id uuid not null references public.profiles (user_id),
+    information text,
+    location text,
+    price numeric,
+    pickup_time timestamptz not null,
+    total_spots integer not null,
+    num_of_reservations integer default 0,
+    image_url text,
+    status text default 'active',
+    created_at timestamptz not null default now()
+);
+create table public.reservations (
+    id uuid primary key default gen_random_uuid(),
+    customer_id uuid not null references public.profiles (user_id),
+    item_id uuid not null references public.items (id),
+    "timestamp" timestamptz not null default now(),
+    status text default 'active',
+    quantity integer not null default 1
+);
+"""
+
+SEED = """
+insert into profiles (user_id, role, name, latitude, longitude) values
+    ('00000000-0000-4000-8000-000000000001', 'restaurant', 'Restaurante', -12.0464, -77.0428),
+    ('00000000-0000-4000-8000-000000000002', 'customer', 'Cliente', null, null);
+
+-- 5 offers that ended yesterday, 1 still upcoming
+insert into items (restaurant_id, information, pickup_time, total_spots, num_of_reservations, latitude, longitude, image_variants)
+select '00000000-0000-4000-8000-000000000001', 'Oferta ' || n, now() - interval '1 day' - n * interval '1 minute', 5, 2,
+       -12.0464, -77.0428, jsonb_build_object('card', jsonb_build_object('width', 480))
+  from generate_series(1, 5) n;
+insert into items (restaurant_id, information, pickup_time, total_spots, num_of_reservations)
+values ('00000000-0000-4000-8000-000000000001', 'Oferta viva', now() + interval '1 day', 5, 1);
+
+-- Each ended offer: one reservation picked up, one no-show (still active)
+insert into reservations (customer_id, item_id, "timestamp", status)
+select '00000000-0000-4000-8000-000000000002', i.id, now() - interval '2 days', s
+  from items i, unnest(array['completed', 'active']) s
+ where i.pickup_time < now();
+-- The live offer: an old cancelled reservation (archived alone) and an active one (kept)
+insert into reservations (customer_id, item_id, "timestamp", status)
+select '00000000-0000-4000-8000-000000000002', i.id, t, s
+  from items i, (values (now() - interval '2 days', 'cancelled'), (now(), 'active')) v (t, s)
+ where i.pickup_time > now();
+"""
+
+
+def with_database(dsn: str, name: str) -> str:
+    parts = urlsplit(dsn)
+    return urlunsplit(parts._replace(path=f"/{name}"))
+
+
+def check(failures: list, label: str, ok: bool):
+    print(f"   {'ok  ' if ok else 'FAIL'} {label}")
+    if not ok:
+        failures.append(label)
+
+
+def run(dsn: str, batch_size: int) -> list:
+    failures = []
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+    cur.execute(BASE_SCHEMA)
+    for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql"))):
+        print(f"== {os.path.basename(path)}")
+        with open(path) as f:
+            cur.execute(f.read())
+
+    cur.execute(SEED)
+    cur.execute("select * from items where pickup_time < now() order by id")
+    finished_items = {row["id"]: row for row in cur.fetchall()}
+
+    print(f"== archive_chunk({batch_size}) until idle")
+    phases = []
+    for _ in range(50):
+        cur.execute("select archive_chunk(%s, interval '2 hours') as report", (batch_size,))
+        report = cur.fetchone()["report"]
+        phases.append(report["phase"])
+        print(f"   {report}")
+        if report["phase"] == "idle":
+            break
+    check(failures, "reaches idle", phases[-1] == "idle")
+
+    cur.execute("select count(*) as n from items")
+    check(failures, "only the live offer stays in items", cur.fetchone()["n"] == 1)
+    cur.execute("select status, count(*) as n from reservations group by status")
+    check(failures, "only the live offer's active reservation stays", {r["status"]: r["n"] for r in cur.fetchall()} == {"active": 1})
+
+    cur.execute("select * from items_archive order by id")
+    archived = {row["id"]: row for row in cur.fetchall()}
+    check(failures, "every finished offer archived", archived.keys() == finished_items.keys())
+    same = all(
+        archived[item_id][column] == value
+        for item_id, item in finished_items.items() if item_id in archived
+        for column, value in item.items() if column != "status"
+    )
+    check(failures, "archived items keep every column (coordinates, geohash, image_variants)", same)
+    check(failures, "archived items are completed", all(row["status"] == "completed" for row in archived.values()))
+
+    cur.execute("select status, count(*) as n from reservations_archive group by status")
+    by_status = {r["status"]: r["n"] for r in cur.fetchall()}
+    check(failures, "no-shows archived as cancelled", by_status == {"completed": 5, "cancelled": 6})
+    cur.execute("select count(*) as n from reservations_archive where archived_at is null")
+    check(failures, "archived_at set", cur.fetchone()["n"] == 0)
+    conn.close()
+    return failures
+
+
+def main(args) -> int:
+    if not args.dsn:
+        raise SystemExit("--dsn or DATABASE_URL is required")
+    admin = psycopg2.connect(args.dsn)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f'drop database if exists "{args.database}"')
+        cur.execute(f'create database "{args.database}"')
+    try:
+        failures = run(with_database(args.dsn, args.database), args.batch_size)
+    except psycopg2.Error as e:
+        print(f"\nFAIL: {e.pgerror or e}")
+        failures = [str(e)]
+    finally:
+        if not args.keep:
+            with admin.cursor() as cur:
+                cur.execute(f'drop database if exists "{args.database}"')
+        admin.close()
+    print("\nOK" if not failures else f"\nFAIL: {len(failures)} check(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"), help="any database on the server (used to create the scratch one)")
+    parser.add_argument("--database", default="archive_check", help="scratch database name (dropped and recreated)")
+    parser.add_argument("--batch-size", type=int, default=2, help="archive_chunk batch size (small, to exercise checkpoints)")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,70 @@
+"""Microbenchmark: per-request cost of auth.current_user with a claims cache hit vs miss.
+
+    python bench/auth_verify.py [--iterations 20000]
+
+Runs offline: tokens are signed locally with a throwaway HS256 secret and (if the
+cryptography package is installed) an ES256 key injected into the JWKS cache.
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+os.environ["SUPABASE_JWT_SECRET"] = secrets.token_urlsafe(32)
+
+import jwt  # noqa: E402
+import auth  # noqa: E402
+
+
+def make_claims():
+    now = int(time.time())
+    return {"sub": "6f1c1b9e-0000-4000-8000-000000000001", "aud": "authenticated", "role": "authenticated", "exp": now + 3600, "iat": now}
+
+
+def hs256_token():
+    return jwt.encode(make_claims(), auth.JWT_SECRET, algorithm="HS256")
+
+
+def es256_token():
+    try:
+        from cryptography.hazmat.primitives.asymmetric import ec
+    except ImportError:
+        return None
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    public_jwk = jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    auth._jwks = {"bench": jwt.PyJWK({**public_jwk, "kid": "bench", "alg": "ES256"})}
+    return jwt.encode(make_claims(), private_key, algorithm="ES256", headers={"kid": "bench"})
+
+
+async def measure(token, iterations, cached):
+    header = f"Bearer {token}"
+    auth.claims_cache.clear()
+    await auth.current_user(header) # warm up imports / key objects
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not cached:
+            auth.claims_cache.clear()
+        await auth.current_user(header)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def main(iterations):
+    tokens = [("HS256", hs256_token()), ("ES256", es256_token())]
+    for name, token in tokens:
+        if token is None:
+            print(f"{name}: skipped (cryptography not installed)")
+            continue
+        miss = await measure(token, iterations, cached=False)
+        hit = await measure(token, iterations, cached=True)
+        print(f"{name}: miss {miss:8.1f} us/request   hit {hit:6.1f} us/request   (x{miss / hit:.0f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,717 @@
+"""In-memory stand-in for the Supabase REST API (PostgREST) used by the backend, for load tests.
+
+    python bench/fake_supabase.py --port 54321 --latency-ms 20 --jitter-ms 5
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=bench-service-key SUPABASE_JWT_SECRET=... uvicorn main:app
+
+Emulates the subset of PostgREST the backend relies on:
+  - tables items, reservations, profiles, notifications_restaurant, notifications_customer
+  - filters eq/neq/gt/gte/lt/lte/like/ilike/is/in (with not.), or=/and= trees with quoted values,
+    select with column lists and one-level embedding (item:items(*), items!inner + item.column filters),
+    order, limit, offset
+  - Prefer: return=representation|minimal, resolution=ignore-duplicates (+ on_conflict)
+  - RPCs reserve_item, increment/decrement_num_of_reservations, archive_chunk
+  - Storage object upload/download (in memory) for the image pipeline
+  - row visibility roughly like the project's RLS policies (service key sees everything)
+Every request sleeps --latency-ms (+/- --jitter-ms) first to stand in for the network and database.
+
+Bench-only endpoints: POST /_bench/reset seeds fixtures and returns their ids, GET /_bench/stats
+counts the calls received per table/RPC.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import re
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import FastAPI, Request, Response
+
+
+LATENCY_MS = float(os.getenv("FAKE_SUPABASE_LATENCY_MS", "20")) # Simulated round trip per call
+JITTER_MS = float(os.getenv("FAKE_SUPABASE_JITTER_MS", "5"))
+SERVICE_KEY = os.getenv("FAKE_SUPABASE_SERVICE_KEY", "bench-service-key") # Bearer token treated as service_role
+
+TABLES = ("items", "reservations", "profiles", "notifications_restaurant", "notifications_customer", "items_archive", "reservations_archive")
+TIMESTAMP_COLUMNS = {"pickup_time", "timestamp", "created_at"}
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns", "return"}
+PRIMARY_KEYS = {"profiles": "user_id"} # everything else is keyed by id
+INDEXED_COLUMNS = { # eq filters on these skip the full scan
+    "items": ("restaurant_id",),
+    "reservations": ("customer_id", "item_id"),
+    "notifications_restaurant": ("restaurant_id",),
+    "notifications_customer": ("customer_id",),
+}
+OWNER_COLUMNS = {"profiles": "user_id", "notifications_restaurant": "restaurant_id", "notifications_customer": "customer_id"}
+DISHES = ( # seeded item descriptions, with accents so search has something to fold
+    "Menú sorpresa", "Ají de gallina", "Lomo saltado", "Pan de piña", "Empanadas de pollo",
+    "Tamales verdes", "Arroz con leche", "Causa limeña", "Pollo a la brasa", "Panes integrales",
+    "Ceviche del día", "Papa rellena", "Tortilla española", "Jugo de maracuyá", "Galletas de avena",
+)
+NAMESPACE = uuid.UUID("5b1f0c8e-3a55-4b7e-9d0e-6d6b1a1e0000") # seeded ids are stable across resets
+
+
+class PostgrestError(Exception):
+    def __init__(self, status: int, code: str, message: str, details: Optional[str] = None):
+        self.status = status
+        self.body = {"code": code, "message": message, "details": details, "hint": None}
+
+
+# ---------------------------------------------------------------- store
+
+class Store:
+    def __init__(self):
+        self.tables: dict[str, dict[str, dict]] = {name: {} for name in TABLES} # table -> primary key -> row
+        self.indexes = {table: {column: defaultdict(set) for column in columns} for table, columns in INDEXED_COLUMNS.items()}
+        self.calls: Counter = Counter()
+        self.checkpoints: dict[str, Optional[tuple]] = {} # archive_chunk phase -> (time, id) of the last moved row
+        self.objects: dict[str, tuple[bytes, str]] = {} # storage "bucket/key" -> (body, content type)
+
+    def rows(self, table: str) -> list[dict]:
+        return list(self.tables[table].values())
+
+    def insert(self, table: str, row: dict) -> dict:
+        row = {**defaults(table), **row}
+        if table == "items":
+            refresh_generated(row)
+        self.tables[table][primary_key(table, row)] = row
+        self.index(table, row)
+        return row
+
+    def remove(self, table: str, row: dict):
+        self.index(table, row, remove=True)
+        del self.tables[table][primary_key(table, row)]
+
+    def index(self, table: str, row: dict, remove: bool = False):
+        key = primary_key(table, row)
+        for column, index in self.indexes.get(table, {}).items():
+            if remove:
+                index[str(row.get(column))].discard(key)
+            else:
+                index[str(row.get(column))].add(key)
+
+    # Rows that can match: narrowed by a primary key / indexed eq or in filter or the caller's own rows
+    def candidates(self, table: str, params: list[tuple[str, str]], sub: Optional[str]) -> list[dict]:
+        rows = self.tables[table]
+        pk = PRIMARY_KEYS.get(table, "id")
+        keys = None
+        lookups = [(column, [value[3:]]) for column, value in params if value.startswith("eq.")]
+        lookups += [(column, [unquote(v) for v in split_top(value[4:-1])]) for column, value in params if value.startswith("in.(")]
+        if sub is not None and table in OWNER_COLUMNS:
+            lookups.append((OWNER_COLUMNS[table], [sub]))
+        for column, values in lookups:
+            if column == pk:
+                found = {value for value in values if value in rows}
+            elif column in self.indexes.get(table, {}):
+                found = set().union(*(self.indexes[table][column].get(value, set()) for value in values))
+            else:
+                continue
+            keys = set(found) if keys is None else keys & found
+        if keys is None:
+            return list(rows.values())
+        return [rows[key] for key in keys if key in rows]
+
+
+def primary_key(table: str, row: dict) -> str:
+    return str(row[PRIMARY_KEYS.get(table, "id")])
+
+
+def defaults(table: str) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    if table == "items":
+        return {"id": str(uuid.uuid4()), "num_of_reservations": 0, "status": "active", "image_url": None, "location": None, "latitude": None, "longitude": None}
+    if table == "reservations":
+        return {"id": str(uuid.uuid4()), "status": "active", "quantity": 1, "timestamp": now}
+    if table.startswith("notifications_"):
+        return {"id": str(uuid.uuid4()), "read": False, "created_at": now}
+    return {"profile_picture": None, "latitude": None, "longitude": None}
+
+
+# Generated columns of items (migrations/001_items_catalog.sql, 004_geo.sql)
+def refresh_generated(item: dict):
+    item["available_spots"] = item["total_spots"] - (item.get("num_of_reservations") or 0)
+    latitude, longitude = item.get("latitude"), item.get("longitude")
+    item["geohash"] = None if latitude is None or longitude is None else geohash_encode(latitude, longitude)
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+# Same as public.geohash_encode()
+def geohash_encode(lat: float, lng: float, chars: int = 9) -> str:
+    bounds = {True: [-180.0, 180.0], False: [-90.0, 90.0]}
+    result, bits, bit_count, even = "", 0, 0, True
+    while len(result) < chars:
+        low, high = bounds[even]
+        mid = (low + high) / 2
+        value = lng if even else lat
+        bits = bits * 2 + (value >= mid)
+        bounds[even] = [mid, high] if value >= mid else [low, mid]
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            result += GEOHASH_ALPHABET[bits]
+            bits, bit_count = 0, 0
+    return result
+
+
+store = Store()
+
+
+# ---------------------------------------------------------------- auth / visibility
+
+def caller(request: Request) -> Optional[str]:
+    token = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    if token == SERVICE_KEY:
+        return None # service_role: bypasses row visibility
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims["sub"]
+    except Exception:
+        raise PostgrestError(401, "PGRST301", "JWT could not be decoded")
+
+
+def visible(table: str, row: dict, sub: Optional[str]) -> bool:
+    if sub is None or table == "items":
+        return True
+    if table == "profiles":
+        return row.get("user_id") == sub
+    if table == "reservations":
+        if row.get("customer_id") == sub:
+            return True
+        item = store.tables["items"].get(str(row.get("item_id")))
+        return item is not None and item.get("restaurant_id") == sub
+    if table == "notifications_restaurant":
+        return row.get("restaurant_id") == sub
+    if table == "notifications_customer":
+        return row.get("customer_id") == sub
+    return False
+
+
+def check_insert(table: str, row: dict, sub: Optional[str]):
+    if sub is None:
+        return
+    owner = {"items": "restaurant_id", "reservations": "customer_id", "profiles": "user_id"}.get(table)
+    if owner and row.get(owner) != sub:
+        raise PostgrestError(403, "42501", f'new row violates row-level security policy for table "{table}"')
+
+
+# ---------------------------------------------------------------- filters
+
+# Split on commas outside parentheses and double quotes
+def split_top(text: str) -> list[str]:
+    parts, depth, quoted, escaped, start = [], 0, False, False, 0
+    for i, char in enumerate(text):
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part for part in parts if part]
+
+
+def unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def parse_timestamp(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return _parse_timestamp(str(value))
+
+
+@lru_cache(maxsize=65536) # the same stored timestamps are compared and sorted over and over
+def _parse_timestamp(text: str) -> datetime:
+    text = text.strip().replace("Z", "+00:00")
+    if re.search(r" \d\d:\d\d$", text):
+        text = text[:-6] + "+" + text[-5:] # unescaped "+" in a query string arrives as a space
+    parsed = datetime.fromisoformat(text)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def coerce(column: str, current, literal: str):
+    if column in TIMESTAMP_COLUMNS:
+        return parse_timestamp(current) if current is not None else None, parse_timestamp(literal)
+    if isinstance(current, bool):
+        return current, literal.lower() == "true"
+    if isinstance(current, (int, float)):
+        return current, float(literal)
+    return (str(current) if current is not None else None), literal
+
+
+def like(pattern: str, value, ignore_case: bool) -> bool:
+    if value is None:
+        return False
+    regex = "".join(".*" if c in "*%" else "." if c == "_" else re.escape(c) for c in pattern)
+    return re.fullmatch(regex, str(value), re.IGNORECASE | re.DOTALL if ignore_case else re.DOTALL) is not None
+
+
+def compare(row: dict, column: str, op: str, literal: str) -> bool:
+    current = row.get(column)
+    if op == "is":
+        target = {"null": None, "true": True, "false": False}[literal.lower()]
+        return current is target if target is None else current == target
+    if op == "in":
+        values = [unquote(v) for v in split_top(literal.strip()[1:-1])]
+        return any(compare(row, column, "eq", v) for v in values)
+    if op == "like":
+        return like(literal, current, ignore_case=False)
+    if op == "ilike":
+        return like(literal, current, ignore_case=True)
+    if current is None:
+        return False
+    left, right = coerce(column, current, literal)
+    if op == "eq":
+        return left == right
+    if op == "neq":
+        return left != right
+    if op == "gt":
+        return left > right
+    if op == "gte":
+        return left >= right
+    if op == "lt":
+        return left < right
+    if op == "lte":
+        return left <= right
+    raise PostgrestError(400, "PGRST100", f"unknown operator {op}")
+
+
+# Compile "column=op.value" or an or()/and() tree into a predicate
+def parse_condition(expression: str):
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    for group in ("or", "and"):
+        if expression.startswith(group + "("):
+            children = [parse_condition(part) for part in split_top(expression[len(group) + 1:-1])]
+            combine = any if group == "or" else all
+            predicate = lambda row, children=children, combine=combine: combine(child(row) for child in children)
+            return (lambda row: not predicate(row)) if negate else predicate
+    column, _, rest = expression.partition(".")
+    return parse_filter(column, rest)
+
+
+def parse_filter(column: str, spec: str):
+    negate = spec.startswith("not.")
+    if negate:
+        spec = spec[4:]
+    op, _, literal = spec.partition(".")
+    literal = unquote(literal) if op != "in" else literal
+    predicate = lambda row: compare(row, column, op, literal)
+    return (lambda row: not predicate(row)) if negate else predicate
+
+
+def row_filter(params: list[tuple[str, str]]):
+    predicates = []
+    for key, value in params:
+        if key in RESERVED_PARAMS:
+            continue
+        if key in ("or", "and"):
+            predicates.append(parse_condition(f"{key}{value}"))
+        elif "." in key: # filter on an embedded resource, e.g. item.restaurant_id=eq.X
+            alias, _, column = key.partition(".")
+            predicate = parse_filter(column, value)
+            predicates.append(lambda row, alias=alias, predicate=predicate: (target := embedded_row(row, alias)) is not None and predicate(target))
+        else:
+            predicates.append(parse_filter(key, value))
+    return lambda row: all(predicate(row) for predicate in predicates)
+
+
+# Row an alias like "item" points at (only !inner embeds are filtered, which is what the backend uses)
+def embedded_row(row: dict, alias: str) -> Optional[dict]:
+    table = alias + "s"
+    if table not in store.tables:
+        return None
+    return store.tables[table].get(str(row.get(f"{alias}_id")))
+
+
+# ---------------------------------------------------------------- select / order
+
+def project(table: str, row: dict, select: str) -> dict:
+    if not select or select == "*":
+        return dict(row)
+    out = {}
+    for field in split_top(select):
+        if "(" in field:
+            head, _, columns = field.partition("(")
+            alias, _, embedded_table = head.rpartition(":") # "item:items" or just "items"
+            embedded_table = embedded_table.partition("!")[0] # "items!inner": join hint
+            alias = alias or embedded_table
+            foreign_key = embedded_table.removesuffix("s") + "_id" # reservations.item_id -> items.id
+            target = store.tables[embedded_table].get(str(row.get(foreign_key)))
+            out[alias] = project(embedded_table, target, columns[:-1]) if target is not None else None
+        elif field == "*":
+            out.update(row)
+        else:
+            out[field] = row.get(field)
+    return out
+
+
+def sort_key(column: str):
+    def key(row: dict):
+        value = row.get(column)
+        if value is None:
+            return (1, "") # nulls last
+        if column in TIMESTAMP_COLUMNS:
+            value = parse_timestamp(value)
+        return (0, value)
+    return key
+
+
+def sort_rows(rows: list[dict], order: Optional[str]) -> list[dict]:
+    if not order:
+        return rows
+    for term in reversed(order.split(",")): # stable sorts, least significant column first
+        column, _, direction = term.partition(".")
+        rows = sorted(rows, key=sort_key(column), reverse=direction.startswith("desc"))
+    return rows
+
+
+# ---------------------------------------------------------------- handlers
+
+app = FastAPI()
+
+
+# Called first by every PostgREST handler (cheaper than an HTTP middleware)
+async def inject_latency():
+    if LATENCY_MS or JITTER_MS:
+        await asyncio.sleep(max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000)
+
+
+def json_response(data, status: int = 200) -> Response:
+    return Response(content=json.dumps(data, default=str), status_code=status, media_type="application/json")
+
+
+def error_response(error: PostgrestError) -> Response:
+    return json_response(error.body, error.status)
+
+
+def prefer(request: Request) -> set[str]:
+    return {part.strip() for part in request.headers.get("prefer", "").split(",") if part.strip()}
+
+
+def table_or_404(table: str):
+    if table not in TABLES:
+        raise PostgrestError(404, "PGRST205", f"Could not find the table 'public.{table}' in the schema cache")
+
+
+@app.get("/rest/v1/{table}")
+async def select_rows(table: str, request: Request):
+    await inject_latency()
+    try:
+        table_or_404(table)
+        store.calls[f"GET {table}"] += 1
+        sub = caller(request)
+        params = request.query_params.multi_items()
+        query = dict(params)
+        matches = row_filter(params)
+        rows = [row for row in store.candidates(table, params, sub) if visible(table, row, sub) and matches(row)]
+        rows = sort_rows(rows, query.get("order"))
+        offset = int(query.get("offset", 0))
+        if "limit" in query:
+            rows = rows[offset:offset + int(query["limit"])]
+        elif offset:
+            rows = rows[offset:]
+        return json_response([project(table, row, query.get("select", "*")) for row in rows])
+    except PostgrestError as e:
+        return error_response(e)
+
+
+@app.post("/rest/v1/{table}")
+async def insert_rows(table: str, request: Request):
+    await inject_latency()
+    try:
+        table_or_404(table)
+        store.calls[f"POST {table}"] += 1
+        sub = caller(request)
+        body = await request.json()
+        payload = body if isinstance(body, list) else [body]
+        query = dict(request.query_params.multi_items())
+        options = prefer(request)
+        inserted = []
+        for row in payload:
+            check_insert(table, row, sub)
+            key = row.get(PRIMARY_KEYS.get(table, "id")) # on_conflict is only supported on the primary key
+            if key is not None and str(key) in store.tables[table]:
+                if "resolution=ignore-duplicates" in options:
+                    continue
+                raise PostgrestError(409, "23505", f'duplicate key value violates unique constraint "{table}_pkey"')
+            inserted.append(store.insert(table, row))
+        if "return=minimal" in options:
+            return Response(status_code=201)
+        return json_response([project(table, row, query.get("select", "*")) for row in inserted], 201)
+    except PostgrestError as e:
+        return error_response(e)
+
+
+@app.patch("/rest/v1/{table}")
+async def update_rows(table: str, request: Request):
+    await inject_latency()
+    try:
+        table_or_404(table)
+        store.calls[f"PATCH {table}"] += 1
+        sub = caller(request)
+        changes = await request.json()
+        params = request.query_params.multi_items()
+        query = dict(params)
+        matches = row_filter(params)
+        reindex = any(column in INDEXED_COLUMNS.get(table, ()) for column in changes)
+        updated = []
+        for row in store.candidates(table, params, sub):
+            if visible(table, row, sub) and matches(row):
+                if reindex:
+                    store.index(table, row, remove=True)
+                row.update(changes)
+                if reindex:
+                    store.index(table, row)
+                if table == "items":
+                    refresh_generated(row)
+                updated.append(row)
+        if "return=minimal" in prefer(request):
+            return Response(status_code=204)
+        return json_response([project(table, row, query.get("select", "*")) for row in updated])
+    except PostgrestError as e:
+        return error_response(e)
+
+
+@app.post("/rest/v1/rpc/{function}")
+async def call_rpc(function: str, request: Request):
+    await inject_latency()
+    try:
+        store.calls[f"RPC {function}"] += 1
+        sub = caller(request)
+        args = await request.json() if await request.body() else {}
+        handler = RPCS.get(function)
+        if handler is None:
+            raise PostgrestError(404, "PGRST202", f"Could not find the function public.{function}")
+        return json_response(handler(args, sub))
+    except PostgrestError as e:
+        return error_response(e)
+
+
+# Same checks and error codes as migrations/002_reserve_item.sql (the event loop makes it atomic here)
+def reserve_item(args: dict, sub: Optional[str]):
+    quantity = args.get("reserve_quantity", 1)
+    if quantity is None or quantity < 1:
+        raise PostgrestError(400, "PT400", "invalid_quantity", "Quantity must be at least 1")
+    if sub is not None and args.get("customer_uuid") != sub:
+        raise PostgrestError(403, "PT403", "forbidden")
+    item = store.tables["items"].get(str(args.get("item_uuid")))
+    if item is None:
+        raise PostgrestError(404, "PT404", "item_not_found")
+    if item["status"] != "active":
+        raise PostgrestError(410, "PT410", "item_not_active", item["status"])
+    spots_left = item["total_spots"] - (item["num_of_reservations"] or 0)
+    if spots_left < quantity:
+        raise PostgrestError(409, "PT409", "sold_out", str(max(spots_left, 0)))
+    item["num_of_reservations"] = (item["num_of_reservations"] or 0) + quantity
+    refresh_generated(item)
+    reservation = store.insert("reservations", {
+        "customer_id": args.get("customer_uuid"),
+        "item_id": item["id"],
+        "timestamp": args.get("reserved_at") or datetime.now(timezone.utc).isoformat(),
+        "quantity": quantity,
+    })
+    return [reservation]
+
+
+def bump_reservations(delta: int):
+    def rpc(args: dict, sub: Optional[str]):
+        item = store.tables["items"].get(str(args.get("item_uuid")))
+        if item is not None:
+            item["num_of_reservations"] = max(0, (item["num_of_reservations"] or 0) + delta)
+            refresh_generated(item)
+        return None
+    return rpc
+
+
+# Same phases and checkpoints as migrations/003_archive.sql
+def parse_interval(value) -> timedelta:
+    amount, unit = str(value).split()
+    return timedelta(**{unit if unit.endswith("s") else unit + "s": float(amount)})
+
+
+def archive_chunk(args: dict, sub: Optional[str]):
+    if sub is not None:
+        raise PostgrestError(403, "42501", "permission denied for function archive_chunk")
+    batch_size = int(args.get("batch_size", 500))
+    cutoff = datetime.now(timezone.utc) - parse_interval(args.get("grace", "2 hours"))
+    now = datetime.now(timezone.utc).isoformat()
+
+    def move(table: str, row: dict):
+        store.remove(table, row)
+        store.tables[f"{table}_archive"][row["id"]] = {**row, "archived_at": now}
+
+    def next_chunk(phase: str, rows: list[dict], column: str) -> tuple[list[dict], bool]:
+        checkpoint = store.checkpoints.get(phase)
+        rows = sorted((parse_timestamp(row[column]), row["id"], row) for row in rows)
+        rows = [entry for entry in rows if entry[0] < cutoff and (checkpoint is None or entry[:2] > checkpoint)]
+        chunk = rows[:batch_size]
+        caught_up = len(chunk) < batch_size
+        store.checkpoints[phase] = None if caught_up or not chunk else chunk[-1][:2]
+        return [row for _, _, row in chunk], caught_up
+
+    items, caught_up = next_chunk("items", store.rows("items"), "pickup_time")
+    if items:
+        ids = {item["id"] for item in items}
+        reservations = [r for r in store.rows("reservations") if r["item_id"] in ids]
+        for reservation in reservations:
+            if reservation["status"] == "active":
+                reservation["status"] = "cancelled" # no-show
+            move("reservations", reservation)
+        for item in items:
+            if item["status"] == "active":
+                item["status"] = "completed"
+            move("items", item)
+        return {"phase": "items", "items": len(items), "reservations": len(reservations), "caught_up": caught_up}
+
+    finished = [r for r in store.rows("reservations") if r["status"] in ("cancelled", "completed")]
+    reservations, caught_up = next_chunk("reservations", finished, "timestamp")
+    if reservations:
+        for reservation in reservations:
+            move("reservations", reservation)
+        return {"phase": "reservations", "items": 0, "reservations": len(reservations), "caught_up": caught_up}
+
+    return {"phase": "idle", "items": 0, "reservations": 0, "caught_up": True}
+
+
+RPCS = {
+    "reserve_item": reserve_item,
+    "increment_num_of_reservations": bump_reservations(1),
+    "decrement_num_of_reservations": bump_reservations(-1),
+    "archive_chunk": archive_chunk,
+}
+
+
+# Storage: objects kept in memory, uploads need the service key (the backend uploads images)
+@app.post("/storage/v1/object/{bucket}/{key:path}")
+async def put_object(bucket: str, key: str, request: Request):
+    await inject_latency()
+    store.calls["STORAGE put"] += 1
+    if request.headers.get("authorization") != f"Bearer {SERVICE_KEY}":
+        return json_response({"statusCode": "403", "error": "Unauthorized", "message": "new row violates row-level security policy"}, 400)
+    store.objects[f"{bucket}/{key}"] = (await request.body(), request.headers.get("content-type", "application/octet-stream"))
+    return json_response({"Key": f"{bucket}/{key}"})
+
+
+@app.get("/storage/v1/object/{bucket}/{key:path}")
+@app.get("/storage/v1/object/public/{bucket}/{key:path}")
+async def get_object(bucket: str, key: str):
+    await inject_latency()
+    store.calls["STORAGE get"] += 1
+    found = store.objects.get(f"{bucket}/{key}")
+    if found is None:
+        return json_response({"statusCode": "404", "error": "not_found", "message": "Object not found"}, 400)
+    return Response(content=found[0], media_type=found[1])
+
+
+# ---------------------------------------------------------------- fixtures
+
+def seeded_id(kind: str, index: int) -> str:
+    return str(uuid.uuid5(NAMESPACE, f"{kind}-{index}"))
+
+
+# Deterministic data set: restaurants with items, customers with reservations and unread notifications
+def seed(
+    restaurants: int = 20,
+    customers: int = 500,
+    items_per_restaurant: int = 10,
+    spots: int = 20,
+    reservations_per_item: int = 0,
+    notifications_per_user: int = 5,
+) -> dict:
+    global store
+    calls = store.calls
+    store = Store()
+    store.calls = calls
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    restaurant_ids = [seeded_id("restaurant", i) for i in range(restaurants)]
+    customer_ids = [seeded_id("customer", i) for i in range(customers)]
+    geo_rng = random.Random(7) # separate stream so the other fixtures don't change
+    locations = {} # restaurants spread over ~30 km around central Lima
+    for user_id in restaurant_ids:
+        locations[user_id] = (round(-12.0464 + geo_rng.uniform(-0.15, 0.15), 6), round(-77.0428 + geo_rng.uniform(-0.15, 0.15), 6))
+        store.insert("profiles", {
+            "user_id": user_id, "role": "restaurant", "name": f"Restaurante {user_id[:4]}",
+            "latitude": locations[user_id][0], "longitude": locations[user_id][1],
+        })
+    for user_id in customer_ids:
+        store.insert("profiles", {"user_id": user_id, "role": "customer", "name": f"Cliente {user_id[:4]}"})
+
+    items, reservations = [], []
+    for r, restaurant_id in enumerate(restaurant_ids):
+        for i in range(items_per_restaurant):
+            item = store.insert("items", {
+                "id": seeded_id("item", r * items_per_restaurant + i),
+                "restaurant_id": restaurant_id,
+                "information": f"{DISHES[(r * items_per_restaurant + i) % len(DISHES)]} {r}-{i}",
+                "location": f"Calle {rng.randint(1, 99)}, Lima",
+                "price": round(rng.uniform(5, 25), 2),
+                "pickup_time": (now + timedelta(minutes=rng.randint(30, 600))).isoformat(),
+                "total_spots": max(spots, reservations_per_item),
+                "latitude": locations[restaurant_id][0],
+                "longitude": locations[restaurant_id][1],
+            })
+            items.append({"id": item["id"], "restaurant_id": restaurant_id})
+            for _ in range(reservations_per_item):
+                reservation = store.insert("reservations", {"customer_id": rng.choice(customer_ids), "item_id": item["id"]})
+                item["num_of_reservations"] += 1
+                reservations.append({"id": reservation["id"], "customer_id": reservation["customer_id"], "item_id": item["id"]})
+            refresh_generated(item)
+
+    for table, owners in (("notifications_restaurant", restaurant_ids), ("notifications_customer", customer_ids)):
+        for owner in owners:
+            for n in range(notifications_per_user):
+                store.insert(table, {
+                    "restaurant_id": owner if table == "notifications_restaurant" else rng.choice(restaurant_ids),
+                    "customer_id": owner if table == "notifications_customer" else rng.choice(customer_ids),
+                    "type": "info",
+                    "message": f"Aviso {n}",
+                    "created_at": (now - timedelta(minutes=n)).isoformat(),
+                })
+
+    return {"restaurants": restaurant_ids, "customers": customer_ids, "items": items, "reservations": reservations}
+
+
+@app.post("/_bench/reset")
+async def reset(request: Request):
+    options = await request.json() if await request.body() else {}
+    store.calls.clear()
+    return json_response(seed(**options))
+
+
+@app.get("/_bench/stats")
+async def stats():
+    return json_response({"calls": dict(store.calls), "rows": {table: len(rows) for table, rows in store.tables.items()}})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=JITTER_MS)
+    args = parser.parse_args()
+    LATENCY_MS, JITTER_MS = args.latency_ms, args.jitter_ms
+    seed()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,306 @@
+"""Load test: scripted scenarios against the backend with the Supabase stand-in behind it.
+
+    python bench/load_test.py                                   # spawns fake_supabase + uvicorn main:app
+    python bench/load_test.py --scenario lunch_rush --concurrency 200 --duration 30 --latency-ms 25
+    python bench/load_test.py --backend http://127.0.0.1:8000 --supabase http://127.0.0.1:54321
+    python bench/load_test.py --json results.json --max-p99-ms 400   # exits 1 if any scenario's p99 is above
+
+Scenarios (fixtures are reset on the stand-in before each one):
+  lunch_rush          customers reserve a few hot items at once while browsing the catalog
+  dashboard_polling   customer and restaurant dashboards polling items, reservations and notifications
+  mass_cancellation   every restaurant cancels all of its items, each with active reservations
+
+Reports throughput and p50/p95/p99 per endpoint, plus the Supabase calls the stand-in received.
+Tokens are signed locally with --jwt-secret, which the spawned backend also gets (SUPABASE_JWT_SECRET).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+import jwt
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+SCENARIOS = ("lunch_rush", "dashboard_polling", "mass_cancellation")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list) # endpoint -> seconds
+        self.statuses = defaultdict(Counter) # endpoint -> status -> count
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, token: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            res = await client.request(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+            status = res.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[name][status] += 1
+        return status
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def summary(self) -> dict:
+        endpoints = {}
+        everything = []
+        for name, values in sorted(self.latencies.items()):
+            everything.extend(values)
+            endpoints[name] = {
+                "requests": len(values),
+                "statuses": {str(k): v for k, v in self.statuses[name].items()},
+                **latency_summary(values),
+            }
+        errors = sum(v for counts in self.statuses.values() for k, v in counts.items() if not isinstance(k, int) or k >= 500)
+        return {
+            "requests": len(everything),
+            "errors": errors,
+            "seconds": round(self.elapsed, 2),
+            "throughput_rps": round(len(everything) / self.elapsed, 1) if self.elapsed else 0.0,
+            **latency_summary(everything),
+            "endpoints": endpoints,
+        }
+
+
+def latency_summary(values) -> dict:
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    return {f"p{p}_ms": round(percentile(values, p) * 1000, 1) for p in (50, 95, 99)}
+
+
+def make_token(secret: str, user_id: str) -> str:
+    now = int(time.time())
+    claims = {"sub": user_id, "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + 3600}
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+# ---------------------------------------------------------------- scenarios
+
+# Closed loop: each worker runs `step` back to back until the deadline
+async def run_for(duration: float, concurrency: int, step):
+    deadline = time.perf_counter() + duration
+
+    async def worker(n):
+        rng = random.Random(n)
+        while time.perf_counter() < deadline:
+            await step(n, rng)
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+
+
+async def lunch_rush(client, fixtures, tokens, args, recorder):
+    hot_items = [item["id"] for item in fixtures["items"][: args.hot_items]]
+    customers = fixtures["customers"]
+
+    async def step(n, rng):
+        customer = customers[n % len(customers)]
+        if rng.random() < 0.7:
+            await recorder.call(client, "POST /reservations", "POST", "/reservations", tokens[customer], json={
+                "customer_id": customer,
+                "item_id": rng.choice(hot_items),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "quantity": 1,
+            })
+        else:
+            await recorder.call(client, "GET /items", "GET", "/items", tokens[customer], params={"status": "active", "available": "true"})
+
+    await run_for(args.duration, args.concurrency, step)
+
+
+async def dashboard_polling(client, fixtures, tokens, args, recorder):
+    customers, restaurants = fixtures["customers"], fixtures["restaurants"]
+
+    async def step(n, rng):
+        if n % 5: # 4 out of 5 dashboards are customers
+            customer = customers[n % len(customers)]
+            token = tokens[customer]
+            await recorder.call(client, "GET /items", "GET", "/items", token, params={"status": "active", "available": "true"})
+            await recorder.call(client, "GET /reservations", "GET", "/reservations", token)
+            await recorder.call(client, "GET /notifications", "GET", "/notifications", token)
+        else:
+            token = tokens[restaurants[n % len(restaurants)]]
+            await recorder.call(client, "GET /restaurant/items", "GET", "/restaurant/items", token)
+            await recorder.call(client, "GET /notifications", "GET", "/notifications", token)
+        if args.think_ms:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+    await run_for(args.duration, args.concurrency, step)
+
+
+# Fixed amount of work: every item is cancelled once, `concurrency` at a time
+async def mass_cancellation(client, fixtures, tokens, args, recorder):
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in fixtures["items"]:
+        queue.put_nowait(item)
+
+    async def worker():
+        while not queue.empty():
+            item = queue.get_nowait()
+            await recorder.call(
+                client, "PATCH /restaurant/items/{id}/cancel", "PATCH",
+                f"/restaurant/items/{item['id']}/cancel", tokens[item["restaurant_id"]],
+            )
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+SCENARIO_FIXTURES = {
+    "lunch_rush": lambda args: {"spots": args.spots, "reservations_per_item": 0},
+    "dashboard_polling": lambda args: {"reservations_per_item": 3},
+    "mass_cancellation": lambda args: {"reservations_per_item": args.reservations_per_item},
+}
+SCENARIO_RUNNERS = {
+    "lunch_rush": lunch_rush,
+    "dashboard_polling": dashboard_polling,
+    "mass_cancellation": mass_cancellation,
+}
+
+
+# ---------------------------------------------------------------- processes
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_up(url: str, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+
+def spawn(args, outbox_path: str):
+    supabase_port, backend_port = free_port(), free_port()
+    stand_in = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_supabase.py"), "--port", str(supabase_port),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms)],
+        env={**os.environ, "FAKE_SUPABASE_SERVICE_KEY": args.service_key},
+    )
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(backend_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={
+            **os.environ,
+            "SUPABASE_URL": f"http://127.0.0.1:{supabase_port}",
+            "SUPABASE_KEY": args.service_key,
+            "SUPABASE_JWT_SECRET": args.jwt_secret,
+            "ADMIN_TOKEN": args.admin_token,
+            "OUTBOX_PATH": outbox_path,
+        },
+    )
+    return [stand_in, backend], f"http://127.0.0.1:{backend_port}", f"http://127.0.0.1:{supabase_port}"
+
+
+# ---------------------------------------------------------------- main
+
+def print_report(name: str, result: dict, supabase_calls: dict):
+    print(f"\n== {name}: {result['requests']} requests in {result['seconds']}s = {result['throughput_rps']} req/s, "
+          f"errors {result['errors']}, p50 {result['p50_ms']}ms p95 {result['p95_ms']}ms p99 {result['p99_ms']}ms")
+    for endpoint, stats in result["endpoints"].items():
+        statuses = " ".join(f"{k}:{v}" for k, v in sorted(stats["statuses"].items()))
+        print(f"   {endpoint:36} {stats['requests']:7d}  p50 {stats['p50_ms']:7.1f}  p95 {stats['p95_ms']:7.1f}  "
+              f"p99 {stats['p99_ms']:7.1f} ms   [{statuses}]")
+    total_calls = sum(supabase_calls.values())
+    print(f"   supabase calls: {total_calls} ({total_calls / max(result['requests'], 1):.2f}/request) "
+          + ", ".join(f"{k}={v}" for k, v in sorted(supabase_calls.items())))
+
+
+async def main(args) -> int:
+    processes = []
+    outbox_path = os.path.join(BENCH_DIR, f".load_test_outbox_{os.getpid()}.sqlite3")
+    if args.backend:
+        backend_url, supabase_url = args.backend, args.supabase
+        if not supabase_url:
+            raise SystemExit("--supabase (the stand-in URL) is required with --backend")
+    else:
+        processes, backend_url, supabase_url = spawn(args, outbox_path)
+
+    results = {}
+    try:
+        await wait_until_up(f"{supabase_url}/_bench/stats")
+        await wait_until_up(f"{backend_url}/")
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=backend_url, limits=limits, timeout=30) as client, httpx.AsyncClient() as admin:
+            for name in (SCENARIOS if args.scenario == "all" else [args.scenario]):
+                options = {
+                    "restaurants": args.restaurants,
+                    "customers": args.customers,
+                    "items_per_restaurant": args.items_per_restaurant,
+                    **SCENARIO_FIXTURES[name](args),
+                }
+                await client.post("/update-archive", headers={"Authorization": f"Bearer {args.admin_token}"}) # drops the backend's catalog cache from the previous scenario
+                fixtures = (await admin.post(f"{supabase_url}/_bench/reset", json=options)).json()
+                tokens = {user: make_token(args.jwt_secret, user) for user in fixtures["customers"] + fixtures["restaurants"]}
+
+                recorder = Recorder()
+                await SCENARIO_RUNNERS[name](client, fixtures, tokens, args, recorder)
+                recorder.finish()
+                supabase_calls = (await admin.get(f"{supabase_url}/_bench/stats")).json()["calls"]
+                results[name] = {**recorder.summary(), "supabase_calls": supabase_calls}
+                print_report(name, results[name], supabase_calls)
+    finally:
+        for process in reversed(processes): # backend first, so its outbox can still drain into the stand-in
+            process.terminate()
+            process.wait()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(outbox_path + suffix):
+                os.remove(outbox_path + suffix)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    if args.max_p99_ms is not None:
+        slow = [name for name, result in results.items() if result["p99_ms"] is not None and result["p99_ms"] > args.max_p99_ms]
+        if slow:
+            print(f"\nFAIL: p99 above {args.max_p99_ms}ms in {', '.join(slow)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--backend", help="URL of an already running backend (default: spawn one)")
+    parser.add_argument("--supabase", help="URL of the running stand-in the backend points at (with --backend)")
+    parser.add_argument("--concurrency", type=int, default=100, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per time-based scenario")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between dashboard polls")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stand-in latency per Supabase call")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--restaurants", type=int, default=20)
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--items-per-restaurant", type=int, default=10)
+    parser.add_argument("--hot-items", type=int, default=3, help="items everyone reserves during the lunch rush")
+    parser.add_argument("--spots", type=int, default=100, help="spots per item during the lunch rush")
+    parser.add_argument("--reservations-per-item", type=int, default=10, help="active reservations per cancelled item")
+    parser.add_argument("--jwt-secret", default="bench-jwt-secret-bench-jwt-secret")
+    parser.add_argument("--service-key", default="bench-service-key")
+    parser.add_argument("--admin-token", default="bench-admin-token", help="ADMIN_TOKEN of the backend (POST /update-archive)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--max-p99-ms", type=float, help="exit 1 if any scenario's overall p99 is above this")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,214 @@
+"""Concurrency check for migrations/002_reserve_item.sql against a local Postgres.
+
+Fires hundreds of simultaneous reservations at one item through reserve_item() and
+asserts nothing is oversold, then runs the old three-step flow (read spots, insert,
+increment) the same way to show the oversell and the latency difference.
+
+    python bench/reservation_concurrency.py --dsn postgresql://postgres@localhost/misky_bench
+
+Use a scratch database: missing tables/roles are created and the bench rows are deleted after.
+--rtt-ms adds a simulated network round trip per statement (Render -> Supabase is ~20ms).
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+import psycopg2.errors
+
+
+MIGRATION = os.path.join(os.path.dirname(__file__), "..", "migrations", "002_reserve_item.sql")
+
+# Minimal stand-ins for the Supabase objects the migration expects
+SCHEMA = """
+create schema if not exists auth;
+create or replace function auth.uid() returns uuid language sql stable as $$ select null::uuid $$;
+do $$ begin
+    if not exists (select 1 from pg_roles where rolname = 'authenticated') then
+        create role authenticated;
+    end if;
+end $$;
+create table if not exists public.items (
+    id uuid primary key default gen_random_uuid(),
+    restaurant_id uuid,
+    information text,
+    price numeric,
+    pickup_time timestamptz,
+    total_spots integer not null,
+    num_of_reservations integer default 0,
+    image_url text,
+    status text default 'active',
+    location text
+);
+create table if not exists public.reservations (
+    id uuid primary key default gen_random_uuid(),
+    customer_id uuid,
+    item_id uuid references public.items(id),
+    "timestamp" timestamptz,
+    status text default 'active',
+    quantity integer default 1
+);
+"""
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def setup(dsn):
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA)
+        with open(MIGRATION) as f:
+            cur.execute(f.read())
+    return conn
+
+
+def create_item(conn, spots):
+    with conn.cursor() as cur:
+        cur.execute(
+            "insert into items (information, pickup_time, total_spots, num_of_reservations, status) "
+            "values ('bench', now(), %s, 0, 'active') returning id",
+            (spots,),
+        )
+        return cur.fetchone()[0]
+
+
+def round_trip(rtt):
+    if rtt:
+        time.sleep(rtt)
+
+
+# New path: one call, row lock inside the function
+def reserve_atomic(conn, item_id, rtt):
+    with conn.cursor() as cur:
+        round_trip(rtt)
+        try:
+            cur.execute("select id from reserve_item(%s, %s, 1, now())", (item_id, str(uuid.uuid4())))
+            conn.commit()
+            return True
+        except psycopg2.Error as e:
+            conn.rollback()
+            if e.pgcode == "PT409":
+                return False
+            raise
+
+
+# Old path: what create_reservation did before (three separate PostgREST calls = three transactions)
+def reserve_legacy(conn, item_id, rtt):
+    with conn.cursor() as cur:
+        round_trip(rtt)
+        cur.execute("select total_spots, num_of_reservations from items where id = %s", (item_id,))
+        total, taken = cur.fetchone()
+        conn.commit()
+        if total - (taken or 0) < 1:
+            return False
+        round_trip(rtt)
+        cur.execute(
+            "insert into reservations (customer_id, item_id, \"timestamp\", status, quantity) "
+            "values (%s, %s, now(), 'active', 1)",
+            (str(uuid.uuid4()), item_id),
+        )
+        conn.commit()
+        round_trip(rtt)
+        cur.execute("update items set num_of_reservations = num_of_reservations + 1 where id = %s", (item_id,))
+        conn.commit()
+        return True
+
+
+def run(dsn, item_id, attempts, workers, rtt, reserve):
+    connections = [psycopg2.connect(dsn) for _ in range(workers)]
+    barrier = threading.Barrier(workers)
+    local = threading.local()
+    counter = iter(range(workers))
+    lock = threading.Lock()
+
+    def attempt(_):
+        if not hasattr(local, "conn"):
+            with lock:
+                local.conn = connections[next(counter)]
+            barrier.wait() # every worker starts at the same moment
+        start = time.perf_counter()
+        ok = reserve(local.conn, item_id, rtt)
+        return ok, time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(attempt, range(attempts)))
+    elapsed = time.perf_counter() - started
+    for conn in connections:
+        conn.close()
+    return results, elapsed
+
+
+def report(conn, name, item_id, spots, results, elapsed):
+    with conn.cursor() as cur:
+        cur.execute("select num_of_reservations from items where id = %s", (item_id,))
+        counter = cur.fetchone()[0]
+        cur.execute("select coalesce(sum(quantity), 0) from reservations where item_id = %s", (item_id,))
+        reserved = cur.fetchone()[0]
+    latencies = [latency * 1000 for _, latency in results]
+    accepted = [latency * 1000 for ok, latency in results if ok]
+    print(
+        f"{name:<8} attempts={len(results)} accepted={len(accepted)} reserved={reserved}/{spots} counter={counter} "
+        f"p50={statistics.median(latencies):.1f}ms p95={percentile(latencies, 95):.1f}ms "
+        f"p99={percentile(latencies, 99):.1f}ms accepted_p50={statistics.median(accepted):.1f}ms wall={elapsed:.2f}s"
+    )
+    return reserved, counter, statistics.median(accepted)
+
+
+def cleanup(conn, item_ids):
+    with conn.cursor() as cur:
+        cur.execute("delete from reservations where item_id = any(%s::uuid[])", (item_ids,))
+        cur.execute("delete from items where id = any(%s::uuid[])", (item_ids,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"), help="scratch Postgres (default $DATABASE_URL)")
+    parser.add_argument("--spots", type=int, default=50, help="total_spots of the hot item")
+    parser.add_argument("--attempts", type=int, default=400, help="reservations fired at the item")
+    parser.add_argument("--workers", type=int, default=80, help="concurrent connections (stay under max_connections)")
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="simulated round trip per call")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_URL is required")
+
+    conn = setup(args.dsn)
+    rtt = args.rtt_ms / 1000
+    items = [create_item(conn, args.spots) for _ in range(4)]
+    atomic_item, legacy_item, atomic_solo, legacy_solo = items
+    try:
+        # Lunch rush: everyone hits one item at once
+        results, elapsed = run(args.dsn, atomic_item, args.attempts, args.workers, rtt, reserve_atomic)
+        reserved, counter, _ = report(conn, "atomic", atomic_item, args.spots, results, elapsed)
+
+        results, elapsed = run(args.dsn, legacy_item, args.attempts, args.workers, rtt, reserve_legacy)
+        legacy_reserved, _, _ = report(conn, "legacy", legacy_item, args.spots, results, elapsed)
+
+        # Uncontended: what a single customer waits for (1 round trip vs 3)
+        results, elapsed = run(args.dsn, atomic_solo, args.spots, 1, rtt, reserve_atomic)
+        _, _, atomic_p50 = report(conn, "atomic/1", atomic_solo, args.spots, results, elapsed)
+
+        results, elapsed = run(args.dsn, legacy_solo, args.spots, 1, rtt, reserve_legacy)
+        _, _, legacy_p50 = report(conn, "legacy/1", legacy_solo, args.spots, results, elapsed)
+    finally:
+        cleanup(conn, [str(item) for item in items])
+        conn.close()
+
+    print(f"legacy oversold by {max(legacy_reserved - args.spots, 0)}; uncontended p50 speedup x{legacy_p50 / atomic_p50:.2f}")
+    if reserved != args.spots or counter != args.spots:
+        print("FAIL: reserve_item oversold or lost reservations")
+        sys.exit(1)
+    print("OK: no oversell through reserve_item")
+
+
+if __name__ == "__main__":
+    main()
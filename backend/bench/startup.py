@@ -0,0 +1,190 @@
+"""Cold start benchmark: interpreter + import time of main, and latency of the first requests after a start.
+
+    python bench/startup.py                         # 5 imports, 5 cold starts against a spawned stand-in
+    python bench/startup.py --runs 10 --latency-ms 40 --importtime 15
+    python bench/startup.py --wait-ready            # first request only after GET /ready passes
+    python bench/startup.py --json startup.json
+
+Import: `python -c "import main"` in a fresh interpreter, timed from process spawn (interpreter start
+included) and around the import itself; --importtime lists the slowest modules main imports directly.
+
+Cold start: spawns `uvicorn main:app` against fake_supabase.py (started once) and measures
+  listen_ms   spawn -> GET / answers
+  first_ms    GET /dashboard/customer sent as soon as the port is open (what a request that woke a
+              spun-down instance sees), or right after /ready with --wait-ready
+  ready_ms    spawn -> GET /ready answers 200 (Supabase connections open, JWKS loaded)
+  warm_ms     the same request once everything is warm
+The stand-in has no TLS, so --latency-ms only stands in for the round trips a handshake would add.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from load_test import BACKEND_DIR, BENCH_DIR, free_port, make_token, wait_until_up
+
+
+POLL_SECONDS = 0.005
+
+
+def backend_env(supabase_url: str, args, outbox_path: str) -> dict:
+    return {
+        **os.environ,
+        "SUPABASE_URL": supabase_url,
+        "SUPABASE_KEY": args.service_key,
+        "SUPABASE_JWT_SECRET": args.jwt_secret,
+        "OUTBOX_PATH": outbox_path,
+    }
+
+
+# ---------------------------------------------------------------- import time
+
+def measure_import(env: dict) -> tuple[float, float]:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+    return total, float(out.stdout.strip().splitlines()[-1])
+
+
+# Modules imported directly by main, slowest first (cumulative microseconds from -X importtime)
+def import_breakdown(env: dict, top: int) -> list[tuple[str, float]]:
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    children = [] # a module's imports are listed before it, one indent level deeper
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((name.strip(), int(cumulative) / 1000))
+        elif depth == 0:
+            if name.strip() == "main":
+                return sorted(children, key=lambda m: m[1], reverse=True)[:top]
+            children = []
+    return []
+
+
+# ---------------------------------------------------------------- cold start
+
+async def poll(client: httpx.AsyncClient, url: str, timeout: float = 30.0, status: int = 200) -> float:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(url)).status_code == status:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(POLL_SECONDS)
+    raise RuntimeError(f"{url} did not answer {status}")
+
+
+async def timed_get(client: httpx.AsyncClient, url: str, token: str) -> float:
+    start = time.perf_counter()
+    res = await client.get(url, headers={"Authorization": f"Bearer {token}"})
+    res.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def cold_start(env: dict, token: str, args) -> dict:
+    port = free_port()
+    backend_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            listening = await poll(client, f"{backend_url}/")
+            if args.wait_ready:
+                ready = await poll(client, f"{backend_url}/ready")
+                first = await timed_get(client, f"{backend_url}{args.path}", token)
+            else:
+                first = await timed_get(client, f"{backend_url}{args.path}", token)
+                ready = await poll(client, f"{backend_url}/ready")
+            warm = await timed_get(client, f"{backend_url}{args.path}", token)
+    finally:
+        backend.terminate()
+        backend.wait()
+    return {
+        "listen_ms": (listening - start) * 1000,
+        "first_ms": first * 1000,
+        "ready_ms": (ready - start) * 1000,
+        "warm_ms": warm * 1000,
+    }
+
+
+def summarize(samples: list[dict]) -> dict:
+    return {
+        key: {"median": round(statistics.median(s[key] for s in samples), 1), "min": round(min(s[key] for s in samples), 1), "max": round(max(s[key] for s in samples), 1)}
+        for key in samples[0]
+    }
+
+
+# ---------------------------------------------------------------- main
+
+async def main(args) -> int:
+    supabase_port = free_port()
+    supabase_url = f"http://127.0.0.1:{supabase_port}"
+    outbox_path = os.path.join(BENCH_DIR, f".startup_outbox_{os.getpid()}.sqlite3")
+    env = backend_env(supabase_url, args, outbox_path)
+    results = {}
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    results["import"] = summarize([{"process_ms": total * 1000, "import_main_ms": own * 1000} for total, own in imports])
+    print(f"== import: python -c 'import main' {results['import']['process_ms']['median']}ms median "
+          f"(import main alone {results['import']['import_main_ms']['median']}ms) over {args.runs} runs")
+    if args.importtime:
+        results["slowest_imports_ms"] = dict(import_breakdown(env, args.importtime))
+        for name, ms in results["slowest_imports_ms"].items():
+            print(f"   {name:28} {ms:8.1f} ms")
+
+    stand_in = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_supabase.py"), "--port", str(supabase_port),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", "0"],
+        env={**os.environ, "FAKE_SUPABASE_SERVICE_KEY": args.service_key},
+    )
+    try:
+        await wait_until_up(f"{supabase_url}/_bench/stats")
+        async with httpx.AsyncClient() as admin:
+            fixtures = (await admin.post(f"{supabase_url}/_bench/reset", json={"restaurants": 5, "customers": 20, "items_per_restaurant": 20})).json()
+        token = make_token(args.jwt_secret, fixtures["customers"][0])
+        samples = [await cold_start(env, token, args) for _ in range(args.runs)]
+    finally:
+        stand_in.terminate()
+        stand_in.wait()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(outbox_path + suffix):
+                os.remove(outbox_path + suffix)
+
+    results["cold_start"] = summarize(samples)
+    print(f"== cold start: GET {args.path}, {args.runs} runs, stand-in latency {args.latency_ms}ms"
+          + (" (first request after /ready)" if args.wait_ready else ""))
+    for key, stats in results["cold_start"].items():
+        print(f"   {key:10} median {stats['median']:8.1f}  min {stats['min']:8.1f}  max {stats['max']:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="imports and cold starts to measure")
+    parser.add_argument("--path", default="/dashboard/customer", help="request timed after each start")
+    parser.add_argument("--wait-ready", action="store_true", help="send the first request only once /ready passes")
+    parser.add_argument("--importtime", type=int, default=10, help="list this many of main's slowest imports (0 = off)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stand-in latency per Supabase call")
+    parser.add_argument("--jwt-secret", default="bench-jwt-secret-bench-jwt-secret")
+    parser.add_argument("--service-key", default="bench-service-key")
+    parser.add_argument("--json", help="write the results to this file")
+    sys.exit(asyncio.run(main(parser.parse_args())))
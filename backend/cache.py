@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+# In-process LRU cache with a TTL per entry, bounded by entry count and (optionally) total size.
+# Only touched from the event loop, so no locking is needed.
+class TTLCache:
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl: float = 30.0,
+        max_bytes: Optional[int] = None,
+        sizer: Optional[Callable[[Any], int]] = None, # how many bytes a value counts for (needed with max_bytes)
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizer = sizer or (lambda value: 0)
+        self.generation = 0 # bumped on clear() so in-flight fills from before an invalidation are dropped
+        self._data: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict() # key -> (expires_at, size, value)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key) # most recently used
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, generation: Optional[int] = None):
+        if generation is not None and generation != self.generation:
+            return # value was read before the cache was invalidated
+        size = self.sizer(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return # never cache something bigger than the whole cache
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), size, value)
+        self._bytes += size
+        while len(self._data) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return entry[2]
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+        self.generation += 1
+        self.invalidations += 1
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,218 @@
+import base64
+import hashlib
+import json
+import os
+from typing import NamedTuple, Optional
+import orjson
+from fastapi import HTTPException, Response
+
+from cache import TTLCache
+from responses import compress, compressible, negotiate
+from upstream import SUPABASE_URL, coalesced_get, inflight
+
+
+# Item columns customers are allowed to select/filter through /items
+ITEM_FIELDS = {
+    "id",
+    "restaurant_id",
+    "information",
+    "price",
+    "pickup_time",
+    "total_spots",
+    "num_of_reservations",
+    "available_spots", # generated column, see migrations/001_items_catalog.sql
+    "image_url",
+    "status",
+    "location",
+}
+ITEM_STATUSES = {"active", "cancelled", "completed"}
+SORTS = {"pickup_time": "asc", "-pickup_time": "desc"} # keyset pagination runs on (pickup_time, id)
+CATALOG_SCOPE = "catalog" # items are readable by every authenticated user, so concurrent identical reads are shared
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+# Cursor = last row's (pickup_time, id), base64 so it is opaque and URL safe
+def encode_cursor(pickup_time: str, item_id: str) -> str:
+    raw = json.dumps([pickup_time, item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        pickup_time, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(pickup_time), str(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor invalido")
+
+
+# Double-quote a value inside a PostgREST or=/and= tree so commas, dots and parentheses are literal
+def quote_value(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def parse_fields(fields: Optional[str]) -> str:
+    if not fields:
+        return "*"
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in ITEM_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos invalidos: {', '.join(unknown)}")
+    # The cursor is built from pickup_time and id, so they are always returned
+    for key in ("id", "pickup_time"):
+        if key not in requested:
+            requested.append(key)
+    return ",".join(requested)
+
+
+# Translate /items query parameters into PostgREST params (list of tuples so a column can be filtered twice)
+def build_items_params(
+    status: Optional[str] = None,
+    available: Optional[bool] = None,
+    q: Optional[str] = None,
+    pickup_from: Optional[str] = None,
+    pickup_to: Optional[str] = None,
+    restaurant_id: Optional[str] = None,
+    sort: str = "pickup_time",
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> list[tuple[str, str]]:
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"Orden invalido: {sort}")
+    if status is not None and status not in ITEM_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Estado invalido: {status}")
+
+    direction = SORTS[sort]
+    params = [("select", parse_fields(fields))]
+    conditions = [] # or(...) groups, ANDed together at the end
+
+    if status:
+        params.append(("status", f"eq.{status}"))
+    if available is True:
+        params.append(("available_spots", "gt.0"))
+    elif available is False:
+        params.append(("available_spots", "lte.0"))
+    if restaurant_id:
+        params.append(("restaurant_id", f"eq.{restaurant_id}"))
+    if pickup_from:
+        params.append(("pickup_time", f"gte.{pickup_from}"))
+    if pickup_to:
+        params.append(("pickup_time", f"lte.{pickup_to}"))
+    if q and q.strip():
+        pattern = quote_value(f"*{q.strip().lower()}*") # ilike ignores case, lowercase so the cache key is normalized
+        conditions.append(f"or(information.ilike.{pattern},location.ilike.{pattern})")
+    if cursor:
+        last_pickup, last_id = decode_cursor(cursor)
+        op = "gt" if direction == "asc" else "lt"
+        conditions.append(
+            f"or(pickup_time.{op}.{quote_value(last_pickup)},"
+            f"and(pickup_time.eq.{quote_value(last_pickup)},id.{op}.{quote_value(last_id)}))"
+        )
+
+    if conditions:
+        params.append(("and", f"({','.join(conditions)})"))
+
+    params.append(("order", f"pickup_time.{direction},id.{direction}"))
+    params.append(("limit", str(limit + 1))) # one extra row tells us if there is a next page
+    return params
+
+
+# Trim the extra row and build the response envelope
+def paginate(rows: list[dict], limit: int) -> dict:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["pickup_time"], last["id"])
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+# Cache of serialized /items pages, keyed by the normalized PostgREST params
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "15")) # Seconds a page may be served from memory
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "512"))
+CATALOG_CACHE_MAX_BYTES = int(os.getenv("CATALOG_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+class CatalogPage(NamedTuple):
+    body: bytes # JSON body, encoded once and reused for every hit
+    etag: str # strong ETag (hash of body)
+    encoded: dict # content-coding -> compressed body, filled on first request for each coding
+
+
+catalog_cache = TTLCache(
+    "catalog",
+    max_entries=CATALOG_CACHE_MAX_ENTRIES,
+    ttl=CATALOG_CACHE_TTL,
+    max_bytes=CATALOG_CACHE_MAX_BYTES,
+    sizer=lambda page: len(page.body) * 3 // 2, # plus room for the compressed copies
+)
+
+
+def catalog_cache_key(params: list[tuple[str, str]]) -> tuple:
+    return tuple(params) # build_items_params always emits params in the same order
+
+
+def make_page(payload: dict) -> CatalogPage:
+    return raw_page(orjson.dumps(payload))
+
+
+# Page from JSON that is already encoded (e.g. a Supabase response body stored as-is)
+def raw_page(body: bytes) -> CatalogPage:
+    return CatalogPage(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"', encoded={})
+
+
+# If-None-Match can hold several ETags (or *); weak W/ prefixes compare equal per RFC 9110
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def page_response(page: CatalogPage, if_none_match: Optional[str], accept_encoding: Optional[str] = None) -> Response:
+    headers = {"ETag": page.etag, "Cache-Control": "private, no-cache"} # clients must revalidate, 304 keeps it cheap
+    if etag_matches(if_none_match, page.etag):
+        return Response(status_code=304, headers=headers)
+    body = page.body
+    if compressible("application/json", len(body)):
+        headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate(accept_encoding)
+        if encoding is not None: # compressed once per page and coding, then served from memory
+            if encoding not in page.encoded:
+                page.encoded[encoding] = compress(body, encoding)
+            body = page.encoded[encoding]
+            headers["Content-Encoding"] = encoding
+            headers["ETag"] = f"W/{page.etag}"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Called by every endpoint that changes items or their reservation counts
+def invalidate_catalog():
+    catalog_cache.clear()
+    inflight.forget(CATALOG_SCOPE) # requests after the write start a fresh read
+
+
+# Serialized /items page, from the in-process catalog cache when possible
+async def fetch_catalog_page(params: list[tuple[str, str]], limit: int, headers: dict) -> CatalogPage:
+    cache_key = catalog_cache_key(params)
+    generation = catalog_cache.generation
+    page = catalog_cache.get(cache_key)
+    if page is not None:
+        return page
+
+    response = await coalesced_get( # concurrent misses for the same page share one Supabase call
+        f"{SUPABASE_URL}/rest/v1/items", # Supabase table: items
+        headers=headers,
+        params=params,
+        scope=CATALOG_SCOPE,
+    )
+    response.raise_for_status()
+    page = make_page(paginate(orjson.loads(response.content), limit)) # page of items + next_cursor
+    catalog_cache.set(cache_key, page, generation=generation) # skipped if an item changed meanwhile
+    return page
@@ -0,0 +1,134 @@
+import base64
+import json
+import math
+import os
+from typing import Optional
+from fastapi import HTTPException
+
+
+# "Offers near me": items carry latitude/longitude copied from the restaurant profile and a
+# geohash generated from them (migrations/004_geo.sql). A radius query is answered by reading
+# only the handful of geohash cells that cover the circle (index prefix scans), then exact
+# distances, radius filter, sort and pagination run here on those candidates.
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9 # stored precision (~5 m cells); queries use shorter prefixes
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_DEGREE = 111_320.0
+DEFAULT_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 50.0
+MAX_COVER_CELLS = 12 # prefixes per query: more cells hug the circle tighter but add or= branches
+NEARBY_MAX_CANDIDATES = int(os.getenv("NEARBY_MAX_CANDIDATES", "5000")) # safety cap on rows read per query
+
+
+def encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True # even bits split longitude, odd bits latitude
+    while len(chars) < precision:
+        value, bounds = (lng, lng_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            bounds[0] = mid
+        else:
+            bits = bits * 2
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+# Height and width (degrees) of a geohash cell
+def cell_size(precision: int) -> tuple[float, float]:
+    lat_bits = 5 * precision // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+# Geohash prefixes whose cells cover the bounding box of the circle, at the longest precision
+# that needs at most max_cells of them
+def cover(lat: float, lng: float, radius_m: float, max_cells: int = MAX_COVER_CELLS) -> list[str]:
+    dlat = radius_m / METERS_PER_DEGREE
+    dlng = min(radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)), 180.0)
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    west, east = lng - dlng, lng + dlng # may cross the antimeridian, wrapped when encoding
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        first_row, last_row = math.floor((south + 90) / height), math.floor((min(north, 89.999999) + 90) / height)
+        first_col, last_col = math.floor((west + 180) / width), math.floor((east + 180) / width)
+        if (last_row - first_row + 1) * (last_col - first_col + 1) <= max_cells or precision == 1:
+            cells = set()
+            for row in range(first_row, last_row + 1):
+                for col in range(first_col, last_col + 1):
+                    center_lng = (-180 + (col + 0.5) * width + 180) % 360 - 180
+                    cells.add(encode(-90 + (row + 0.5) * height, center_lng, precision))
+            return sorted(cells)
+    return []
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlmb = phi2 - phi1, math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+# Cursor = last row's (distance, id), same opaque base64 encoding as the /items cursor
+def encode_cursor(distance: float, item_id: str) -> str:
+    raw = json.dumps([distance, item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        distance, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(distance), str(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor invalido")
+
+
+# PostgREST params for the active, available items in the covering cells. Ordered by geohash
+# (then id) so that, past the cap, the same candidates are kept on every query and every page;
+# one row over the cap is read so nearby_page can tell "exactly the cap" from "truncated"
+def build_nearby_params(cells: list[str]) -> list[tuple[str, str]]:
+    prefixes = ",".join(f"geohash.like.{cell}*" for cell in cells)
+    return [
+        ("select", "*"),
+        ("status", "eq.active"),
+        ("available_spots", "gt.0"),
+        ("or", f"({prefixes})"),
+        ("order", "geohash.asc,id.asc"),
+        ("limit", str(NEARBY_MAX_CANDIDATES + 1)),
+    ]
+
+
+# Exact distance filter, nearest first (ties by id), keyset pagination on (distance, id).
+# "truncated": the circle held more than NEARBY_MAX_CANDIDATES offers and only the first ones
+# in geohash order were ranked, so nearer offers may be missing: ask again with a smaller radius
+def nearby_page(rows: list[dict], lat: float, lng: float, radius_m: float, cursor: Optional[str], limit: int) -> dict:
+    after = decode_cursor(cursor) if cursor else None
+    truncated = len(rows) > NEARBY_MAX_CANDIDATES
+    rows = rows[:NEARBY_MAX_CANDIDATES]
+    ranked = []
+    for row in rows:
+        if row.get("latitude") is None or row.get("longitude") is None:
+            continue
+        distance = distance_m(lat, lng, row["latitude"], row["longitude"])
+        if distance <= radius_m and (after is None or (distance, row["id"]) > after):
+            ranked.append((distance, row["id"], row))
+    ranked.sort(key=lambda entry: entry[:2])
+
+    page = ranked[:limit]
+    next_cursor = None
+    if len(ranked) > limit:
+        next_cursor = encode_cursor(page[-1][0], page[-1][1])
+    return {
+        "items": [{**row, "distance_m": round(distance, 1)} for distance, _, row in page],
+        "next_cursor": next_cursor,
+        "truncated": truncated,
+    }
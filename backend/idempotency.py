@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Awaitable, Callable, NamedTuple, Optional
+import orjson
+from fastapi import HTTPException, Response
+
+from cache import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+# Idempotency-Key support for the create routes (POST /reservations, POST /restaurant/items).
+# A client that timed out can resend the same request with the same key: if the first one finished,
+# its stored response is replayed; if it is still running here, the duplicate waits for it. Either
+# way the write path (and Supabase) runs once.
+#
+# Results live in an in-process LRU; with IDEMPOTENCY_PATH set they are also written to SQLite, so a
+# restart (deploy) does not forget them. Keys are scoped to the caller and the route.
+# Like the outbox, SQLite is used synchronously from the event loop: local WAL reads/writes of one
+# small row are far cheaper than the Supabase round trips they save.
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600))) # Seconds a result can be replayed
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_PATH = os.getenv("IDEMPOTENCY_PATH", "") # SQLite file, e.g. idempotency.sqlite3; empty = memory only
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "15")) # Seconds a duplicate waits for the first execution
+MAX_KEY_LENGTH = 255
+PURGE_EVERY = 500 # SQLite writes between deletions of expired rows
+UNSTORED_HEADERS = {"content-length", "content-type"} # recomputed / always JSON on replay
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str # hash of the request body the key was first used with
+    status_code: int
+    body: bytes
+    headers: tuple[tuple[str, str], ...] = () # (name, value) pairs the route set, e.g. Retry-After
+
+
+# Only outcomes that a retry would reproduce are stored: successes and client errors. 5xx/408/429
+# mean "try again", so the next attempt with the key runs again.
+def replayable(status_code: int) -> bool:
+    return status_code < 500 and status_code not in (408, 429)
+
+
+def fingerprint(payload) -> str:
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def response_headers(headers) -> tuple[tuple[str, str], ...]:
+    return tuple((name.lower(), value) for name, value in headers if name.lower() not in UNSTORED_HEADERS)
+
+
+def replay(stored: StoredResponse) -> Response:
+    response = Response(
+        content=stored.body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+    # raw_headers rather than headers=: repeated names (set-cookie) survive
+    response.raw_headers.extend((name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers)
+    return response
+
+
+class IdempotencyStore:
+    def __init__(self, path: str = IDEMPOTENCY_PATH):
+        self.path = path
+        self._memory = TTLCache("idempotency", max_entries=IDEMPOTENCY_MAX_ENTRIES, ttl=IDEMPOTENCY_TTL)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self.executed = 0
+        self.replayed = 0
+        self.waited = 0
+        self.conflicts = 0
+
+    # ---------------------------------------------------------------- SQLite (optional)
+
+    def open(self):
+        if not self.path or self._db is not None:
+            return
+        self._db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._db.execute("pragma journal_mode=wal")
+        self._db.execute("pragma synchronous=normal")
+        self._db.execute(
+            """create table if not exists idempotency (
+                key text primary key,
+                fingerprint text not null,
+                status_code integer not null,
+                body blob not null,
+                created_at real not null,
+                headers text not null default '[]'
+            )"""
+        )
+        columns = {row[1] for row in self._db.execute("pragma table_info(idempotency)")}
+        if "headers" not in columns: # file written before headers were stored
+            self._db.execute("alter table idempotency add column headers text not null default '[]'")
+        self._db.execute("delete from idempotency where created_at < ?", (time.time() - IDEMPOTENCY_TTL,))
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # Called from the FastAPI lifespan handler
+    async def start(self):
+        self.open()
+
+    async def stop(self):
+        self.close()
+
+    # ---------------------------------------------------------------- lookups
+
+    def _stored(self, key: str) -> Optional[StoredResponse]:
+        stored = self._memory.get(key)
+        if stored is None and self._db is not None:
+            row = self._db.execute(
+                "select fingerprint, status_code, body, headers from idempotency where key = ? and created_at >= ?",
+                (key, time.time() - IDEMPOTENCY_TTL),
+            ).fetchone()
+            if row is not None:
+                stored = StoredResponse(row[0], row[1], row[2], tuple(map(tuple, orjson.loads(row[3]))))
+                self._memory.set(key, stored)
+        return stored
+
+    def _remember(self, key: str, stored: StoredResponse):
+        self._memory.set(key, stored)
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "insert or replace into idempotency (key, fingerprint, status_code, body, headers, created_at) values (?, ?, ?, ?, ?, ?)",
+                (key, stored.fingerprint, stored.status_code, stored.body, orjson.dumps(stored.headers).decode(), time.time()),
+            )
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self._db.execute("delete from idempotency where created_at < ?", (time.time() - IDEMPOTENCY_TTL,))
+        except sqlite3.Error as e: # the in-memory copy still deduplicates retries on this instance
+            logger.warning("Could not persist idempotency key: %s", e)
+
+    # Run execute() once per (caller, route, key); duplicates get the first execution's response.
+    # execute() returns the route's Response or raises HTTPException, like a normal handler.
+    async def run(
+        self,
+        idempotency_key: Optional[str],
+        scope: str, # "<user_id> <METHOD> <route>"
+        payload, # request body, to detect a key reused for a different request
+        execute: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        if idempotency_key is None:
+            return await execute()
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key invalida")
+
+        key = f"{scope} {idempotency_key}"
+        digest = fingerprint(payload)
+        while True:
+            stored = self._stored(key)
+            if stored is not None:
+                if stored.fingerprint != digest:
+                    self.conflicts += 1
+                    raise HTTPException(status_code=422, detail="Idempotency-Key ya usada con otra solicitud")
+                self.replayed += 1
+                return replay(stored)
+
+            running = self._inflight.get(key)
+            if running is None:
+                break
+            # Same key still running on this instance: wait for it instead of writing twice
+            self.waited += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(running), IDEMPOTENCY_WAIT)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=409, detail="Solicitud en proceso", headers={"Retry-After": "1"})
+            # Loop: replay what it stored, or run it ourselves if its outcome was not replayable (5xx)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.executed += 1
+        try:
+            try:
+                response = await execute()
+            except HTTPException as e:
+                if replayable(e.status_code):
+                    headers = response_headers((e.headers or {}).items())
+                    self._remember(key, StoredResponse(digest, e.status_code, orjson.dumps({"detail": e.detail}), headers))
+                raise
+            if replayable(response.status_code):
+                headers = response_headers((name.decode("latin-1"), value.decode("latin-1")) for name, value in response.raw_headers)
+                self._remember(key, StoredResponse(digest, response.status_code, bytes(response.body), headers))
+            return response
+        finally:
+            del self._inflight[key]
+            future.set_result(None) # wakes the duplicates
+
+    def stats(self) -> dict:
+        return {
+            "persistent": self._db is not None,
+            "entries": len(self._memory),
+            "inflight": len(self._inflight),
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "conflicts": self.conflicts,
+        }
+
+
+idempotency = IdempotencyStore()
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+from typing import Optional
+from fastapi import HTTPException, Request
+
+from upstream import SUPABASE_URL, SUPABASE_KEY, get_client
+
+
+# Item photos and profile pictures are uploaded to the backend, validated, resized into a few
+# WebP/JPEG variants in a process pool (Pillow is CPU bound and would stall the event loop) and
+# stored content-addressed: the same upload twice is stored once, and URLs never change, so
+# browsers and CDNs may cache them forever.
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024))) # Upload size limit
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000))) # Decompression bomb guard
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1)))) # Resize processes
+IMAGE_STORAGE = os.getenv("IMAGE_STORAGE", "supabase") # "supabase" (Storage bucket) or "local"
+IMAGE_BUCKET = os.getenv("IMAGE_BUCKET", "item-images")
+IMAGE_LOCAL_DIR = os.getenv("IMAGE_LOCAL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "media"))
+IMAGE_PUBLIC_URL = os.getenv("IMAGE_PUBLIC_URL", "/media") # Where the local backend's files are served from
+VARIANTS = {"thumb": 160, "card": 480, "full": 1280} # name -> longest edge in pixels (never upscaled)
+FORMATS = {"webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}), "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True})}
+SIGNATURES = {b"\xff\xd8\xff": "jpeg", b"\x89PNG\r\n\x1a\n": "png"} # plus RIFF....WEBP, checked below
+CACHE_CONTROL = "public, max-age=31536000, immutable" # content-addressed: a URL always serves the same bytes
+
+
+class ImageRejected(ValueError):
+    pass
+
+
+def sniff(data: bytes) -> Optional[str]:
+    for signature, kind in SIGNATURES.items():
+        if data.startswith(signature):
+            return kind
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+# Runs in a worker process: decode once, then encode every variant in every format
+def render_variants(data: bytes) -> dict:
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            if source.format not in ("JPEG", "PNG", "WEBP"):
+                raise ImageRejected(f"Formato no soportado: {source.format}")
+            if source.width * source.height > IMAGE_MAX_PIXELS:
+                raise ImageRejected("Imagen demasiado grande")
+            image = ImageOps.exif_transpose(source) # apply the camera rotation; EXIF (GPS etc.) is not copied
+            image.load()
+    except ImageRejected:
+        raise
+    except Exception: # truncated/corrupt files, decompression bombs
+        raise ImageRejected("Imagen invalida o dañada")
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    rendered = {}
+    for name, edge in VARIANTS.items():
+        variant = image.copy()
+        variant.thumbnail((edge, edge), Image.LANCZOS)
+        files = {}
+        for ext, (pil_format, _, options) in FORMATS.items():
+            frame = variant
+            if pil_format == "JPEG" and has_alpha: # JPEG has no alpha: flatten onto white
+                frame = Image.new("RGB", variant.size, (255, 255, 255))
+                frame.paste(variant, mask=variant.getchannel("A"))
+            buffer = io.BytesIO()
+            frame.save(buffer, pil_format, **options)
+            files[ext] = buffer.getvalue()
+        rendered[name] = {"width": variant.width, "height": variant.height, "files": files}
+    return rendered
+
+
+# ---------------------------------------------------------------- storage
+
+class LocalStorage:
+    def __init__(self, root: str = IMAGE_LOCAL_DIR, public_url: str = IMAGE_PUBLIC_URL):
+        self.root = root
+        self.public_url = public_url.rstrip("/")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path) # readers never see a half-written file
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def put(self, key: str, data: bytes, content_type: str):
+        await asyncio.to_thread(self._write, key, data)
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+
+class SupabaseStorage:
+    def __init__(self, bucket: str = IMAGE_BUCKET):
+        self.bucket = bucket
+
+    def _headers(self) -> dict:
+        return {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        res = await get_client().get(f"{SUPABASE_URL}/storage/v1/object/{self.bucket}/{key}", headers=self._headers())
+        if res.status_code in (400, 404): # Storage answers 400 "Object not found" for missing keys
+            return None
+        res.raise_for_status()
+        return res.content
+
+    async def put(self, key: str, data: bytes, content_type: str):
+        res = await get_client().post(
+            f"{SUPABASE_URL}/storage/v1/object/{self.bucket}/{key}",
+            headers={**self._headers(), "Content-Type": content_type, "Cache-Control": CACHE_CONTROL, "x-upsert": "true"},
+            content=data,
+        )
+        res.raise_for_status()
+
+    def url(self, key: str) -> str:
+        return f"{SUPABASE_URL}/storage/v1/object/public/{self.bucket}/{key}"
+
+
+def create_storage():
+    if IMAGE_STORAGE == "local":
+        return LocalStorage()
+    if IMAGE_STORAGE == "supabase":
+        return SupabaseStorage()
+    raise RuntimeError(f"Unknown IMAGE_STORAGE {IMAGE_STORAGE!r}")
+
+
+# ---------------------------------------------------------------- pipeline
+
+class ImagePipeline:
+    def __init__(self, storage):
+        self.storage = storage
+        self._pool = None # ProcessPoolExecutor, created by the first upload
+        self.processed = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    # Uploads are rare next to reads: multiprocessing is imported and the pool created on first use,
+    # not at startup (cold starts on a spun-down instance pay only for what the request needs)
+    def _executor(self):
+        if self._pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn: forking a process that runs an event loop and threads is not safe
+            self._pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    # Called from the FastAPI lifespan handler
+    async def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # Stream the request body into memory, refusing anything over IMAGE_MAX_BYTES as soon as we see it
+    async def read_upload(self, request: Request) -> bytes:
+        content_type = request.headers.get("content-type", "")
+        if not content_type.startswith("image/"):
+            raise HTTPException(status_code=415, detail="Se espera una imagen (JPEG, PNG o WebP)")
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > IMAGE_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Imagen demasiado grande")
+        body = bytearray()
+        async for chunk in request.stream():
+            body += chunk
+            if len(body) > IMAGE_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Imagen demasiado grande")
+        if not body:
+            raise HTTPException(status_code=400, detail="Imagen vacia")
+        return bytes(body)
+
+    # Returns {"thumb": {"width", "height", "webp": url, "jpeg": url}, "card": ..., "full": ...}
+    async def process(self, data: bytes) -> dict:
+        if sniff(data) is None:
+            self.rejected += 1
+            raise HTTPException(status_code=415, detail="Se espera una imagen (JPEG, PNG o WebP)")
+
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        manifest_key = f"images/{digest}/manifest.json"
+        manifest = await self.storage.get(manifest_key)
+        if manifest is not None: # same bytes uploaded before: reuse the stored variants
+            self.deduplicated += 1
+            return json.loads(manifest)
+
+        loop = asyncio.get_running_loop()
+        try:
+            rendered = await loop.run_in_executor(self._executor(), render_variants, data)
+        except ImageRejected as e:
+            self.rejected += 1
+            raise HTTPException(status_code=400, detail=str(e))
+
+        variants = {}
+        uploads = []
+        for name, variant in rendered.items():
+            variants[name] = {"width": variant["width"], "height": variant["height"]}
+            for ext, content in variant["files"].items():
+                key = f"images/{digest}/{name}.{ext}"
+                uploads.append(self.storage.put(key, content, FORMATS[ext][1]))
+                variants[name][ext] = self.storage.url(key)
+                self.bytes_out += len(content)
+        await asyncio.gather(*uploads)
+        # Written last: its presence means every variant is stored
+        await self.storage.put(manifest_key, json.dumps(variants, separators=(",", ":")).encode(), "application/json")
+        self.processed += 1
+        self.bytes_in += len(data)
+        return variants
+
+    def stats(self) -> dict:
+        return {
+            "storage": type(self.storage).__name__,
+            "processed": self.processed,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+
+images = ImagePipeline(create_storage())
@@ -0,0 +1,292 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+import httpx
+
+
+# Prometheus metrics for routes and Supabase round trips, scraped from GET /metrics.
+# Label children are bound once per (route, method, status) / (target, method) and reused,
+# so the hot path is a dict lookup plus a few float adds.
+# prometheus_client is imported and the metrics created on first use (the first request or Supabase
+# call), not when main is imported: a cold start only pays for it once there is something to record.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+CALLS_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+
+
+class Instruments:
+    def __init__(self):
+        from prometheus_client import Counter, Gauge, Histogram, disable_created_metrics
+
+        disable_created_metrics() # no *_created series: smaller scrapes
+        self.http_latency = Histogram(
+            "http_request_duration_seconds", "Request latency by route template and status",
+            ["route", "method", "status"], buckets=LATENCY_BUCKETS,
+        )
+        self.http_in_flight = Gauge("http_requests_in_flight", "Requests currently being served")
+        self.http_exceptions = Counter(
+            "http_request_exceptions_total", "Unhandled exceptions by route (answered as 500)",
+            ["route", "method", "exception"],
+        )
+        self.http_upstream_calls = Histogram(
+            "http_request_supabase_calls", "Supabase round trips made while serving one request",
+            ["route", "method"], buckets=CALLS_BUCKETS,
+        )
+        self.upstream_latency = Histogram(
+            "supabase_request_duration_seconds", "Supabase call latency (until the body is read) by table/RPC",
+            ["target", "method", "status"], buckets=LATENCY_BUCKETS,
+        )
+        self.upstream_in_flight = Gauge("supabase_requests_in_flight", "Supabase calls currently waiting on a response")
+        self.upstream_errors = Counter(
+            "supabase_request_errors_total", "Supabase calls that failed (5xx or transport error)",
+            ["target", "method", "error"],
+        )
+        self._route_children: dict = {}
+        self._calls_children: dict = {}
+        self._upstream_children: dict = {}
+
+    def route_latency(self, route: str, method: str, status: int):
+        key = (route, method, status)
+        child = self._route_children.get(key)
+        if child is None:
+            child = self._route_children[key] = self.http_latency.labels(route, method, str(status))
+        return child
+
+    def route_calls(self, route: str, method: str):
+        key = (route, method)
+        child = self._calls_children.get(key)
+        if child is None:
+            child = self._calls_children[key] = self.http_upstream_calls.labels(route, method)
+        return child
+
+    def upstream_latency_child(self, target: str, method: str, status: int):
+        key = (target, method, status)
+        child = self._upstream_children.get(key)
+        if child is None:
+            child = self._upstream_children[key] = self.upstream_latency.labels(target, method, str(status))
+        return child
+
+
+_instruments: Optional[Instruments] = None
+_upstream_calls: ContextVar[Optional[list]] = ContextVar("upstream_calls", default=None) # [count] for the current request
+
+
+def instruments() -> Instruments:
+    global _instruments
+    if _instruments is None:
+        _instruments = Instruments()
+        if _stats_collector is not None: # registered before prometheus_client was loaded
+            _register(_stats_collector)
+    return _instruments
+
+
+# "/rest/v1/items" -> "items", "/rest/v1/rpc/reserve_item" -> "rpc/reserve_item", "/auth/v1/..." -> "auth"
+def upstream_target(path: str) -> str:
+    if path.startswith("/rest/v1/"):
+        return path[len("/rest/v1/"):].strip("/") or "root"
+    if path.startswith("/auth/"):
+        return "auth"
+    if path.startswith("/storage/"):
+        return "storage"
+    return "other"
+
+
+# ASGI middleware: latency per route template (not raw path, so ids don't explode label cardinality)
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500 # stays 500 if the app raises before sending headers
+        calls = [0]
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = instruments()
+        token = _upstream_calls.set(calls)
+        metrics.http_in_flight.inc()
+        start = time.perf_counter()
+        exception = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            exception = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.http_in_flight.dec()
+            _upstream_calls.reset(token)
+            route = scope.get("route") # set by the router once a route matched
+            route = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            metrics.route_latency(route, method, status).observe(elapsed)
+            metrics.route_calls(route, method).observe(calls[0])
+            if exception is not None:
+                metrics.http_exceptions.labels(route, method, type(exception).__name__).inc()
+
+
+# Response body wrapper: stops the upstream timer when the body has been read (or dropped)
+class _TimedStream(httpx.AsyncByteStream):
+    __slots__ = ("_stream", "_start", "_target", "_method", "_status", "_done")
+
+    def __init__(self, stream, start: float, target: str, method: str, status: int):
+        self._stream = stream
+        self._start = start
+        self._target = target
+        self._method = method
+        self._status = status
+        self._done = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._done:
+                self._done = True
+                _upstream_done(self._target, self._method, self._status, self._start)
+
+
+def _upstream_done(target: str, method: str, status: int, start: float):
+    metrics = instruments()
+    metrics.upstream_in_flight.dec()
+    metrics.upstream_latency_child(target, method, status).observe(time.perf_counter() - start)
+
+
+# httpx transport wrapper: times every Supabase call made through the shared client
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        calls = _upstream_calls.get()
+        if calls is not None:
+            calls[0] += 1
+        target = upstream_target(request.url.path)
+        method = request.method
+        metrics = instruments()
+        metrics.upstream_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e: # includes CancelledError (hedged duplicates that lost)
+            metrics.upstream_in_flight.dec()
+            metrics.upstream_errors.labels(target, method, type(e).__name__).inc()
+            raise
+        if response.status_code >= 500:
+            metrics.upstream_errors.labels(target, method, str(response.status_code)).inc()
+        if isinstance(response.stream, httpx.ByteStream):
+            _upstream_done(target, method, response.status_code, start) # body already in memory
+        else:
+            response.stream = _TimedStream(response.stream, start, target, method, response.status_code)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+# Cache / hub / outbox counters read at scrape time (the same numbers as GET /cache/stats)
+class StatsCollector:
+    def __init__(self, caches: list, hub, outbox, inflight, upstream_stats, rate_limit_stats):
+        self.caches = caches
+        self.hub = hub
+        self.outbox = outbox
+        self.inflight = inflight
+        self.upstream_stats = upstream_stats
+        self.rate_limit_stats = rate_limit_stats
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily # loaded by instruments() already
+
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        evictions = CounterMetricFamily("cache_evictions", "Entries evicted by size limits", labels=["cache"])
+        invalidations = CounterMetricFamily("cache_invalidations", "Explicit invalidations", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entries currently cached", labels=["cache"])
+        size = GaugeMetricFamily("cache_bytes", "Approximate bytes cached", labels=["cache"])
+        for cache in self.caches:
+            stats = cache.stats()
+            hits.add_metric([cache.name], stats["hits"])
+            misses.add_metric([cache.name], stats["misses"])
+            evictions.add_metric([cache.name], stats["evictions"])
+            invalidations.add_metric([cache.name], stats["invalidations"])
+            entries.add_metric([cache.name], stats["entries"])
+            size.add_metric([cache.name], stats["bytes"])
+        yield from (hits, misses, evictions, invalidations, entries, size)
+
+        coalescing = self.inflight.stats()
+        yield CounterMetricFamily("supabase_coalesced_reads", "GETs that joined an identical in-flight call", value=coalescing["coalesced"])
+        yield GaugeMetricFamily("supabase_coalescing_in_flight", "Shared GETs currently in flight", value=coalescing["in_flight"])
+
+        upstream = self.upstream_stats()
+        yield GaugeMetricFamily("supabase_circuit_open", "1 while the Supabase circuit breaker is failing fast", value=int(upstream["circuit"] != "closed"))
+        yield CounterMetricFamily("supabase_circuit_rejected", "Calls failed fast by the circuit breaker", value=upstream["fast_failures"])
+        yield CounterMetricFamily("supabase_retries", "Retried safe calls", value=upstream["retries"])
+        yield CounterMetricFamily("supabase_hedges", "Hedged duplicate GETs sent", value=upstream["hedges"])
+        yield CounterMetricFamily("supabase_hedge_wins", "Hedged GETs that answered first", value=upstream["hedge_wins"])
+        yield CounterMetricFamily("supabase_deadline_exceeded", "Calls cut off by the request time budget", value=upstream["deadline_exceeded"])
+        concurrency = upstream["concurrency"]
+        yield GaugeMetricFamily("supabase_concurrency_limit", "Supabase calls allowed in flight at once", value=concurrency["limit"])
+        yield CounterMetricFamily("supabase_concurrency_queued", "Calls that waited for a free slot", value=concurrency["queued"])
+        yield CounterMetricFamily("supabase_concurrency_shed", "Calls rejected (429) with every slot busy", value=concurrency["shed"])
+
+        rate_limits = self.rate_limit_stats()
+        limited = CounterMetricFamily("rate_limited_requests", "Requests rejected (429) by the per-caller rate limit", labels=["route_class"])
+        for name in rate_limits["limits"]:
+            limited.add_metric([name], rate_limits["limited"].get(name, 0))
+        yield limited
+        yield GaugeMetricFamily("rate_limit_callers", "Callers with a rate limit bucket in memory", value=rate_limits["callers"])
+
+        hub_stats = self.hub.stats()
+        yield GaugeMetricFamily("notification_stream_connections", "Open SSE/WebSocket connections", value=hub_stats["connections"])
+        yield CounterMetricFamily("notification_events_published", "Notifications pushed to the hub", value=hub_stats["published"])
+        yield CounterMetricFamily("notification_events_dropped", "Notifications dropped on slow connections", value=hub_stats["dropped"])
+
+        outbox_stats = self.outbox.stats()
+        if outbox_stats["pending"] is not None:
+            yield GaugeMetricFamily("notification_outbox_pending", "Notifications waiting to be inserted", value=outbox_stats["pending"])
+        yield CounterMetricFamily("notification_outbox_flushed", "Notifications inserted into Supabase", value=outbox_stats["flushed"])
+        yield CounterMetricFamily("notification_outbox_failed_batches", "Outbox batches that failed", value=outbox_stats["failed_batches"])
+        yield CounterMetricFamily("notification_outbox_dead", "Notifications given up on", value=outbox_stats["dead"])
+
+
+_stats_collector: Optional[StatsCollector] = None
+
+
+_registered: Optional[StatsCollector] = None
+
+
+def _register(collector: StatsCollector):
+    global _registered
+    from prometheus_client import REGISTRY
+
+    if _registered is not None:
+        REGISTRY.unregister(_registered)
+    REGISTRY.register(collector)
+    _registered = collector
+
+
+# Called by main.create_app(); an app built again (tests, benchmarks) replaces the previous collector.
+# Only remembered here until prometheus_client is loaded (see instruments())
+def register_stats(caches: list, hub, outbox, inflight, upstream_stats, rate_limit_stats):
+    global _stats_collector
+    _stats_collector = StatsCollector(caches, hub, outbox, inflight, upstream_stats, rate_limit_stats)
+    if _instruments is not None:
+        _register(_stats_collector)
+
+
+def render() -> tuple[bytes, str]:
+    instruments()
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,20 @@
+-- Catalog support for GET /items
+-- Run in the Supabase SQL editor (or psql) before deploying the paginated /items endpoint.
+
+-- PostgREST can't compare two columns in a filter, so expose the remaining spots as a column
+alter table public.items
+    add column if not exists available_spots integer
+    generated always as (total_spots - coalesce(num_of_reservations, 0)) stored;
+
+-- Keyset pagination: (pickup_time, id) in both directions
+create index if not exists items_pickup_time_id_idx
+    on public.items (pickup_time, id);
+
+-- Customer catalog: active offers with spots left, ordered by pickup time
+create index if not exists items_active_available_pickup_idx
+    on public.items (pickup_time, id)
+    where status = 'active' and available_spots > 0;
+
+-- Restaurant dashboard: items by owner
+create index if not exists items_restaurant_id_idx
+    on public.items (restaurant_id);
@@ -0,0 +1,72 @@
+-- Atomic reservation creation for POST /reservations
+-- Checks capacity, inserts the reservation and bumps items.num_of_reservations in one transaction,
+-- so the endpoint makes a single round trip and concurrent customers can't oversell an item.
+--
+-- Errors are raised with PostgREST "PTxxx" SQLSTATEs so they come back as that HTTP status:
+--   PT400 invalid quantity, PT403 reserving for someone else, PT404 item not found,
+--   PT409 sold out / not enough spots (detail holds the spots left), PT410 item no longer active
+
+create or replace function public.reserve_item(
+    item_uuid uuid,
+    customer_uuid uuid,
+    reserve_quantity integer default 1,
+    reserved_at timestamptz default now()
+)
+returns setof public.reservations
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    spots_total integer;
+    spots_taken integer;
+    spots_left integer;
+    item_status text;
+begin
+    if reserve_quantity is null or reserve_quantity < 1 then
+        raise exception 'invalid_quantity' using errcode = 'PT400', detail = 'Quantity must be at least 1';
+    end if;
+
+    -- Callers coming through the API can only reserve for themselves
+    if auth.uid() is not null and customer_uuid is distinct from auth.uid() then
+        raise exception 'forbidden' using errcode = 'PT403';
+    end if;
+
+    -- Unlocked pre-check: once an item is sold out, late requests fail without queueing on the row lock
+    select total_spots - coalesce(num_of_reservations, 0) into spots_left from items where id = item_uuid;
+    if found and spots_left < reserve_quantity then
+        raise exception 'sold_out' using errcode = 'PT409', detail = greatest(spots_left, 0)::text;
+    end if;
+
+    -- Lock the item row: concurrent reservations for the same item queue up here
+    select total_spots, coalesce(num_of_reservations, 0), status
+      into spots_total, spots_taken, item_status
+      from items
+     where id = item_uuid
+       for update;
+
+    if not found then
+        raise exception 'item_not_found' using errcode = 'PT404';
+    end if;
+
+    if item_status is distinct from 'active' then
+        raise exception 'item_not_active' using errcode = 'PT410', detail = item_status;
+    end if;
+
+    if spots_total - spots_taken < reserve_quantity then
+        raise exception 'sold_out' using errcode = 'PT409', detail = greatest(spots_total - spots_taken, 0)::text;
+    end if;
+
+    update items
+       set num_of_reservations = spots_taken + reserve_quantity
+     where id = item_uuid;
+
+    return query
+        insert into reservations (customer_id, item_id, "timestamp", status, quantity)
+        values (customer_uuid, item_uuid, coalesce(reserved_at, now()), 'active', reserve_quantity)
+        returning *;
+end;
+$$;
+
+revoke all on function public.reserve_item(uuid, uuid, integer, timestamptz) from public;
+grant execute on function public.reserve_item(uuid, uuid, integer, timestamptz) to authenticated;
@@ -0,0 +1,168 @@
+-- Hot/cold split for items and reservations (used by archive.py and POST /update-archive)
+-- Finished rows are moved to *_archive tables in bounded chunks, one transaction per chunk,
+-- so the live tables behind /items and /reservations only hold current data.
+--
+-- archive_chunk() moves at most batch_size rows per call:
+--   phase "items":        items past pickup_time + grace, oldest first, together with all of their
+--                         reservations (still-active ones are no-shows and are archived as cancelled)
+--   phase "reservations": cancelled/completed reservations older than now() - grace on items still live
+--   phase "idle":         nothing left to move
+-- Progress is kept in archive_checkpoints ((pickup_time|timestamp, id) of the last moved row), so an
+-- interrupted run resumes where it stopped. A phase's checkpoint is cleared once it has caught up.
+
+create table if not exists public.items_archive (like public.items);
+alter table public.items_archive add column if not exists archived_at timestamptz not null default now();
+do $$ begin
+    alter table public.items_archive add primary key (id);
+exception when invalid_table_definition then null; -- already has one
+end $$;
+
+create table if not exists public.reservations_archive (like public.reservations);
+alter table public.reservations_archive add column if not exists archived_at timestamptz not null default now();
+do $$ begin
+    alter table public.reservations_archive add primary key (id);
+exception when invalid_table_definition then null;
+end $$;
+
+create index if not exists reservations_archive_customer_id_idx on public.reservations_archive (customer_id);
+create index if not exists items_archive_restaurant_id_idx on public.items_archive (restaurant_id);
+
+-- Chunk scans for the reservations phase: (timestamp, id) keyset
+create index if not exists reservations_timestamp_id_idx on public.reservations ("timestamp", id);
+create index if not exists reservations_item_id_idx on public.reservations (item_id);
+
+create table if not exists public.archive_checkpoints (
+    phase text primary key,
+    last_time timestamptz,
+    last_id uuid,
+    rows_moved bigint not null default 0,
+    updated_at timestamptz not null default now()
+);
+insert into public.archive_checkpoints (phase) values ('items'), ('reservations') on conflict do nothing;
+
+-- Archive tables are only written by archive_chunk(); clients don't read them through the API
+alter table public.items_archive enable row level security;
+alter table public.reservations_archive enable row level security;
+alter table public.archive_checkpoints enable row level security;
+
+
+create or replace function public.archive_chunk(
+    batch_size integer default 500,
+    grace interval default interval '2 hours'
+)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    cutoff timestamptz := now() - grace;
+    cp_time timestamptz;
+    cp_id uuid;
+    ids uuid[];
+    chunk_last_time timestamptz; -- (time, id) of the last row in this chunk
+    chunk_last_id uuid;
+    moved_items integer := 0;
+    moved_reservations integer := 0;
+    caught_up boolean;
+    item_columns text;
+    reservation_columns text;
+begin
+    -- One archiver at a time across all backend instances; the others return right away
+    if not pg_try_advisory_xact_lock(hashtext('public.archive_chunk')) then
+        return jsonb_build_object('phase', 'locked', 'items', 0, 'reservations', 0, 'caught_up', true);
+    end if;
+
+    -- Copy by column name, not position: archived_at sits after the columns the archive had when it
+    -- was created, and later migrations append to both tables. Every live column is listed, so one
+    -- missing from the archive fails the chunk (rolled back) instead of silently being dropped.
+    select string_agg(quote_ident(a.attname), ', ' order by a.attnum) into item_columns
+      from pg_attribute a where a.attrelid = 'public.items'::regclass and a.attnum > 0 and not a.attisdropped;
+    select string_agg(quote_ident(a.attname), ', ' order by a.attnum) into reservation_columns
+      from pg_attribute a where a.attrelid = 'public.reservations'::regclass and a.attnum > 0 and not a.attisdropped;
+
+    -- Phase 1: items past pickup, with their reservations
+    select c.last_time, c.last_id into cp_time, cp_id from archive_checkpoints c where c.phase = 'items';
+
+    select array_agg(chunk.id order by chunk.pickup_time, chunk.id),
+           (array_agg(chunk.pickup_time order by chunk.pickup_time desc, chunk.id desc))[1],
+           (array_agg(chunk.id order by chunk.pickup_time desc, chunk.id desc))[1]
+      into ids, chunk_last_time, chunk_last_id
+      from (
+        select i.id, i.pickup_time
+          from items i
+         where i.pickup_time < cutoff
+           and (cp_time is null or (i.pickup_time, i.id) > (cp_time, cp_id))
+         order by i.pickup_time, i.id
+         limit batch_size
+           for update skip locked
+      ) chunk;
+
+    if ids is not null then
+        update reservations set status = 'cancelled' where item_id = any(ids) and status = 'active';
+        execute format(
+            'with moved as (delete from reservations where item_id = any($1) returning *)
+             insert into reservations_archive (%1$s, archived_at) select %1$s, now() from moved on conflict (id) do nothing',
+            reservation_columns) using ids;
+        get diagnostics moved_reservations = row_count;
+
+        update items set status = 'completed' where id = any(ids) and status = 'active';
+        execute format(
+            'with moved as (delete from items where id = any($1) returning *)
+             insert into items_archive (%1$s, archived_at) select %1$s, now() from moved on conflict (id) do nothing',
+            item_columns) using ids;
+        get diagnostics moved_items = row_count;
+
+        caught_up := cardinality(ids) < batch_size;
+        update archive_checkpoints c
+           set last_time = case when caught_up then null else chunk_last_time end,
+               last_id = case when caught_up then null else chunk_last_id end,
+               rows_moved = c.rows_moved + moved_items + moved_reservations,
+               updated_at = now()
+         where c.phase = 'items';
+        return jsonb_build_object('phase', 'items', 'items', moved_items, 'reservations', moved_reservations, 'caught_up', caught_up);
+    end if;
+    update archive_checkpoints c set last_time = null, last_id = null where c.phase = 'items' and c.last_time is not null;
+
+    -- Phase 2: finished reservations whose item is still live
+    select c.last_time, c.last_id into cp_time, cp_id from archive_checkpoints c where c.phase = 'reservations';
+
+    select array_agg(chunk.id),
+           (array_agg(chunk."timestamp" order by chunk."timestamp" desc, chunk.id desc))[1],
+           (array_agg(chunk.id order by chunk."timestamp" desc, chunk.id desc))[1]
+      into ids, chunk_last_time, chunk_last_id
+      from (
+        select r.id, r."timestamp"
+          from reservations r
+         where r."timestamp" < cutoff
+           and r.status in ('cancelled', 'completed')
+           and (cp_time is null or (r."timestamp", r.id) > (cp_time, cp_id))
+         order by r."timestamp", r.id
+         limit batch_size
+           for update skip locked
+      ) chunk;
+
+    if ids is not null then
+        execute format(
+            'with moved as (delete from reservations where id = any($1) returning *)
+             insert into reservations_archive (%1$s, archived_at) select %1$s, now() from moved on conflict (id) do nothing',
+            reservation_columns) using ids;
+        get diagnostics moved_reservations = row_count;
+
+        caught_up := cardinality(ids) < batch_size;
+        update archive_checkpoints c
+           set last_time = case when caught_up then null else chunk_last_time end,
+               last_id = case when caught_up then null else chunk_last_id end,
+               rows_moved = c.rows_moved + moved_reservations,
+               updated_at = now()
+         where c.phase = 'reservations';
+        return jsonb_build_object('phase', 'reservations', 'items', 0, 'reservations', moved_reservations, 'caught_up', caught_up);
+    end if;
+    update archive_checkpoints c set last_time = null, last_id = null where c.phase = 'reservations' and c.last_time is not null;
+
+    return jsonb_build_object('phase', 'idle', 'items', 0, 'reservations', 0, 'caught_up', true);
+end;
+$$;
+
+revoke all on function public.archive_chunk(integer, interval) from public;
+grant execute on function public.archive_chunk(integer, interval) to service_role;
@@ -0,0 +1,80 @@
+-- Coordinates and spatial index for GET /items/nearby
+-- Restaurants set latitude/longitude on their profile; items copy them at creation (see main.py).
+-- items.geohash is generated from the coordinates, so a radius query becomes a few btree prefix
+-- scans (geohash like 'abc%') over the covering cells instead of a scan of the whole catalog.
+
+alter table public.profiles
+    add column if not exists latitude double precision check (latitude between -90 and 90),
+    add column if not exists longitude double precision check (longitude between -180 and 180);
+
+alter table public.items
+    add column if not exists latitude double precision check (latitude between -90 and 90),
+    add column if not exists longitude double precision check (longitude between -180 and 180);
+
+
+-- Standard base32 geohash; must match geo.encode() in the backend
+create or replace function public.geohash_encode(lat double precision, lng double precision, chars integer default 9)
+returns text
+language plpgsql
+immutable
+parallel safe
+as $$
+declare
+    alphabet constant text := '0123456789bcdefghjkmnpqrstuvwxyz';
+    lat_lo double precision := -90;
+    lat_hi double precision := 90;
+    lng_lo double precision := -180;
+    lng_hi double precision := 180;
+    mid double precision;
+    result text := '';
+    bits integer := 0;
+    bit_count integer := 0;
+    even boolean := true; -- even bits split longitude, odd bits latitude
+begin
+    if lat is null or lng is null then
+        return null;
+    end if;
+    while length(result) < chars loop
+        if even then
+            mid := (lng_lo + lng_hi) / 2;
+            if lng >= mid then bits := bits * 2 + 1; lng_lo := mid; else bits := bits * 2; lng_hi := mid; end if;
+        else
+            mid := (lat_lo + lat_hi) / 2;
+            if lat >= mid then bits := bits * 2 + 1; lat_lo := mid; else bits := bits * 2; lat_hi := mid; end if;
+        end if;
+        even := not even;
+        bit_count := bit_count + 1;
+        if bit_count = 5 then
+            result := result || substr(alphabet, bits + 1, 1);
+            bits := 0;
+            bit_count := 0;
+        end if;
+    end loop;
+    return result;
+end;
+$$;
+
+alter table public.items
+    add column if not exists geohash text
+    generated always as (public.geohash_encode(latitude, longitude, 9)) stored;
+
+-- Only bookable offers are searched by location; text_pattern_ops lets LIKE 'prefix%' use the index
+create index if not exists items_active_available_geohash_idx
+    on public.items (geohash text_pattern_ops)
+    where status = 'active' and available_spots > 0;
+
+-- Backfill existing items from their restaurant's profile (once coordinates have been set)
+update public.items i
+   set latitude = p.latitude,
+       longitude = p.longitude
+  from public.profiles p
+ where p.user_id = i.restaurant_id
+   and i.latitude is null
+   and p.latitude is not null;
+
+-- Keep the archive's columns in step with items (archive_chunk copies every column across); plain
+-- columns there: archived rows are never searched by location and keep the geohash they had
+alter table public.items_archive
+    add column if not exists latitude double precision,
+    add column if not exists longitude double precision,
+    add column if not exists geohash text;
@@ -0,0 +1,14 @@
+-- Resized image variants (see images.py)
+-- image_url / profile_picture keep pointing at one variant (the 480px JPEG "card") for old clients;
+-- the *_variants columns hold every size and format so the frontend can pick via srcset:
+--   {"thumb": {"width": 160, "height": 120, "webp": "https://...", "jpeg": "https://..."}, "card": {...}, "full": {...}}
+
+alter table public.items
+    add column if not exists image_variants jsonb;
+
+alter table public.profiles
+    add column if not exists picture_variants jsonb;
+
+-- archive_chunk copies every items column across
+alter table public.items_archive
+    add column if not exists image_variants jsonb;
@@ -0,0 +1,12 @@
+-- Reservation lists (GET /reservations, GET /restaurant/items/{id}/reservations)
+-- Both are filtered by owner (+ optional status) and paged newest first on ("timestamp", id),
+-- so each page is a short index range scan no matter how long the history is.
+
+create index if not exists reservations_customer_status_timestamp_idx
+    on public.reservations (customer_id, status, "timestamp" desc, id desc);
+
+create index if not exists reservations_customer_timestamp_idx
+    on public.reservations (customer_id, "timestamp" desc, id desc);
+
+create index if not exists reservations_item_status_timestamp_idx
+    on public.reservations (item_id, status, "timestamp" desc, id desc);
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import secrets
+from collections import deque
+from typing import Optional
+from fastapi import WebSocket, WebSocketDisconnect
+
+
+# In-process fan-out of new notifications to connected dashboards (SSE / WebSocket)
+HUB_REPLAY_PER_USER = int(os.getenv("NOTIFICATION_REPLAY_PER_USER", "50")) # Recent events kept per user for resume
+HUB_MAX_USERS = int(os.getenv("NOTIFICATION_REPLAY_MAX_USERS", "20000")) # Users with a replay buffer (LRU beyond this)
+HUB_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "100")) # Undelivered events per connection before it is dropped
+HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATION_HEARTBEAT_SECONDS", "15")) # Keeps idle connections open through proxies
+
+
+class Subscription:
+    __slots__ = ("user_id", "queue", "lagged")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=HUB_QUEUE_SIZE)
+        self.lagged = False # set when the queue overflowed; the client must resume from its last token
+
+
+class RecentEvents:
+    __slots__ = ("events", "horizon")
+
+    def __init__(self):
+        self.events: deque = deque(maxlen=HUB_REPLAY_PER_USER) # (seq, notification)
+        self.horizon = 0 # newest seq that fell out of the buffer; resuming from before it can't be replayed
+
+
+class NotificationHub:
+    def __init__(self):
+        self.epoch = secrets.token_hex(4) # resume tokens from a previous process start are rejected
+        self._seq = 0
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._recent: dict[str, RecentEvents] = {} # insertion ordered, so the first user is the least recently notified
+        self._evicted_horizon = 0 # newest seq of any buffer dropped by the LRU
+        self.published = 0
+        self.dropped = 0
+
+    def token(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def parse_token(self, token: Optional[str]) -> Optional[int]:
+        if not token:
+            return None
+        epoch, _, seq = token.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return -1 # unknown token: the client has to refetch
+        return int(seq)
+
+    # Deliver one notification row to every connection of user_id
+    def publish(self, user_id: str, notification: dict) -> str:
+        self._seq += 1
+        seq = self._seq
+        event = (seq, notification)
+
+        recent = self._recent.pop(user_id, None)
+        if recent is None:
+            recent = RecentEvents()
+            recent.horizon = self._evicted_horizon
+            if len(self._recent) >= HUB_MAX_USERS:
+                evicted = self._recent.pop(next(iter(self._recent))) # forget the least recently notified user
+                self._evicted_horizon = max(self._evicted_horizon, evicted.events[-1][0])
+        if len(recent.events) == recent.events.maxlen:
+            recent.horizon = recent.events[0][0]
+        recent.events.append(event)
+        self._recent[user_id] = recent
+
+        for sub in self._subscribers.get(user_id, ()):
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                sub.lagged = True
+                self.dropped += 1
+        self.published += 1
+        return self.token(seq)
+
+    def publish_many(self, user_key: str, notifications: list[dict]):
+        for notification in notifications:
+            user_id = notification.get(user_key)
+            if user_id:
+                self.publish(str(user_id), notification)
+
+    # Events after resume_token, or None if the token is too old/unknown (client must refetch GET /notifications)
+    def replay(self, user_id: str, resume_token: Optional[str]) -> Optional[list]:
+        seq = self.parse_token(resume_token)
+        if seq is None:
+            return [] # fresh connection, nothing to replay
+        if seq < 0:
+            return None
+        recent = self._recent.get(user_id)
+        horizon = recent.horizon if recent is not None else self._evicted_horizon
+        if seq < horizon:
+            return None # some events after seq are no longer buffered
+        if recent is None:
+            return []
+        return [event for event in recent.events if event[0] > seq]
+
+    def subscribe(self, user_id: str) -> Subscription:
+        sub = Subscription(user_id)
+        self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        subs = self._subscribers.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[sub.user_id]
+
+    def stats(self) -> dict:
+        return {
+            "connections": sum(len(subs) for subs in self._subscribers.values()),
+            "users_connected": len(self._subscribers),
+            "users_buffered": len(self._recent),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+hub = NotificationHub()
+
+
+# Events for one connection: ("ready" | "notification" | "reset" | "ping", token, data).
+# Replays what was missed after resume_token, then pushes live events with heartbeats.
+async def stream_events(user_id: str, resume_token: Optional[str]):
+    sub = hub.subscribe(user_id) # subscribe before replaying so nothing published in between is lost
+    try:
+        missed = hub.replay(user_id, resume_token)
+        if missed is None:
+            yield "reset", None, {} # client reloads GET /notifications
+            missed = []
+        last_seq = hub._seq
+        yield "ready", hub.token(last_seq), {} # gives fresh clients a resume token
+        for seq, notification in missed:
+            yield "notification", hub.token(seq), notification
+        while not sub.lagged: # on overflow, close; the client reconnects with its last token and gets a replay
+            try:
+                seq, notification = await asyncio.wait_for(sub.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield "ping", None, None
+                continue
+            if seq <= last_seq:
+                continue # already sent during replay
+            yield "notification", hub.token(seq), notification
+    finally:
+        hub.unsubscribe(sub)
+
+
+# Server-Sent Events framing for stream_events
+async def sse_stream(user_id: str, resume_token: Optional[str]):
+    yield "retry: 2000\n\n" # reconnect delay for EventSource
+    events = stream_events(user_id, resume_token)
+    try:
+        async for event, token, data in events:
+            if event == "ping":
+                yield ": ping\n\n"
+                continue
+            lines = f"id: {token}\n" if token else ""
+            payload = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+            yield f"{lines}event: {event}\ndata: {payload}\n\n"
+    finally:
+        await events.aclose() # unsubscribe right away when the client disconnects
+
+
+# WebSocket framing for stream_events (JSON messages)
+async def websocket_stream(websocket: WebSocket, user_id: str, resume_token: Optional[str]):
+    receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+    events = stream_events(user_id, resume_token)
+    try:
+        async for event, token, data in events:
+            if receiver.done():
+                return
+            await websocket.send_json({"event": event, "id": token, "data": data})
+    except (WebSocketDisconnect, RuntimeError):
+        pass # client went away mid-send
+    finally:
+        receiver.cancel()
+        await events.aclose()
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    try:
+        while True:
+            await websocket.receive_text() # clients don't send anything; this just notices the close
+    except (WebSocketDisconnect, RuntimeError):
+        pass
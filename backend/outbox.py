@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from typing import Optional
+
+from upstream import SUPABASE_URL, SUPABASE_KEY, get_client
+
+
+logger = logging.getLogger(__name__)
+
+# Notification writes are queued in a local SQLite outbox in the request path and inserted into
+# Supabase by a background worker in batches, so users never wait on notification delivery.
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox.sqlite3"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200")) # Rows per bulk insert
+OUTBOX_FLUSH_INTERVAL = float(os.getenv("OUTBOX_FLUSH_INTERVAL", "0.5")) # Seconds between flushes when idle
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "12")) # After this a row is parked as dead
+OUTBOX_BACKOFF_BASE = 1.0 # Seconds, doubled per attempt (with jitter)
+OUTBOX_BACKOFF_MAX = 300.0
+OUTBOX_TABLES = ("notifications_restaurant", "notifications_customer")
+
+
+class Outbox:
+    def __init__(self, path: str = OUTBOX_PATH):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._since_wakeup = 0 # rows enqueued since the worker last woke up
+        self.enqueued = 0
+        self.flushed = 0
+        self.failed_batches = 0
+        self.dead = 0
+
+    def open(self):
+        if self._db is not None:
+            return
+        self._db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._db.execute("pragma journal_mode=wal") # appends don't block the flusher
+        self._db.execute("pragma synchronous=normal") # survives process crashes; fsync only at checkpoints
+        self._db.execute(
+            """create table if not exists outbox (
+                id integer primary key autoincrement,
+                table_name text not null,
+                payload text not null,
+                attempts integer not null default 0,
+                next_attempt_at real not null default 0,
+                created_at real not null,
+                dead integer not null default 0
+            )"""
+        )
+        self._db.execute("create index if not exists outbox_ready on outbox (dead, next_attempt_at)")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # Request path: one local insert, no network
+    def enqueue_many(self, table_name: str, rows: list[dict]):
+        if table_name not in OUTBOX_TABLES:
+            raise ValueError(f"Unknown outbox table {table_name}")
+        now = time.time()
+        self._db.executemany(
+            "insert into outbox (table_name, payload, created_at) values (?, ?, ?)",
+            [(table_name, json.dumps(row, separators=(",", ":"), ensure_ascii=False), now) for row in rows],
+        )
+        self.enqueued += len(rows)
+        self._since_wakeup += len(rows)
+        if self._since_wakeup >= OUTBOX_BATCH_SIZE:
+            self._wakeup.set() # full batch ready, don't wait for the timer
+
+    def enqueue(self, table_name: str, row: dict):
+        self.enqueue_many(table_name, [row])
+
+    def pending(self) -> int:
+        return self._db.execute("select count(*) from outbox where dead = 0").fetchone()[0]
+
+    def _ready_batch(self, table_name: str) -> list[tuple[int, str, int]]:
+        return self._db.execute(
+            "select id, payload, attempts from outbox where dead = 0 and table_name = ? and next_attempt_at <= ? "
+            "order by id limit ?",
+            (table_name, time.time(), OUTBOX_BATCH_SIZE),
+        ).fetchall()
+
+    # Send one batch per table; returns the number of rows delivered
+    async def flush_once(self) -> int:
+        delivered = 0
+        for table_name in OUTBOX_TABLES:
+            batch = self._ready_batch(table_name)
+            if not batch:
+                continue
+            ids = [row_id for row_id, _, _ in batch]
+            body = "[" + ",".join(payload for _, payload, _ in batch) + "]" # payloads are already JSON
+            try:
+                res = await get_client().post(
+                    f"{SUPABASE_URL}/rest/v1/{table_name}",
+                    headers={
+                        "apikey": SUPABASE_KEY,
+                        "Authorization": f"Bearer {SUPABASE_KEY}", # service key: the user's JWT may have expired by now
+                        "Content-Type": "application/json",
+                        # ids are generated by the backend, so a retried batch that already landed is skipped
+                        "Prefer": "return=minimal,resolution=ignore-duplicates",
+                    },
+                    params={"on_conflict": "id"},
+                    content=body,
+                )
+                res.raise_for_status()
+            except Exception as e:
+                self.failed_batches += 1
+                logger.warning("Outbox flush to %s failed (%d rows): %s", table_name, len(batch), e)
+                self._reschedule(batch)
+                continue
+            self._db.execute(f"delete from outbox where id in ({','.join('?' * len(ids))})", ids)
+            self.flushed += len(ids)
+            delivered += len(ids)
+        return delivered
+
+    def _reschedule(self, batch: list[tuple[int, str, int]]):
+        now = time.time()
+        updates = []
+        for row_id, _, attempts in batch:
+            attempts += 1
+            delay = min(OUTBOX_BACKOFF_BASE * 2 ** attempts, OUTBOX_BACKOFF_MAX) * random.uniform(0.5, 1.0)
+            dead = 1 if attempts >= OUTBOX_MAX_ATTEMPTS else 0
+            self.dead += dead
+            updates.append((attempts, now + delay, dead, row_id))
+        self._db.executemany("update outbox set attempts = ?, next_attempt_at = ?, dead = ? where id = ?", updates)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._since_wakeup = 0
+            try:
+                while await self.flush_once() >= OUTBOX_BATCH_SIZE:
+                    pass # keep draining while batches come back full
+            except Exception as e:
+                logger.exception("Outbox worker error: %s", e)
+
+    # Called from the FastAPI lifespan handler
+    async def start(self):
+        self.open()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 5.0):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._db is not None:
+            try:
+                await asyncio.wait_for(self.flush_once(), timeout=drain_timeout) # best effort; the rest waits for next start
+            except Exception:
+                pass
+            self.close()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending() if self._db is not None else None,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "failed_batches": self.failed_batches,
+            "dead": self.dead,
+        }
+
+
+outbox = Outbox()
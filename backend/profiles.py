@@ -0,0 +1,69 @@
+import os
+from typing import NamedTuple, Optional
+import orjson
+from fastapi import HTTPException
+
+from cache import TTLCache
+from upstream import SUPABASE_URL, coalesced_get
+
+
+# Per-user cache of the profiles row, so role lookups on the notification paths cost no Supabase call
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300")) # Seconds before a profile is re-read
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+PROFILE_CACHE_MAX_BYTES = int(os.getenv("PROFILE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+class ProfileEntry(NamedTuple):
+    role: Optional[str]
+    profile_picture: Optional[str]
+    picture_variants: Optional[dict] # resized copies of profile_picture (images.py)
+    latitude: Optional[float] # restaurants: copied onto their items for /items/nearby
+    longitude: Optional[float]
+    row: bytes # full profiles row as JSON, served as-is by GET /profile
+
+
+profile_cache = TTLCache(
+    "profiles",
+    max_entries=PROFILE_CACHE_MAX_ENTRIES,
+    ttl=PROFILE_CACHE_TTL,
+    max_bytes=PROFILE_CACHE_MAX_BYTES,
+    sizer=lambda entry: len(entry.row) + 64,
+)
+
+
+# Store a profiles row (after a read or a successful write)
+def remember_profile(user_id: str, row: dict) -> ProfileEntry:
+    entry = ProfileEntry(
+        role=row.get("role"),
+        profile_picture=row.get("profile_picture"),
+        picture_variants=row.get("picture_variants"),
+        latitude=row.get("latitude"),
+        longitude=row.get("longitude"),
+        row=orjson.dumps(row),
+    )
+    profile_cache.set(user_id, entry)
+    return entry
+
+
+def forget_profile(user_id: str):
+    profile_cache.pop(user_id)
+
+
+# Cached profile of the caller, read from Supabase on a miss
+# (user_id comes from a verified JWT, see auth.py)
+async def get_profile_entry(user_id: str, headers: dict) -> ProfileEntry:
+    entry = profile_cache.get(user_id)
+    if entry is not None:
+        return entry
+
+    res = await coalesced_get( # a dashboard opening fires several requests that all need the profile
+        f"{SUPABASE_URL}/rest/v1/profiles",
+        headers=headers,
+        params={"user_id": f"eq.{user_id}", "select": "*"},
+        scope=user_id,
+    )
+    res.raise_for_status()
+    data = orjson.loads(res.content)
+    if not data:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado!")
+    return remember_profile(user_id, data[0])
@@ -0,0 +1,164 @@
+import math
+import os
+import time
+from collections import Counter
+from typing import Optional
+from urllib.parse import parse_qs
+import orjson
+
+from auth import verify_token
+from cache import TTLCache
+
+
+# Per-caller rate limits: a token bucket per caller (verified JWT sub, or client address without a
+# valid token) and route class, so one client polling in a tight loop only slows itself down.
+# Over the limit the request gets a 429 with Retry-After before any handler or Supabase work runs.
+# The instance-wide cap on Supabase calls in flight lives in resilience.ConcurrencyLimitedTransport.
+
+# Route classes, first match wins: (name, methods, path prefix)
+ROUTE_CLASSES = [
+    ("reservations", {"POST"}, "/reservations"),
+    ("catalog", {"GET"}, "/items"),
+    ("notifications", {"GET"}, "/notifications"),
+    ("dashboard", {"GET"}, "/dashboard"),
+    ("uploads", {"PUT"}, ""),
+    ("writes", {"POST", "PATCH", "DELETE"}, ""),
+    ("reads", {"GET"}, ""),
+]
+EXEMPT_PATHS = ("/metrics", "/cache/stats", "/ready", "/media/") # plus "/" (health check) and CORS preflights
+
+# name -> (tokens per second, burst)
+DEFAULT_LIMITS = {
+    "reservations": (1.0, 5),
+    "catalog": (5.0, 20),
+    "notifications": (1.0, 10),
+    "dashboard": (0.5, 5),
+    "uploads": (0.2, 3),
+    "writes": (2.0, 10),
+    "reads": (10.0, 40),
+}
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000")) # Buckets kept in memory
+
+
+# RATE_LIMITS="catalog=10:40,notifications=0.5:5" overrides the defaults; a rate of 0 disables a class
+def parse_limits(spec: Optional[str]) -> dict[str, tuple[float, int]]:
+    limits = dict(DEFAULT_LIMITS)
+    for entry in (spec or "").split(","):
+        if not entry.strip():
+            continue
+        name, _, value = entry.partition("=")
+        rate, _, burst = value.partition(":")
+        name = name.strip()
+        if name not in limits:
+            raise RuntimeError(f"Unknown rate limit class {name!r}")
+        rate = float(rate)
+        limits[name] = (rate, int(burst) if burst else max(1, math.ceil(rate)))
+    return limits
+
+
+LIMITS = parse_limits(os.getenv("RATE_LIMITS"))
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    if method == "OPTIONS" or path == "/" or path.startswith(EXEMPT_PATHS):
+        return None
+    for name, methods, prefix in ROUTE_CLASSES:
+        if method in methods and path.startswith(prefix):
+            return name
+    return None
+
+
+def too_many_requests(retry_after: float, detail: str) -> tuple[dict, dict]:
+    body = orjson.dumps({"detail": detail})
+    start = {
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    }
+    return start, {"type": "http.response.body", "body": body}
+
+
+class TokenBuckets:
+    def __init__(self, limits: dict[str, tuple[float, int]]):
+        self.limits = limits
+        # (class, caller) -> [tokens, last refill]. Each take re-sets the entry with a TTL of the time an
+        # empty bucket needs to refill, counted from that take, so only a bucket that would be full
+        # again by now expires (an evicted one, under RATE_LIMIT_MAX_KEYS pressure, comes back full)
+        self._buckets = TTLCache("rate_limits", max_entries=RATE_LIMIT_MAX_KEYS)
+        self.allowed = 0
+        self.limited: Counter = Counter()
+
+    # Take one token; returns 0 if allowed, else the seconds until a token is available
+    def take(self, name: str, caller: str) -> float:
+        rate, burst = self.limits[name]
+        if rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        key = (name, caller)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(burst), now]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        self._buckets.set(key, bucket, ttl=burst / rate)
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            self.allowed += 1
+            return 0.0
+        self.limited[name] += 1
+        return (1.0 - bucket[0]) / rate
+
+    def stats(self) -> dict:
+        return {
+            "callers": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": dict(self.limited),
+            "limits": {name: {"rate": rate, "burst": burst} for name, (rate, burst) in self.limits.items()},
+        }
+
+
+rate_limits = TokenBuckets(LIMITS)
+
+
+async def caller_id(scope) -> str:
+    headers = dict(scope["headers"])
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if not authorization and b"access_token=" in scope["query_string"]: # EventSource / WebSocket
+        scheme, token = "bearer", parse_qs(scope["query_string"].decode("latin-1")).get("access_token", [""])[0]
+    if scheme.lower() == "bearer" and token.strip():
+        try:
+            return (await verify_token(token.strip())).user_id # cached claims: one hash + dict lookup
+        except Exception:
+            pass # the route answers 401 itself; until then limit by address
+    forwarded = headers.get(b"x-forwarded-for") # Render's proxy puts the client first
+    if forwarded:
+        return forwarded.split(b",")[0].strip().decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+# Added before CORSMiddleware (so inside it): 429s still carry the CORS headers the browser needs
+class RateLimitMiddleware:
+    def __init__(self, app, limiter: TokenBuckets = rate_limits):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        name = route_class(scope["method"], scope["path"])
+        if name is not None:
+            retry_after = self.limiter.take(name, await caller_id(scope))
+            if retry_after:
+                start, body = too_many_requests(retry_after, "Demasiadas solicitudes, intenta de nuevo en unos segundos")
+                await send(start)
+                await send(body)
+                return
+        await self.app(scope, receive, send)
+
@@ -0,0 +1,57 @@
+from typing import Optional
+from fastapi import HTTPException
+
+from catalog import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor, quote_value
+
+
+# Query building for the reservation lists (GET /reservations and the restaurant's per-item view).
+# Lists are scoped explicitly (not only through RLS), newest first, keyset-paginated on (timestamp, id).
+RESERVATION_STATUSES = {"active", "cancelled", "completed"}
+# Item columns the reservation cards render; everything else stays in Supabase
+ITEM_CARD_FIELDS = "id,restaurant_id,information,price,pickup_time,location,image_url,image_variants,status"
+RESERVATION_FIELDS = "id,customer_id,item_id,status,quantity,timestamp"
+
+
+# "active" or "cancelled,completed"
+def parse_statuses(status: Optional[str]) -> list[str]:
+    if not status:
+        return []
+    statuses = [s.strip() for s in status.split(",") if s.strip()]
+    unknown = [s for s in statuses if s not in RESERVATION_STATUSES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Estado invalido: {', '.join(unknown)}")
+    return sorted(set(statuses)) # normalized, so equal filters share coalesced reads
+
+
+def build_reservation_params(
+    scope: list[tuple[str, str]], # who the list belongs to, e.g. [("customer_id", "eq.<uuid>")]
+    select: str,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> list[tuple[str, str]]:
+    params = [("select", select), *scope]
+    statuses = parse_statuses(status)
+    if len(statuses) == 1:
+        params.append(("status", f"eq.{statuses[0]}"))
+    elif statuses:
+        params.append(("status", f"in.({','.join(statuses)})"))
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor)
+        params.append((
+            "or",
+            f"(timestamp.lt.{quote_value(last_timestamp)},"
+            f"and(timestamp.eq.{quote_value(last_timestamp)},id.lt.{quote_value(last_id)}))",
+        ))
+    params.append(("order", "timestamp.desc,id.desc"))
+    params.append(("limit", str(limit + 1))) # one extra row tells us if there is a next page
+    return params
+
+
+# Trim the extra row and build the response envelope
+def paginate_reservations(rows: list[dict], limit: int) -> dict:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    return {"reservations": rows, "next_cursor": next_cursor}
@@ -0,0 +1,410 @@
+import asyncio
+import os
+import random
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Optional
+import httpx
+from fastapi import HTTPException
+
+from metrics import upstream_target
+
+
+# Resilience for Supabase calls, applied in the shared client's transport so every handler gets it:
+#   - a deadline budget per API request, shared by all the sequential Supabase calls of a handler
+#   - hedged GETs: a duplicate is sent when the first one is slower than the recent p95
+#   - bounded retries with jittered backoff for safe (GET/HEAD) calls
+#   - a circuit breaker that fails fast while Supabase is erroring or timing out
+#   - a cap on calls in flight for the whole instance, with a short queue (ConcurrencyLimitedTransport)
+REQUEST_BUDGET = float(os.getenv("REQUEST_BUDGET_SECONDS", "10")) # Total Supabase time allowed per API request
+HEDGE_PERCENTILE = float(os.getenv("SUPABASE_HEDGE_PERCENTILE", "95")) # Hedge GETs slower than this percentile
+HEDGE_MIN_DELAY = float(os.getenv("SUPABASE_HEDGE_MIN_DELAY", "0.05")) # Never hedge sooner than this (seconds)
+HEDGE_MAX_RATIO = float(os.getenv("SUPABASE_HEDGE_MAX_RATIO", "0.05")) # Extra GETs allowed for hedging (5%)
+HEDGE_MIN_SAMPLES = 50 # latencies needed per table before hedging it
+RETRY_ATTEMPTS = int(os.getenv("SUPABASE_RETRY_ATTEMPTS", "2")) # Retries after the first try (safe calls only)
+RETRY_BACKOFF_BASE = 0.05 # Seconds, doubled per retry, full jitter
+RETRY_BACKOFF_MAX = 1.0
+CIRCUIT_MIN_CALLS = int(os.getenv("SUPABASE_CIRCUIT_MIN_CALLS", "20")) # Calls in the window before the rate counts
+CIRCUIT_FAILURE_RATE = float(os.getenv("SUPABASE_CIRCUIT_FAILURE_RATE", "0.5")) # Failure ratio that opens the circuit
+CIRCUIT_CONSECUTIVE_FAILURES = int(os.getenv("SUPABASE_CIRCUIT_CONSECUTIVE_FAILURES", "10"))
+CIRCUIT_WINDOW_SECONDS = 10
+CIRCUIT_OPEN_SECONDS = float(os.getenv("SUPABASE_CIRCUIT_OPEN_SECONDS", "5")) # Fail fast this long before probing again
+MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "64")) # Supabase calls in flight per instance
+QUEUE_TIMEOUT = float(os.getenv("SUPABASE_QUEUE_TIMEOUT", "0.5")) # Seconds a call may wait for a free slot
+MAX_QUEUE = int(os.getenv("SUPABASE_MAX_QUEUE", "256")) # Calls waiting for a slot before new ones are shed
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRYABLE_STATUSES = {502, 503, 504} # gateway errors: Supabase (or its proxy) is struggling, not a bad query
+
+_deadline: ContextVar[Optional[float]] = ContextVar("supabase_deadline", default=None) # time.monotonic() value
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    pass
+
+
+class CircuitOpen(httpx.TransportError):
+    pass
+
+
+class Saturated(httpx.TransportError):
+    pass
+
+
+# ---------------------------------------------------------------- deadlines
+
+def remaining_budget() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+# ASGI middleware: every HTTP request gets REQUEST_BUDGET seconds for all of its Supabase calls
+class DeadlineMiddleware:
+    def __init__(self, app, budget: float = REQUEST_BUDGET):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = _deadline.set(time.monotonic() + self.budget)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
+
+
+# ---------------------------------------------------------------- circuit breaker
+
+class CircuitBreaker:
+    def __init__(self):
+        self.state = "closed" # closed -> open -> half_open -> closed
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self._window: deque = deque() # [second, calls, failures]
+        self._probing = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= CIRCUIT_OPEN_SECONDS:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True # one probe at a time; everyone else keeps failing fast
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, failed: bool):
+        now = int(time.monotonic())
+        if not self._window or self._window[-1][0] != now:
+            self._window.append([now, 0, 0])
+        while self._window[0][0] <= now - CIRCUIT_WINDOW_SECONDS:
+            self._window.popleft()
+        self._window[-1][1] += 1
+        self._window[-1][2] += failed
+
+        if self.state == "half_open":
+            self._probing = False
+            if failed:
+                self._open()
+            else:
+                self.state = "closed"
+                self.consecutive_failures = 0
+                self._window.clear()
+            return
+
+        self.consecutive_failures = self.consecutive_failures + 1 if failed else 0
+        calls = sum(bucket[1] for bucket in self._window)
+        failures = sum(bucket[2] for bucket in self._window)
+        if self.state == "closed" and (
+            self.consecutive_failures >= CIRCUIT_CONSECUTIVE_FAILURES
+            or (calls >= CIRCUIT_MIN_CALLS and failures / calls >= CIRCUIT_FAILURE_RATE)
+        ):
+            self._open()
+
+    def cancelled(self):
+        if self.state == "half_open":
+            self._probing = False # let the next call probe instead
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def retry_after(self) -> int:
+        return max(1, int(CIRCUIT_OPEN_SECONDS - (time.monotonic() - self.opened_at) + 0.999))
+
+
+# ---------------------------------------------------------------- hedging
+
+# Recent GET latencies per table/RPC; the hedge delay is their HEDGE_PERCENTILE
+class LatencyTracker:
+    def __init__(self, size: int = 256):
+        self.size = size
+        self._samples: dict[str, deque] = {}
+        self._delays: dict[str, float] = {}
+        self._since_update: dict[str, int] = {}
+
+    def observe(self, target: str, seconds: float):
+        samples = self._samples.get(target)
+        if samples is None:
+            samples = self._samples[target] = deque(maxlen=self.size)
+        samples.append(seconds)
+        count = self._since_update.get(target, 0) + 1
+        if count >= 32 and len(samples) >= HEDGE_MIN_SAMPLES: # re-sort every 32 samples, not on every call
+            ordered = sorted(samples)
+            value = ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))]
+            self._delays[target] = max(HEDGE_MIN_DELAY, value)
+            count = 0
+        self._since_update[target] = count
+
+    def hedge_delay(self, target: str) -> Optional[float]:
+        return self._delays.get(target)
+
+
+# ---------------------------------------------------------------- transport
+
+breaker = CircuitBreaker() # one for the whole Supabase project: a brownout hits every table
+latencies = LatencyTracker()
+counters = Counter() # retries, hedges, hedge_wins, deadline_exceeded
+concurrency = Counter() # limit, active, peak, queued, shed (ConcurrencyLimitedTransport)
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+        self._hedge_tokens = 1.0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        safe = request.method in SAFE_METHODS
+        attempts = 1 + (RETRY_ATTEMPTS if safe else 0)
+        for attempt in range(attempts):
+            remaining = self._check_budget(request)
+            if not breaker.allow():
+                raise CircuitOpen(f"Supabase circuit open, retry in {breaker.retry_after()}s", request=request)
+            self._cap_timeouts(request, remaining)
+            try:
+                if safe:
+                    response = await self._hedged(request, remaining)
+                else:
+                    response = await self._send(request, remaining)
+            except (httpx.TransportError, asyncio.TimeoutError) as e:
+                error = e if isinstance(e, httpx.TransportError) else DeadlineExceeded("Supabase call ran out of time budget", request=request)
+                if isinstance(error, DeadlineExceeded):
+                    counters["deadline_exceeded"] += 1
+                if attempt + 1 >= attempts or not await self._backoff(attempt):
+                    raise error
+                continue
+            if response.status_code in RETRYABLE_STATUSES and attempt + 1 < attempts:
+                if await self._backoff(attempt):
+                    await response.aclose()
+                    continue
+            return response
+
+    def _check_budget(self, request: httpx.Request) -> Optional[float]:
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= 0:
+            counters["deadline_exceeded"] += 1
+            raise DeadlineExceeded("Supabase call ran out of time budget", request=request)
+        return remaining
+
+    # Per-call timeouts never exceed what is left of the request's budget
+    def _cap_timeouts(self, request: httpx.Request, remaining: Optional[float]):
+        if remaining is None:
+            return
+        timeouts = dict(request.extensions.get("timeout", {}))
+        for phase in ("connect", "read", "write", "pool"):
+            current = timeouts.get(phase)
+            timeouts[phase] = remaining if current is None else min(current, remaining)
+        request.extensions = {**request.extensions, "timeout": timeouts}
+
+    async def _backoff(self, attempt: int) -> bool:
+        delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= delay:
+            return False # no time left for another try
+        counters["retries"] += 1
+        await asyncio.sleep(delay)
+        return True
+
+    # One attempt: outcome recorded in the breaker, total time capped by the budget
+    async def _send(self, request: httpx.Request, remaining: Optional[float]) -> httpx.Response:
+        try:
+            response = await asyncio.wait_for(self._transport.handle_async_request(request), remaining)
+        except asyncio.CancelledError:
+            breaker.cancelled() # hedge loser or client gone: says nothing about Supabase
+            raise
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            left = remaining_budget()
+            if left is not None and left <= 0:
+                breaker.cancelled() # cut off by the caller's own budget (maybe spent on earlier calls), not a Supabase timeout
+            else:
+                breaker.record(failed=True)
+            raise
+        except BaseException:
+            breaker.record(failed=True)
+            raise
+        breaker.record(failed=response.status_code in RETRYABLE_STATUSES)
+        return response
+
+    async def _timed_send(self, request: httpx.Request, remaining: Optional[float], target: str) -> httpx.Response:
+        start = time.monotonic()
+        response = await self._send(request, remaining)
+        if response.status_code < 500:
+            latencies.observe(target, time.monotonic() - start)
+        return response
+
+    # Send a GET; if it is slower than the recent p95, send a duplicate and keep whichever answers first
+    async def _hedged(self, request: httpx.Request, remaining: Optional[float]) -> httpx.Response:
+        target = upstream_target(request.url.path)
+        self._hedge_tokens = min(10.0, self._hedge_tokens + HEDGE_MAX_RATIO)
+        delay = latencies.hedge_delay(target)
+        if delay is None or (remaining is not None and remaining <= delay):
+            return await self._timed_send(request, remaining, target)
+
+        started = time.monotonic()
+        first = asyncio.ensure_future(self._timed_send(request, remaining, target))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or self._hedge_tokens < 1 or breaker.state != "closed":
+            return await first
+        self._hedge_tokens -= 1
+        counters["hedges"] += 1
+        left = None if remaining is None else remaining - (time.monotonic() - started)
+        second = asyncio.ensure_future(self._timed_send(request, left, target))
+
+        pending = {first, second}
+        failed = []
+        winner = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code not in RETRYABLE_STATUSES:
+                        winner = task
+                        if task is second:
+                            counters["hedge_wins"] += 1
+                        return task.result()
+                    failed.append(task)
+            winner = failed[-1]
+            return await winner # both failed: surface the last outcome
+        finally:
+            for task in (first, second):
+                if task is not winner:
+                    task.cancel()
+            for task in (first, second):
+                if task is winner:
+                    continue
+                try:
+                    response = await task
+                except BaseException:
+                    continue
+                await response.aclose() # the loser answered too; release its connection
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class _SlotStream(httpx.AsyncByteStream):
+    __slots__ = ("_stream", "_release")
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+# At most MAX_CONCURRENCY Supabase calls at once; a slot is held until the response body is read.
+# When all are busy a call waits up to QUEUE_TIMEOUT (within its deadline budget), then fails with
+# Saturated -> 429. Wraps ResilientTransport, so a full queue is never retried and never counts as
+# a Supabase failure for the breaker; retries and hedges of one call share its slot.
+class ConcurrencyLimitedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, limit: int = MAX_CONCURRENCY):
+        self._transport = transport
+        self._slots = asyncio.Semaphore(limit)
+        self._waiting = 0
+        concurrency["limit"] = limit
+
+    def _release(self):
+        concurrency["active"] -= 1
+        self._slots.release()
+
+    async def _acquire(self, request: httpx.Request):
+        if not self._slots.locked():
+            await self._slots.acquire() # free slot: returns without suspending
+            return
+        timeout = QUEUE_TIMEOUT
+        remaining = remaining_budget()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        if self._waiting >= MAX_QUEUE or timeout <= 0:
+            concurrency["shed"] += 1
+            raise Saturated("Too many Supabase calls queued", request=request)
+        concurrency["queued"] += 1
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            concurrency["shed"] += 1
+            raise Saturated("No free Supabase slot in time", request=request)
+        finally:
+            self._waiting -= 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._acquire(request)
+        concurrency["active"] += 1
+        concurrency["peak"] = max(concurrency["peak"], concurrency["active"])
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._release()
+            raise
+        if isinstance(response.stream, httpx.ByteStream):
+            self._release() # body already in memory
+        else:
+            response.stream = _SlotStream(response.stream, self._release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+
+def stats() -> dict:
+    return {
+        "concurrency": {name: concurrency[name] for name in ("limit", "active", "peak", "queued", "shed")},
+        "circuit": breaker.state,
+        "circuit_opened": breaker.times_opened,
+        "fast_failures": breaker.rejected,
+        "retries": counters["retries"],
+        "hedges": counters["hedges"],
+        "hedge_wins": counters["hedge_wins"],
+        "deadline_exceeded": counters["deadline_exceeded"],
+        "hedge_delays_ms": {target: round(delay * 1000, 1) for target, delay in latencies._delays.items()},
+    }
+
+
+# Map a failed Supabase call to the status the frontend should see (instead of a blanket 500)
+def upstream_failure(error: Exception) -> HTTPException:
+    if isinstance(error, CircuitOpen):
+        return HTTPException(status_code=503, detail="Servicio no disponible, intenta de nuevo", headers={"Retry-After": str(breaker.retry_after())})
+    if isinstance(error, Saturated): # this instance is at its Supabase call limit; Supabase itself is fine
+        return HTTPException(status_code=429, detail="Demasiadas solicitudes, intenta de nuevo", headers={"Retry-After": "1"})
+    if isinstance(error, httpx.TimeoutException):
+        return HTTPException(status_code=504, detail="Supabase no respondio a tiempo")
+    if isinstance(error, httpx.TransportError):
+        return HTTPException(status_code=502, detail="No se pudo conectar con Supabase")
+    return HTTPException(status_code=500, detail=str(error))
+
@@ -0,0 +1,147 @@
+import gzip
+import os
+from typing import Optional
+
+import brotli
+import httpx
+import orjson
+from fastapi import Response
+
+
+# Response encoding for the read paths. Supabase already answers in JSON, so when an endpoint
+# does not change the rows it hands the upstream bytes to the client as-is (passthrough);
+# when it does (pagination, distances, scores, composite payloads) orjson does the parsing and
+# encoding in C instead of the stdlib encoder + jsonable_encoder walking every row in Python.
+# Large bodies are compressed (brotli or gzip, whichever the client prefers).
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024")) # Smaller bodies are not worth the CPU / headers
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5 # about gzip's speed at a noticeably better ratio; 11 is far too slow per request
+ENCODINGS = ("br", "gzip") # server preference when the client accepts both equally
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+_counters = {"compressed": 0, "bytes_in": 0, "bytes_out": 0, "passthrough": 0}
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+# Upstream JSON body sent to the client untouched: no parse, no re-encode
+def passthrough(upstream: httpx.Response) -> Response:
+    _counters["passthrough"] += 1
+    return Response(content=upstream.content, media_type="application/json")
+
+
+# One JSON object from parts that are already encoded (cached profile row, cached catalog page)
+def compose_json(**parts: bytes) -> bytes:
+    return b"{" + b",".join(orjson.dumps(name) + b":" + part for name, part in parts.items()) + b"}"
+
+
+# Pick a content-coding from an Accept-Encoding header ("gzip, deflate, br;q=0.9")
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        encoded = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        encoded = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0) # mtime=0: same bytes for the same body
+    _counters["compressed"] += 1
+    _counters["bytes_in"] += len(body)
+    _counters["bytes_out"] += len(encoded)
+    return encoded
+
+
+def compressible(content_type: str, size: int) -> bool:
+    return size >= COMPRESS_MIN_BYTES and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+# Compresses complete response bodies. Streaming responses (SSE) and bodies that already carry a
+# Content-Encoding (pre-compressed catalog pages) go through unchanged.
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate(accept_encoding)
+        start = None
+        streaming = False
+
+        async def send_compressed(message):
+            nonlocal start, streaming
+            if message["type"] == "http.response.start":
+                start = message # held until we know whether the body is compressed
+                return
+            if message["type"] != "http.response.body" or streaming or start is None:
+                return await send(message)
+
+            body = message.get("body", b"")
+            if message.get("more_body", False): # streamed: pass through as it comes
+                streaming = True
+                await send(start)
+                start = None
+                return await send(message)
+
+            headers = dict((name.lower(), value) for name, value in start["headers"])
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            if b"content-encoding" in headers or not compressible(content_type, len(body)):
+                await send(start)
+                start = None
+                return await send(message)
+
+            raw_headers = [(name, value) for name, value in start["headers"] if name.lower() not in (b"content-length", b"vary", b"etag")]
+            vary = headers.get(b"vary")
+            if not vary:
+                vary = b"Accept-Encoding"
+            elif b"accept-encoding" not in vary.lower():
+                vary += b", Accept-Encoding"
+            raw_headers.append((b"vary", vary))
+            etag = headers.get(b"etag")
+            if encoding is not None:
+                body = compress(body, encoding)
+                raw_headers.append((b"content-encoding", encoding.encode()))
+                if etag and not etag.startswith(b"W/"):
+                    etag = b"W/" + etag # a different representation of the same content
+            if etag:
+                raw_headers.append((b"etag", etag))
+            raw_headers.append((b"content-length", str(len(body)).encode()))
+            await send({**start, "headers": raw_headers})
+            start = None
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def stats() -> dict:
+    ratio = _counters["bytes_out"] / _counters["bytes_in"] if _counters["bytes_in"] else None
+    return {**_counters, "ratio": round(ratio, 3) if ratio is not None else None}
@@ -0,0 +1 @@
+# FastAPI routers, one per domain; main.create_app() includes them all
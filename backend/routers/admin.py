@@ -0,0 +1,107 @@
+from fastapi import APIRouter, HTTPException, Header, Response, Depends
+from typing import Optional
+import hmac
+import httpx
+import os
+
+from admission import availability
+from archive import archiver
+from auth import claims_cache
+from catalog import catalog_cache
+from idempotency import idempotency
+from images import images
+from metrics import render as render_metrics
+from notifications_hub import hub
+from outbox import outbox
+from profiles import profile_cache
+from ratelimit import rate_limits
+from resilience import upstream_failure, stats as upstream_stats
+from responses import stats as compression_stats
+from search import search_index
+from upstream import inflight
+from warmup import warmup
+
+
+# Health / readiness checks, stats and maintenance jobs
+router = APIRouter()
+
+# /metrics and /cache/stats expose traffic, callers and upstream state: they need
+# "Authorization: Bearer <METRICS_TOKEN>" (Prometheus: bearer_token in the scrape config).
+# POST /update-archive runs heavy archival passes with the service key: it needs ADMIN_TOKEN
+# (the scheduled archiver in archive.py does not go through HTTP). Unset token = endpoint off (404).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def check_bearer(authorization: Optional[str], secret: Optional[str]):
+    if not secret:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), secret.encode()):
+        raise HTTPException(status_code=401, detail="No autorizado", headers={"WWW-Authenticate": "Bearer"})
+
+
+async def require_metrics_token(authorization: Optional[str] = Header(None)):
+    check_bearer(authorization, METRICS_TOKEN)
+
+
+async def require_admin_token(authorization: Optional[str] = Header(None)):
+    check_bearer(authorization, ADMIN_TOKEN)
+
+
+#Root Health Check Endpoint
+@router.get("/")
+async def root():
+    return {"status": "FastAPI backend running!"} # You can ping this to check if Render is working; going to https://misky-project.onrender.com/ should return this message
+
+
+#Readiness check (Render health check path): 503 until upstream connections and signing keys are warm
+@router.get("/ready")
+async def ready():
+    if not warmup.ready:
+        raise HTTPException(status_code=503, detail="Iniciando", headers={"Retry-After": "1"})
+    return {"status": "ready", "warmup": warmup.stats()}
+
+
+#In-process cache stats (hit ratio, size, evictions)
+@router.get("/cache/stats", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def cache_stats():
+    return {
+        "catalog": catalog_cache.stats(),
+        "profiles": profile_cache.stats(),
+        "jwt_claims": claims_cache.stats(),
+        "notification_hub": hub.stats(),
+        "notification_outbox": outbox.stats(),
+        "coalescing": inflight.stats(),
+        "upstream": upstream_stats(),
+        "archive": archiver.stats(),
+        "search": search_index.stats(),
+        "images": images.stats(),
+        "compression": compression_stats(),
+        "idempotency": idempotency.stats(),
+        "admission": availability.stats(),
+        "rate_limits": rate_limits.stats(),
+        "warmup": warmup.stats(),
+    }
+
+
+# Prometheus scrape endpoint
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@router.post("/update-archive", include_in_schema=False, dependencies=[Depends(require_admin_token)])
+async def update_archived_items():
+    # Runs archive chunks until caught up or out of request budget; a partial run resumes from the checkpoint
+    try:
+        report = await archiver.run_once()
+        return {"success": True, "message": "Archived items and reservations", **report}
+
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
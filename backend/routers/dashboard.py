@@ -0,0 +1,79 @@
+from fastapi import APIRouter, HTTPException, Response, Depends
+import asyncio
+import httpx
+import orjson
+
+from auth import AuthUser, current_user
+from catalog import build_items_params, fetch_catalog_page, DEFAULT_PAGE_SIZE
+from profiles import get_profile_entry
+from resilience import upstream_failure
+from responses import compose_json
+from upstream import get_auth_headers
+from routers.items import fetch_restaurant_items
+from routers.notifications import fetch_unread_notifications
+from routers.reservations import fetch_customer_reservations
+
+
+# One-round-trip bootstrap payloads for the dashboards
+router = APIRouter()
+
+
+#Everything the restaurant dashboard shows at mount, in one round trip: profile, own items, unread notifications
+@router.get("/dashboard/restaurant")
+async def restaurant_dashboard(user: AuthUser = Depends(current_user)):
+    user_id = user.user_id
+    headers = get_auth_headers(user.token) # JWT verified once for every piece
+
+    try:
+        # Independent Supabase reads run concurrently: the response costs the slowest of them, not their sum
+        profile, items, notifications = await asyncio.gather(
+            get_profile_entry(user_id, headers),
+            fetch_restaurant_items(user_id, headers),
+            fetch_unread_notifications(user_id, headers, "restaurant"),
+        )
+        if profile.role != "restaurant":
+            raise HTTPException(status_code=403, detail="Solo para restaurantes")
+        body = compose_json(
+            profile=profile.row,
+            items=items.content, # Supabase bodies spliced in as received
+            notifications=notifications.content,
+        )
+        return Response(content=body, media_type="application/json")
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+#Everything the customer dashboard shows at mount: profile, first catalog page, active reservations, unread notifications
+@router.get("/dashboard/customer")
+async def customer_dashboard(user: AuthUser = Depends(current_user)):
+    user_id = user.user_id
+    headers = get_auth_headers(user.token)
+    # Same params as GET /items?status=active&available=true, so both share the catalog cache
+    items_params = build_items_params(status="active", available=True)
+
+    try:
+        profile, items, reservations, notifications = await asyncio.gather(
+            get_profile_entry(user_id, headers),
+            fetch_catalog_page(items_params, DEFAULT_PAGE_SIZE, headers),
+            fetch_customer_reservations(user_id, headers, "active", None, DEFAULT_PAGE_SIZE),
+            fetch_unread_notifications(user_id, headers, "customer"),
+        )
+        if profile.role != "customer":
+            raise HTTPException(status_code=403, detail="Solo para clientes")
+        body = compose_json(
+            profile=profile.row,
+            items=items.body, # cached page bytes, spliced in without re-encoding
+            reservations=orjson.dumps(reservations),
+            notifications=notifications.content,
+        )
+        return Response(content=body, media_type="application/json")
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
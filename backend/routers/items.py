@@ -0,0 +1,523 @@
+from fastapi import APIRouter, HTTPException, Header, Query, Request, Response, Depends
+from pydantic import BaseModel
+from uuid import UUID
+from typing import Optional
+import httpx
+import orjson
+
+from admission import availability
+from auth import AuthUser, current_user
+from catalog import (
+    build_items_params, fetch_catalog_page, catalog_cache, catalog_cache_key, raw_page, page_response, invalidate_catalog,
+    CATALOG_SCOPE, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE,
+)
+from geo import build_nearby_params, cover, nearby_page, DEFAULT_RADIUS_KM, MAX_RADIUS_KM
+from idempotency import idempotency
+from images import images
+from notifications_hub import hub
+from outbox import outbox
+from profiles import get_profile_entry
+from resilience import upstream_failure
+from responses import FastJSONResponse, passthrough
+from search import search_index, SEARCH_FIRST_BUILD_WAIT, decode_cursor as decode_search_cursor, encode_cursor as encode_search_cursor
+from upstream import SUPABASE_URL, get_auth_headers, get_client, coalesced_get
+from routers.notifications import new_notification
+
+
+# Catalog (/items) and the restaurant's own offers (/restaurant/items)
+router = APIRouter()
+
+
+#Pydantic Models for Requests (FastAPI)
+#Define data schemas + validate input
+class Item(BaseModel):
+    information: str
+    price: float
+    pickup_time: str
+    total_spots: int  # Number of reservation spots for item
+    image_url: Optional[str] = None 
+    status: Optional[str] = "active" #valid statuses: "active", "cancelled", "completed"
+
+
+#Fetch a page of items from Supabase (filters, projection and keyset pagination run in PostgREST)
+@router.get("/items")
+async def get_items(
+    user: AuthUser = Depends(current_user), # verified JWT from frontend request
+    restaurant_id: Optional[str] = Query(None), # Optional filter
+    status: Optional[str] = Query(None), # "active", "cancelled" or "completed"
+    available: Optional[bool] = Query(None), # true = only items with spots left
+    q: Optional[str] = Query(None, max_length=100), # Text search on information/location
+    pickup_from: Optional[str] = Query(None), # Pickup time window (ISO timestamps)
+    pickup_to: Optional[str] = Query(None),
+    sort: str = Query("pickup_time"), # "pickup_time" or "-pickup_time"
+    fields: Optional[str] = Query(None), # Comma separated columns to return
+    cursor: Optional[str] = Query(None), # next_cursor from the previous page
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None), # ETag of the page the client already has
+    accept_encoding: Optional[str] = Header(None), # cached pages keep their compressed copies
+):
+    
+    jwt_token = user.token # forwarded to Supabase for row-level security
+    headers = get_auth_headers(jwt_token)
+    params = build_items_params( # Supabase PostgREST query params
+        status=status,
+        available=available,
+        q=q,
+        pickup_from=pickup_from,
+        pickup_to=pickup_to,
+        restaurant_id=restaurant_id,
+        sort=sort,
+        fields=fields,
+        cursor=cursor,
+        limit=limit,
+    )
+
+    try:
+        page = await fetch_catalog_page(params, limit, headers)
+        return page_response(page, if_none_match, accept_encoding) # Send page to frontend (304 if the client's ETag still matches)
+    #Handle errors
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise # 404/403/400 raised above keep their status
+    except Exception as e:
+        raise upstream_failure(e) # 503 circuit open, 504 timeout, 502 unreachable, else 500
+
+
+#Active offers with spots left within radius_km of (lat, lng), nearest first
+@router.get("/items/nearby")
+async def get_nearby_items(
+    user: AuthUser = Depends(current_user),
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(DEFAULT_RADIUS_KM, gt=0, le=MAX_RADIUS_KM),
+    cursor: Optional[str] = Query(None), # next_cursor from the previous page
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    headers = get_auth_headers(user.token)
+    radius_m = radius_km * 1000
+    # Only the geohash cells covering the circle are read; the cell set (not the exact point) is the
+    # cache key, so customers in the same neighbourhood share cached candidates
+    params = build_nearby_params(cover(lat, lng, radius_m))
+
+    cache_key = catalog_cache_key(params)
+    generation = catalog_cache.generation
+    candidates = catalog_cache.get(cache_key)
+    if candidates is not None:
+        return FastJSONResponse(nearby_page(orjson.loads(candidates.body), lat, lng, radius_m, cursor, limit))
+
+    try:
+        response = await coalesced_get(
+            f"{SUPABASE_URL}/rest/v1/items",
+            headers=headers,
+            params=params,
+            scope=CATALOG_SCOPE,
+        )
+        response.raise_for_status()
+        rows = orjson.loads(response.content)
+        catalog_cache.set(cache_key, raw_page(response.content), generation=generation) # stored as received
+        return FastJSONResponse(nearby_page(rows, lat, lng, radius_m, cursor, limit))
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+#Full-text offer search: accent-insensitive, typo tolerant, best match first (see search.py)
+@router.get("/items/search")
+async def search_items(
+    user: AuthUser = Depends(current_user),
+    q: str = Query(..., min_length=1, max_length=100),
+    cursor: Optional[str] = Query(None), # next_cursor from the previous page
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    if not search_index.ready and not await search_index.wait_ready(SEARCH_FIRST_BUILD_WAIT):
+        raise HTTPException(status_code=503, detail="Busqueda no disponible todavia", headers={"Retry-After": "1"})
+
+    after = decode_search_cursor(cursor) if cursor else None
+    ranked, more = search_index.search(q, after, limit)
+    next_cursor = encode_search_cursor(*ranked[-1]) if more else None
+    if not ranked:
+        return {"items": [], "next_cursor": next_cursor}
+
+    # The index only knows ids: read the page's rows by primary key so spots/status are current
+    headers = get_auth_headers(user.token)
+    params = [
+        ("select", "*"),
+        ("id", f"in.({','.join(item_id for _, item_id in ranked)})"),
+        ("status", "eq.active"),
+        ("available_spots", "gt.0"),
+    ]
+    cache_key = catalog_cache_key(params)
+    generation = catalog_cache.generation
+    cached = catalog_cache.get(cache_key)
+    try:
+        if cached is not None:
+            rows = orjson.loads(cached.body)
+        else:
+            response = await coalesced_get(
+                f"{SUPABASE_URL}/rest/v1/items",
+                headers=headers,
+                params=params,
+                scope=CATALOG_SCOPE,
+            )
+            response.raise_for_status()
+            rows = orjson.loads(response.content)
+            catalog_cache.set(cache_key, raw_page(response.content), generation=generation)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+    by_id = {row["id"]: row for row in rows}
+    items = [{**by_id[item_id], "score": score} for score, item_id in ranked if item_id in by_id] # sold out/closed rows drop out
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
+
+
+# Items are located where their restaurant is: copy the (cached) profile coordinates onto the new row,
+# and the resized variants when the item reuses the profile picture
+async def with_restaurant_profile(payload: dict, user_id: str, headers: dict) -> dict:
+    profile = await get_profile_entry(user_id, headers)
+    if profile.latitude is not None and profile.longitude is not None:
+        payload["latitude"] = profile.latitude
+        payload["longitude"] = profile.longitude
+    if payload.get("image_url") and payload["image_url"] == profile.profile_picture and profile.picture_variants:
+        payload["image_variants"] = profile.picture_variants
+    return payload
+
+
+#Create new item in Supabase
+@router.post("/items")
+async def create_item(
+    item: Item, 
+    user: AuthUser = Depends(current_user),
+):
+    jwt_token = user.token # forwarded to Supabase for row-level security
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        payload = await with_restaurant_profile(item.dict(exclude_none=True), user.user_id, headers) # exclude None values
+        client = get_client()
+        response = await client.post(
+            f"{SUPABASE_URL}/rest/v1/items?return=representation",
+            headers=headers,
+            json=payload,
+        )
+        response.raise_for_status()
+        invalidate_catalog()
+        created = response.json()
+        for row in created:
+            search_index.add(row) # searchable right away on this instance
+        return created
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+@router.patch("/restaurant/items/{item_id}")
+async def update_restaurant_item(
+    item_id: UUID,
+    update_data: dict,  # expects fields to update, e.g. {"image_url": "..."}
+    user: AuthUser = Depends(current_user),
+):
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        client = get_client()
+        # 1. Verify ownership: Get item restaurant_id
+        res = await client.get(
+            f"{SUPABASE_URL}/rest/v1/items",
+            headers=headers,
+            params={"id": f"eq.{item_id}", "select": "restaurant_id"},
+        )
+        res.raise_for_status()
+        items = res.json()
+        if not items:
+            raise HTTPException(status_code=404, detail="Oferta no acesible!")
+        if items[0]["restaurant_id"] != user_id:
+            raise HTTPException(status_code=403, detail="No tienes autorizacion para actualizar la oferta")
+
+        # 2. PATCH the item with update_data (a new plain image_url drops the previous image's variants)
+        if "image_url" in update_data and "image_variants" not in update_data:
+            update_data = {**update_data, "image_variants": None}
+        patch_res = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/items?id=eq.{item_id}",
+            headers=headers,
+            json=update_data,
+        )
+        patch_res.raise_for_status()
+        # Supabase returns a list of updated rows (usually one element)
+        updated_items = patch_res.json()
+        if not updated_items:
+            raise HTTPException(status_code=500, detail="Error en actualizar oferta!")
+        invalidate_catalog()
+        availability.forget(item_id) # total_spots may have changed
+        search_index.add(updated_items[0]) # text or status may have changed
+        return updated_items[0]  # Return updated item object
+
+    except httpx.HTTPStatusError as e:
+        # e.response.text is a JSON string with error details; try to parse for better detail
+        try:
+            detail = e.response.json()
+        except Exception:
+            detail = e.response.text
+        raise HTTPException(status_code=e.response.status_code, detail=detail)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+async def fetch_restaurant_items(user_id: str, headers: dict) -> httpx.Response:
+    response = await coalesced_get(
+        f"{SUPABASE_URL}/rest/v1/items",
+        headers=headers,
+        params={"restaurant_id": f"eq.{user_id}"}, # Filter by current user's restaurant_id
+        scope=user_id,
+    )
+    response.raise_for_status()
+    return response
+
+
+# Fetch items created by current restaurant
+@router.get("/restaurant/items")
+async def get_restaurant_items(
+    user: AuthUser = Depends(current_user),
+):
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        return passthrough(await fetch_restaurant_items(user_id, headers)) # rows as Supabase sent them
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+# Upload a photo for one of the restaurant's items (raw image body)
+@router.put("/restaurant/items/{item_id}/image")
+async def upload_item_image(item_id: UUID, request: Request, user: AuthUser = Depends(current_user)):
+    headers = get_auth_headers(user.token)
+    data = await images.read_upload(request) # 413/415 before any work
+
+    try:
+        client = get_client()
+        # Verify ownership before resizing and storing anything
+        res = await client.get(
+            f"{SUPABASE_URL}/rest/v1/items",
+            headers=headers,
+            params={"id": f"eq.{item_id}", "select": "restaurant_id"},
+        )
+        res.raise_for_status()
+        items = res.json()
+        if not items:
+            raise HTTPException(status_code=404, detail="Oferta no acesible!")
+        if items[0]["restaurant_id"] != user.user_id:
+            raise HTTPException(status_code=403, detail="No tienes autorizacion para actualizar la oferta")
+
+        variants = await images.process(data) # resized off the event loop, deduplicated by content
+        response = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/items",
+            headers=headers,
+            params={"id": f"eq.{item_id}", "restaurant_id": f"eq.{user.user_id}"}, # only the owner's item
+            json={"image_url": variants["card"]["jpeg"], "image_variants": variants},
+        )
+        response.raise_for_status()
+        updated = response.json()
+        if not updated:
+            raise HTTPException(status_code=404, detail="Oferta no acesible!")
+        invalidate_catalog()
+        return updated[0]
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+# Create item with restaurant_id linked to current user
+@router.post("/restaurant/items")
+async def create_restaurant_item(
+    item: Item,
+    user: AuthUser = Depends(current_user),
+    idempotency_key: Optional[str] = Header(None), # retries with the same key are answered from the first attempt
+):
+    return await idempotency.run(
+        idempotency_key,
+        f"{user.user_id} POST /restaurant/items",
+        item.dict(),
+        lambda: insert_restaurant_item(item, user),
+    )
+
+
+async def insert_restaurant_item(item: Item, user: AuthUser) -> Response:
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    payload = item.dict()
+    payload["restaurant_id"] = user_id  # Enforce restaurant ownership from JWT
+
+    try:
+        await with_restaurant_profile(payload, user_id, headers)
+        client = get_client()
+        response = await client.post(
+            f"{SUPABASE_URL}/rest/v1/items",
+            headers=headers,
+            json=payload,
+        )
+        response.raise_for_status()
+        invalidate_catalog()
+        for row in orjson.loads(response.content):
+            search_index.add(row) # searchable right away on this instance
+        return passthrough(response)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+# Close an item and cascade to its active reservations with a constant number of Supabase calls:
+# 1 PATCH on the item (ownership checked in the filter), 1 set-based PATCH on its reservations, 1 bulk notification insert
+async def close_item(
+    item_id: UUID,
+    restaurant_id: str,
+    headers: dict,
+    status: str, # "cancelled" or "completed"
+    notification_type: str,
+    notification_message: str, # formatted with the item information
+    forbidden_detail: str,
+) -> str:
+    client = get_client()
+
+    # 1. Update the item only if this restaurant owns it
+    item_res = await client.patch(
+        f"{SUPABASE_URL}/rest/v1/items",
+        headers=headers,
+        params={"id": f"eq.{item_id}", "restaurant_id": f"eq.{restaurant_id}", "select": "information"},
+        json={"status": status},
+    )
+    item_res.raise_for_status()
+    item_data = item_res.json()
+    if not item_data:
+        # Nothing updated: find out if the item is missing or belongs to someone else
+        owner_res = await client.get(
+            f"{SUPABASE_URL}/rest/v1/items",
+            headers=headers,
+            params={"id": f"eq.{item_id}", "select": "restaurant_id"},
+        )
+        owner_res.raise_for_status()
+        if not owner_res.json():
+            raise HTTPException(status_code=404, detail="Oferta no acesible!")
+        raise HTTPException(status_code=403, detail=forbidden_detail)
+    invalidate_catalog()
+    availability.forget(item_id) # closed: the next attempt reads the new status
+    search_index.remove(str(item_id)) # no longer an offer
+
+    item_info = item_data[0]["information"]
+
+    # 2. Move every active reservation of the item in one filtered update
+    reservation_res = await client.patch(
+        f"{SUPABASE_URL}/rest/v1/reservations",
+        headers=headers,
+        params={"item_id": f"eq.{item_id}", "status": "eq.active", "select": "id,customer_id"},
+        json={"status": status},
+    )
+    reservation_res.raise_for_status()
+    reservations = reservation_res.json()
+
+    # 3. Notify all affected customers with one bulk insert
+    if reservations:
+        message = notification_message.format(item_info=item_info)
+        notifications = [
+            new_notification(
+                restaurant_id=restaurant_id,
+                reservation_id=str(resv["id"]),
+                type=notification_type,
+                message=message,
+                customer_id=resv["customer_id"],
+            )
+            for resv in reservations
+        ]
+        outbox.enqueue_many("notifications_customer", notifications) # inserted in the background
+        hub.publish_many("customer_id", notifications) # push to each customer's open dashboards
+
+    return item_info
+
+
+# restaurant can cancel their own items
+@router.patch("/restaurant/items/{item_id}/cancel")
+async def cancel_item(
+    item_id: UUID,
+    user: AuthUser = Depends(current_user),
+):
+    jwt_token = user.token
+    restaurant_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        item_info = await close_item(
+            item_id,
+            restaurant_id,
+            headers,
+            status="cancelled",
+            notification_type="cancel",
+            notification_message="La siguiente oferta fue cancelada: '{item_info}'.",
+            forbidden_detail="No tienes autorizacion para cancelar la oferta!",
+        )
+        return {"success": True, "message": f"La siguiente oferta fue cancelada y se ha notificado al cliente: '{item_info}'."}
+
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+    
+
+
+# restaurant can complete their own items
+@router.patch("/restaurant/items/{item_id}/complete")
+async def complete_item(
+    item_id: UUID,
+    user: AuthUser = Depends(current_user),
+):
+    jwt_token = user.token
+    restaurant_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        item_info = await close_item(
+            item_id,
+            restaurant_id,
+            headers,
+            status="completed",
+            notification_type="confirm",
+            notification_message="La oferta siguiente fue completada por el restuarante: '{item_info}'.",
+            forbidden_detail="No tienes autorizacion para completar esta oferta!",
+        )
+        return {"success": True, "message": f"La oferta siguiente fue completada y fue avisado el cliente: '{item_info}'."}
+
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
@@ -0,0 +1,190 @@
+from fastapi import APIRouter, HTTPException, Header, Query, Depends, WebSocket
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from uuid import UUID, uuid4
+from typing import Optional
+from datetime import datetime, timezone
+import httpx
+
+from auth import AuthUser, current_user, stream_user, verify_token
+from notifications_hub import sse_stream, websocket_stream
+from profiles import get_profile_entry
+from resilience import upstream_failure
+from responses import passthrough
+from upstream import SUPABASE_URL, get_auth_headers, get_client, coalesced_get
+
+
+# Unread notifications, live streams (SSE / WebSocket) and read receipts
+router = APIRouter()
+
+
+class MarkNotificationsRead(BaseModel):
+    ids: Optional[list[UUID]] = Field(None, max_length=500) # specific notifications
+    before: Optional[datetime] = None # or every unread one created before this time
+
+
+# Notification row with id/created_at set here, so it can be pushed to streams without reading it back
+def new_notification(**fields) -> dict:
+    return {
+        "id": str(uuid4()),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        **fields,
+    }
+
+
+# Notifications table + owner column for the caller's role
+async def notification_target(user_id: str, headers: dict) -> tuple[str, str]:
+    return notification_table((await get_profile_entry(user_id, headers)).role) # cached profiles row
+
+
+def notification_table(role: Optional[str]) -> tuple[str, str]:
+    if role not in ("restaurant", "customer"):
+        raise HTTPException(status_code=400, detail="Tipo de usuario inválido")
+    if role == "restaurant":
+        return "notifications_restaurant", "restaurant_id"
+    return "notifications_customer", "customer_id"
+
+
+async def fetch_unread_notifications(user_id: str, headers: dict, role: Optional[str]) -> httpx.Response:
+    notifications_table, filter_key = notification_table(role)
+
+    # Fetch only unread notifications with ordering
+    params = {
+        filter_key: f"eq.{user_id}",
+        "read": "eq.false",             # <-- filter unread only
+        "order": "created_at.desc"
+    }
+
+    notifs_res = await coalesced_get(
+        f"{SUPABASE_URL}/rest/v1/{notifications_table}",
+        headers=headers,
+        params=params,
+        scope=user_id,
+    )
+    notifs_res.raise_for_status()
+    return notifs_res
+
+
+#get notifications
+@router.get("/notifications")
+async def get_notifications(user: AuthUser = Depends(current_user)):
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        # Choose the correct notifications table and foreign key column based on role (cached profiles row)
+        role = (await get_profile_entry(user_id, headers)).role
+        return passthrough(await fetch_unread_notifications(user_id, headers, role)) # no per-row validation/re-encode
+
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+# Live notification stream (Server-Sent Events). Reconnects resume from Last-Event-ID (or ?resume=).
+@router.get("/notifications/stream")
+async def notifications_stream(
+    user: AuthUser = Depends(stream_user), # header or ?access_token= (EventSource can't set headers)
+    last_event_id: Optional[str] = Header(None),
+    resume: Optional[str] = Query(None),
+):
+    return StreamingResponse(
+        sse_stream(user.user_id, last_event_id or resume),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # don't let proxies buffer events
+    )
+
+
+# Live notification stream over WebSocket (?access_token=...&resume=...)
+@router.websocket("/notifications/ws")
+async def notifications_ws(websocket: WebSocket, access_token: str = Query(...), resume: Optional[str] = Query(None)):
+    try:
+        user = await verify_token(access_token)
+    except HTTPException:
+        await websocket.close(code=4401) # 4401 = unauthorized (app-defined close code)
+        return
+    await websocket.accept()
+    await websocket_stream(websocket, user.user_id, resume)
+
+
+# Mark many notifications as read with one filtered update: a list of ids and/or all unread before a timestamp
+@router.patch("/notifications/read")
+async def mark_notifications_as_read(body: MarkNotificationsRead, user: AuthUser = Depends(current_user)):
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    if not body.ids and body.before is None:
+        raise HTTPException(status_code=400, detail="Indica ids o before")
+
+    try:
+        client = get_client()
+        notifications_table, user_key = await notification_target(user_id, headers)
+
+        # Only the caller's unread notifications match, so other users' ids are ignored
+        params = {
+            user_key: f"eq.{user_id}",
+            "read": "eq.false",
+            "select": "id",
+        }
+        if body.ids:
+            params["id"] = f"in.({','.join(str(i) for i in body.ids)})"
+        if body.before is not None:
+            params["created_at"] = f"lt.{body.before.isoformat()}"
+
+        update_res = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/{notifications_table}",
+            headers=headers,
+            params=params,
+            json={"read": True},
+        )
+        update_res.raise_for_status()
+
+        return {"updated": [row["id"] for row in update_res.json()]}
+
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+# Mark a notification as read
+@router.patch("/notifications/{notification_id}/read")
+async def mark_notification_as_read(notification_id: str, user: AuthUser = Depends(current_user)):
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        client = get_client()
+        notifications_table, user_key = await notification_target(user_id, headers)
+
+        # Mark as read only if the notification belongs to this user (ownership is part of the filter)
+        update_res = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/{notifications_table}",
+            headers=headers,
+            params={
+                "id": f"eq.{notification_id}",
+                user_key: f"eq.{user_id}",
+                "select": "id"
+            },
+            json={"read": True},
+        )
+        update_res.raise_for_status()
+        if not update_res.json():
+            raise HTTPException(status_code=404, detail="Notificación no encontrada o no te pertenece")
+
+        return {"message": "Notificación marcada como leída"}
+
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
@@ -0,0 +1,153 @@
+from fastapi import APIRouter, HTTPException, Request, Response, Depends
+import httpx
+
+from auth import AuthUser, current_user
+from catalog import invalidate_catalog
+from images import images
+from profiles import get_profile_entry, remember_profile, forget_profile
+from resilience import upstream_failure
+from upstream import SUPABASE_URL, get_auth_headers, get_client
+
+
+# The caller's profile row and profile picture
+router = APIRouter()
+
+
+# user gets their profile
+@router.get("/profile")
+async def get_profile(user: AuthUser = Depends(current_user)):
+    jwt_token = user.token
+    user_id = user.user_id
+
+    headers = get_auth_headers(jwt_token)
+    try:
+        profile = await get_profile_entry(user_id, headers) # cached profiles row
+        return Response(content=profile.row, media_type="application/json")
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+#user updates their profile
+@router.patch("/profile")
+async def update_profile(payload: dict, user: AuthUser = Depends(current_user)):
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        client = get_client()
+        previous = None
+        if "latitude" in payload or "longitude" in payload:
+            # Stored coordinates, read fresh (the cached row may predate a move made on another instance)
+            stored = await client.get(
+                f"{SUPABASE_URL}/rest/v1/profiles",
+                headers=headers,
+                params={"user_id": f"eq.{user_id}", "select": "latitude,longitude"},
+            )
+            stored.raise_for_status()
+            previous = stored.json()
+        res = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/profiles?user_id=eq.{user_id}",
+            headers=headers,
+            json=payload,
+        )
+        res.raise_for_status()
+        updated = res.json()
+        if updated:
+            profile = remember_profile(user_id, updated[0]) # write-through to the profile cache
+            location = (profile.latitude, profile.longitude)
+            if profile.role == "restaurant" and previous and (previous[0]["latitude"], previous[0]["longitude"]) != location:
+                # The restaurant moved: its live offers move with it (geohash is regenerated by Postgres)
+                moved = await client.patch(
+                    f"{SUPABASE_URL}/rest/v1/items",
+                    headers={**headers, "Prefer": "return=minimal"},
+                    params={"restaurant_id": f"eq.{user_id}", "status": "eq.active"},
+                    json={"latitude": location[0], "longitude": location[1]},
+                )
+                moved.raise_for_status()
+                invalidate_catalog()
+        else:
+            forget_profile(user_id)
+        return {"success": True, "message": "Perfil actualizado!"}
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+#get profile picture for restaurant item creation
+@router.get("/profile/picture")
+async def get_profile_picture(user: AuthUser = Depends(current_user)):
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        profile = await get_profile_entry(user_id, headers) # cached profiles row
+        return {"profile_picture": profile.profile_picture}
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+@router.patch("/profile/picture")
+async def update_profile_picture(payload: dict, user: AuthUser = Depends(current_user)):
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        # Update profile picture URL in profile table
+        client = get_client()
+        response = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/profiles?user_id=eq.{user_id}",
+            headers=headers,
+            json={"profile_picture": payload["profile_picture"], "picture_variants": None}, # old variants are of the previous picture
+        )
+        response.raise_for_status()
+        updated = response.json()[0]
+        remember_profile(user_id, updated) # write-through to the profile cache
+        return updated
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+# Upload a new profile picture (raw image body); the profile points at the resized variants
+@router.put("/profile/picture/image")
+async def upload_profile_picture(request: Request, user: AuthUser = Depends(current_user)):
+    user_id = user.user_id
+    headers = get_auth_headers(user.token)
+    data = await images.read_upload(request) # 413/415 before any work
+
+    try:
+        variants = await images.process(data) # resized off the event loop, deduplicated by content
+        client = get_client()
+        response = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/profiles?user_id=eq.{user_id}",
+            headers=headers,
+            json={"profile_picture": variants["card"]["jpeg"], "picture_variants": variants},
+        )
+        response.raise_for_status()
+        updated = response.json()
+        if not updated:
+            raise HTTPException(status_code=404, detail="Perfil no encontrado!")
+        remember_profile(user_id, updated[0]) # write-through to the profile cache
+        return updated[0]
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
@@ -0,0 +1,342 @@
+from fastapi import APIRouter, HTTPException, Header, Query, Response, Depends
+from pydantic import BaseModel
+from uuid import UUID
+from typing import Optional
+from datetime import datetime
+import httpx
+import orjson
+
+from admission import availability
+from auth import AuthUser, current_user
+from catalog import invalidate_catalog, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from idempotency import idempotency
+from notifications_hub import hub
+from outbox import outbox
+from reservations import build_reservation_params, paginate_reservations, ITEM_CARD_FIELDS, RESERVATION_FIELDS
+from resilience import upstream_failure
+from responses import FastJSONResponse, passthrough
+from upstream import SUPABASE_URL, get_auth_headers, get_client, coalesced_get
+from routers.notifications import new_notification
+
+
+# Customer reservations (/reservations) and a restaurant's view of an item's reservations
+router = APIRouter()
+
+
+class Reservation(BaseModel):
+    customer_id: UUID # Supabase customer ID
+    item_id: UUID     # Item being reserved
+    timestamp: datetime
+    status: Optional[str] = "active"  #valid statuses: "active", "cancelled", "completed"
+    quantity: int = 1
+
+
+async def fetch_customer_reservations(user_id: str, headers: dict, status: Optional[str], cursor: Optional[str], limit: int) -> dict:
+    params = build_reservation_params(
+        [("customer_id", f"eq.{user_id}")], # scoped to the caller, not only through RLS
+        select=f"{RESERVATION_FIELDS},item:items({ITEM_CARD_FIELDS})", # only the item fields the cards render
+        status=status,
+        cursor=cursor,
+        limit=limit,
+    )
+    response = await coalesced_get(
+        f"{SUPABASE_URL}/rest/v1/reservations", # Supabase reservations table
+        headers=headers,
+        params=params,
+        scope=user_id,
+    )
+    response.raise_for_status()
+    return paginate_reservations(orjson.loads(response.content), limit)
+
+
+#Get the caller's reservations, newest first (filters and keyset pagination run in PostgREST)
+@router.get("/reservations")
+async def get_reservations(
+    user: AuthUser = Depends(current_user), # verified JWT from frontend request
+    status: Optional[str] = Query(None), # "active", or several: "cancelled,completed"
+    cursor: Optional[str] = Query(None), # next_cursor from the previous page
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    
+    jwt_token = user.token # forwarded to Supabase for row-level security
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        page = await fetch_customer_reservations(user.user_id, headers, status, cursor, limit) # page of reservations + next_cursor
+        return FastJSONResponse(page)
+    #Handle Errors
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+#Restaurant view: reservations of one of its items, newest first
+@router.get("/restaurant/items/{item_id}/reservations")
+async def get_item_reservations(
+    item_id: UUID,
+    user: AuthUser = Depends(current_user),
+    status: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    headers = get_auth_headers(user.token)
+    params = build_reservation_params(
+        # inner join on the item keeps only rows of items this restaurant owns
+        [("item_id", f"eq.{item_id}"), ("item.restaurant_id", f"eq.{user.user_id}")],
+        select=f"{RESERVATION_FIELDS},item:items!inner(id)",
+        status=status,
+        cursor=cursor,
+        limit=limit,
+    )
+
+    try:
+        response = await coalesced_get(
+            f"{SUPABASE_URL}/rest/v1/reservations",
+            headers=headers,
+            params=params,
+            scope=user.user_id,
+        )
+        response.raise_for_status()
+        page = paginate_reservations(orjson.loads(response.content), limit)
+        for reservation in page["reservations"]:
+            reservation.pop("item", None) # only there for the ownership filter
+        return FastJSONResponse(page)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+
+#Create Reservation + Increment Counter for item (one atomic RPC, see migrations/002_reserve_item.sql)
+@router.post("/reservations")
+async def create_reservation(
+    reservation: Reservation,
+    user: AuthUser = Depends(current_user),
+    idempotency_key: Optional[str] = Header(None), # retries with the same key are answered from the first attempt
+):
+    return await idempotency.run(
+        idempotency_key,
+        f"{user.user_id} POST /reservations",
+        reservation.dict(),
+        lambda: reserve(reservation, user),
+    )
+
+
+async def reserve(reservation: Reservation, user: AuthUser) -> Response:
+    jwt_token = user.token # forwarded to Supabase for row-level security
+    headers = get_auth_headers(jwt_token)
+
+    # Validate quantity
+    if reservation.quantity < 1:
+        raise HTTPException(status_code=400, detail="Quantity must be at least 1")
+
+    try:
+        # Sold-out offers are answered here; concurrent attempts beyond the spots left wait their turn
+        async with availability.admit(str(reservation.item_id), reservation.quantity, headers) as admission:
+            client = get_client()
+            # Lock item, check spots, insert reservation and bump the counter in a single transaction
+            rpc_response = await client.post(
+                f"{SUPABASE_URL}/rest/v1/rpc/reserve_item",
+                headers=headers,
+                json={
+                    "item_uuid": str(reservation.item_id),
+                    "customer_uuid": str(reservation.customer_id),
+                    "reserve_quantity": reservation.quantity,
+                    "reserved_at": reservation.timestamp.isoformat(),
+                }
+            )
+            if rpc_response.status_code >= 400:
+                error = reservation_error(rpc_response, reservation.quantity)
+                if error.status_code == 409: # reserve_item reports the spots actually left
+                    admission.rejected(spots=int(rpc_response.json().get("details") or 0))
+                elif error.status_code == 410:
+                    admission.rejected(active=False)
+                else:
+                    admission.rejected()
+                raise error
+            admission.reserved()
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+    invalidate_catalog() # spots left changed
+    return passthrough(rpc_response) # [reservation row]
+
+
+# Map reserve_item's PTxxx errors to clear messages for the frontend
+def reservation_error(response: httpx.Response, quantity: int) -> HTTPException:
+    try:
+        error = response.json()
+    except Exception:
+        return HTTPException(status_code=response.status_code, detail=f"Failed to create reservation: {response.text}")
+
+    code = error.get("code")
+    if code == "PT409":
+        available = error.get("details") or "0"
+        if available == "0":
+            return HTTPException(status_code=409, detail="Oferta agotada!")
+        return HTTPException(
+            status_code=409,
+            detail=f"Only {available} spot(s) available, but {quantity} requested."
+        )
+    if code == "PT404":
+        return HTTPException(status_code=404, detail="Item not found")
+    if code == "PT410":
+        return HTTPException(status_code=410, detail="La oferta ya no esta disponible!")
+    if code == "PT403":
+        return HTTPException(status_code=403, detail="No tienes autorizacion para reservar por otro cliente!")
+    if code == "PT400":
+        return HTTPException(status_code=400, detail="Quantity must be at least 1")
+    return HTTPException(status_code=response.status_code, detail=f"Failed to create reservation: {response.text}")
+
+
+# cancel customer item reservation   
+@router.patch("/reservations/{reservation_id}/cancel")
+async def cancel_reservation(
+    reservation_id: UUID,
+    user: AuthUser = Depends(current_user),
+):
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        client = get_client()
+        # 1. Get reservation details
+        res = await client.get(
+            f"{SUPABASE_URL}/rest/v1/reservations",
+            headers=headers,
+            params={
+                "id": f"eq.{reservation_id}",
+                "select": "customer_id,item_id,status"
+            },
+        )
+        res.raise_for_status()
+        data = res.json()
+
+        if not data:
+            raise HTTPException(status_code=404, detail="Error en encontrar la reservacion!")
+
+        reservation = data[0]
+
+        if reservation["customer_id"] != user_id:
+            raise HTTPException(status_code=403, detail="Error en actualizar reservacion!")
+
+        if reservation["status"] == "cancelled":
+            raise HTTPException(status_code=400, detail="La reservacion ya fue cancelada!")
+
+        item_id = reservation["item_id"]
+
+        # 2. Cancel the reservation
+        patch_response = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/reservations?id=eq.{reservation_id}",
+            headers=headers,
+            json={"status": "cancelled"},
+        )
+        patch_response.raise_for_status()
+
+        # 3. Decrement reservation count
+        rpc_response = await client.post(
+            f"{SUPABASE_URL}/rest/v1/rpc/decrement_num_of_reservations",
+            headers=headers,
+            json={"item_uuid": str(item_id)},
+        )
+        rpc_response.raise_for_status()
+        invalidate_catalog() # spot freed up
+        availability.forget(item_id)
+
+        # 4. Get item info to find restaurant_id
+        item_res = await client.get(
+            f"{SUPABASE_URL}/rest/v1/items",
+            headers=headers,
+            params={"id": f"eq.{item_id}", "select": "information,restaurant_id"},
+        )
+        item_res.raise_for_status()
+        item_data = item_res.json()
+
+        if not item_data:
+            raise HTTPException(status_code=404, detail="Oferta no encontrada!")
+
+        item = item_data[0]
+        restaurant_id = item["restaurant_id"]
+        item_info = item["information"]
+
+        # 5. Send notification to restaurant
+        notification_payload = new_notification(
+            restaurant_id=restaurant_id,
+            reservation_id=str(reservation_id),
+            type="cancel",
+            message=f"Reservacion para '{item_info}'fue cancelada por un cliente.",
+            customer_id=user_id,
+        )
+        outbox.enqueue("notifications_restaurant", notification_payload) # inserted in the background
+        hub.publish(restaurant_id, notification_payload) # push to the restaurant's open dashboards
+
+        return {"success": True, "message": "Reservacion cancelada!"}
+
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
+
+# confirm customer item reservation
+@router.patch("/reservations/{reservation_id}/complete")
+async def confirm_reservation(
+    reservation_id: UUID,
+    user: AuthUser = Depends(current_user),
+):
+    jwt_token = user.token
+    user_id = user.user_id
+    headers = get_auth_headers(jwt_token)
+
+    try:
+        client = get_client()
+        # Step 1: Get reservation details
+        params = {
+            "id": f"eq.{reservation_id}",
+            "select": "customer_id,item_id,status"
+        }
+        res = await client.get(
+            f"{SUPABASE_URL}/rest/v1/reservations",
+            headers=headers,
+            params=params,
+        )
+        res.raise_for_status()
+        data = res.json()
+
+        if not data:
+            raise HTTPException(status_code=404, detail="Reservacion no encontrada!")
+        reservation = data[0]
+
+        if reservation["customer_id"] != user_id:
+            raise HTTPException(status_code=403, detail="No tienes autorizacion para editar la reservacion!")
+
+        if reservation["status"] == "completed":
+            raise HTTPException(status_code=400, detail="Reservacion ya fue completada!")
+
+        # Step 2: Confirm the reservation
+        patch_response = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/reservations?id=eq.{reservation_id}",
+            headers=headers,
+            json={"status": "completed"},
+        )
+        patch_response.raise_for_status()
+
+        return {"success": True, "message": "Reservacion completada!"}
+
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise upstream_failure(e)
@@ -0,0 +1,314 @@
+import asyncio
+import base64
+import bisect
+import contextvars
+import heapq
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Optional
+from fastapi import HTTPException
+
+from upstream import SUPABASE_URL, SUPABASE_KEY, get_client
+
+
+logger = logging.getLogger(__name__)
+
+# In-process inverted index over the text of active items (information + location), so search
+# never scans the catalog. Terms are accent-folded, lowercased and lightly stemmed for Spanish;
+# a trigram index over the vocabulary gives typo tolerance and the sorted vocabulary gives
+# search-as-you-type prefixes. The index only holds ids and terms: result pages are read back
+# from Supabase by id, so spots/status are always current.
+#
+# Kept up to date by the item routes in routers/items.py (create/update/cancel/complete); a periodic
+# rebuild picks up writes made by other instances and items archived in the database.
+# The first build starts with the first search, not at startup, so a cold start doesn't read the
+# whole catalog while it serves its first requests.
+SEARCH_REBUILD_INTERVAL = float(os.getenv("SEARCH_REBUILD_INTERVAL", "300")) # Seconds between full rebuilds, 0 = only the first build
+SEARCH_FIRST_BUILD_WAIT = float(os.getenv("SEARCH_FIRST_BUILD_WAIT", "3")) # Seconds the first search waits for the index before a 503
+SEARCH_LOAD_PAGE_SIZE = 1000 # Rows per Supabase read while (re)building
+FIELD_WEIGHTS = {"information": 2, "location": 1}
+PREFIX_EXPANSIONS = 50 # Vocabulary terms a partial last word may expand to
+FUZZY_EXPANSIONS = 5 # Closest terms a misspelled word may expand to
+FUZZY_MIN_SIMILARITY = 0.3 # Trigram similarity (same measure as pg_trgm)
+FUZZY_MIN_LENGTH = 4 # Shorter words are too ambiguous to correct
+
+STOPWORDS = {
+    "a", "al", "con", "de", "del", "el", "en", "la", "las", "lo", "los", "o", "para", "por", "sin",
+    "su", "sus", "u", "un", "una", "unas", "unos", "y",
+}
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)) # "Jalapeño" -> "jalapeno"
+
+
+# Plural stripping is the bulk of what matters for short Spanish offer descriptions
+def stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("es"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def analyze(text: Optional[str]) -> list[str]:
+    if not text:
+        return []
+    return [stem(word) for word in WORD.findall(fold(text)) if word not in STOPWORDS]
+
+
+def trigrams(term: str) -> set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Cursor = last row's (score, id), same opaque base64 encoding as the /items cursor
+def encode_cursor(score: float, item_id: str) -> str:
+    raw = json.dumps([score, item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(score), str(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor invalido")
+
+
+class SearchIndex:
+    def __init__(self):
+        self._docs: dict[str, dict[str, int]] = {} # item id -> term -> field weight
+        self._postings: dict[str, dict[str, int]] = {} # term -> item id -> field weight
+        self._trigrams: defaultdict[str, set[str]] = defaultdict(set) # trigram -> terms
+        self._vocabulary: list[str] = [] # sorted terms, for prefix matches
+        self._replay: Optional[list[tuple[str, object]]] = None # writes seen while a rebuild is loading
+        self._task: Optional[asyncio.Task] = None
+        self._built: Optional[asyncio.Event] = None # set once a build has finished
+        self.ready = False
+        self.built_at: Optional[float] = None
+        self.build_ms: Optional[float] = None
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    # ---------------------------------------------------------------- maintenance
+
+    def add(self, row: dict, keep_sorted: bool = True):
+        item_id = str(row["id"])
+        if self._replay is not None:
+            self._replay.append(("add", row))
+        if row.get("status", "active") != "active":
+            self._remove(item_id)
+            return
+        terms: dict[str, int] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in analyze(row.get(field)):
+                terms[term] = max(terms.get(term, 0), weight)
+        self._remove(item_id)
+        self._docs[item_id] = terms
+        for term, weight in terms.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                for gram in trigrams(term):
+                    self._trigrams[gram].add(term)
+                if keep_sorted:
+                    bisect.insort(self._vocabulary, term)
+            posting[item_id] = weight
+
+    def remove(self, item_id: str):
+        if self._replay is not None:
+            self._replay.append(("remove", str(item_id)))
+        self._remove(str(item_id))
+
+    def _remove(self, item_id: str):
+        terms = self._docs.pop(item_id, None)
+        if not terms:
+            return
+        for term in terms:
+            posting = self._postings[term]
+            posting.pop(item_id, None)
+            if not posting:
+                del self._postings[term]
+                for gram in trigrams(term):
+                    self._trigrams[gram].discard(term)
+                    if not self._trigrams[gram]:
+                        del self._trigrams[gram]
+                index = bisect.bisect_left(self._vocabulary, term)
+                if index < len(self._vocabulary) and self._vocabulary[index] == term:
+                    del self._vocabulary[index]
+
+    # ---------------------------------------------------------------- queries
+
+    # Vocabulary terms a query word stands for, with how well each matches (1.0 = exact)
+    def _expand(self, word: str, partial: bool) -> dict[str, float]:
+        matches = {}
+        if word in self._postings:
+            matches[word] = 1.0
+        if partial and len(word) >= 2: # the user may still be typing the last word
+            start = bisect.bisect_left(self._vocabulary, word)
+            for term in self._vocabulary[start:start + PREFIX_EXPANSIONS + 1]:
+                if not term.startswith(word):
+                    break
+                if term != word:
+                    matches[term] = 0.6 + 0.4 * len(word) / len(term)
+        if not matches and len(word) >= FUZZY_MIN_LENGTH:
+            grams = trigrams(word)
+            shared: dict[str, int] = defaultdict(int)
+            for gram in grams:
+                for term in self._trigrams.get(gram, ()):
+                    shared[term] += 1
+            scored = []
+            for term, count in shared.items():
+                similarity = count / (len(grams) + len(trigrams(term)) - count)
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    scored.append((similarity, term))
+            for similarity, term in heapq.nlargest(FUZZY_EXPANSIONS, scored):
+                matches[term] = 0.8 * similarity
+        return matches
+
+    # Ids of active items matching every word of the query, best first, keyset-paginated on (score, id)
+    def search(self, query: str, after: Optional[tuple[float, str]], limit: int) -> tuple[list[tuple[float, str]], bool]:
+        started = time.perf_counter()
+        try:
+            words = list(dict.fromkeys(analyze(query)))
+            if not words:
+                return [], False
+            partial = not query[-1:].isspace()
+            expansions = [self._expand(word, partial and i == len(words) - 1) for i, word in enumerate(words)]
+            if not all(expansions):
+                return [], False
+
+            # Most selective word first, so later words only look at surviving candidates
+            expansions.sort(key=lambda matches: sum(len(self._postings[term]) for term in matches))
+            scores: dict[str, float] = {}
+            for term, match in expansions[0].items():
+                for item_id, weight in self._postings[term].items():
+                    score = match * weight
+                    if score > scores.get(item_id, 0.0):
+                        scores[item_id] = score
+            for matches in expansions[1:]:
+                postings = [(self._postings[term], match) for term, match in matches.items()]
+                narrowed = {}
+                for item_id, score in scores.items():
+                    best = max((match * posting[item_id] for posting, match in postings if item_id in posting), default=0.0)
+                    if best:
+                        narrowed[item_id] = score + best
+                scores = narrowed
+
+            ranked = ((-round(score, 6), item_id) for item_id, score in scores.items())
+            if after is not None:
+                boundary = (-after[0], after[1])
+                ranked = (entry for entry in ranked if entry > boundary)
+            page = heapq.nsmallest(limit + 1, ranked)
+            return [(-negative, item_id) for negative, item_id in page[:limit]], len(page) > limit
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - started
+
+    # ---------------------------------------------------------------- loading
+
+    # Read every active item (id + text only) and swap it in as the new index
+    async def rebuild(self):
+        started = time.perf_counter()
+        fresh = SearchIndex()
+        self._replay = []
+        try:
+            headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
+            last_id = None
+            while True:
+                params = {"select": "id,information,location,status", "status": "eq.active", "order": "id.asc", "limit": str(SEARCH_LOAD_PAGE_SIZE)}
+                if last_id is not None:
+                    params["id"] = f"gt.{last_id}"
+                res = await get_client().get(f"{SUPABASE_URL}/rest/v1/items", headers=headers, params=params)
+                res.raise_for_status()
+                rows = res.json()
+                for row in rows:
+                    fresh.add(row, keep_sorted=False)
+                if len(rows) < SEARCH_LOAD_PAGE_SIZE:
+                    break
+                last_id = rows[-1]["id"]
+            fresh._vocabulary = sorted(fresh._postings)
+
+            replay, self._replay = self._replay, None
+            for op, value in replay: # route writes that raced with the load
+                if op == "add":
+                    fresh.add(value)
+                else:
+                    fresh.remove(value)
+            self._docs, self._postings, self._trigrams, self._vocabulary = fresh._docs, fresh._postings, fresh._trigrams, fresh._vocabulary
+        finally:
+            self._replay = None
+        self.ready = True
+        if self._built is not None:
+            self._built.set()
+        self.built_at = time.time()
+        self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info("Search index built: %d items, %d terms in %.1f ms", len(self._docs), len(self._postings), self.build_ms)
+
+    async def _run(self):
+        delay = 1.0
+        while True:
+            try:
+                await self.rebuild()
+                delay = 1.0
+                if SEARCH_REBUILD_INTERVAL <= 0:
+                    return
+                await asyncio.sleep(SEARCH_REBUILD_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Search index build failed, retrying in %.0fs: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+
+    # Called by the first search; builds run in the background
+    async def start(self):
+        if self._task is None:
+            self._built = asyncio.Event() # created here so it belongs to the running loop
+            if self.ready:
+                self._built.set()
+            # Fresh context: started from a request, the task would otherwise inherit its deadline
+            # (resilience._deadline) and every later rebuild would fail once that budget ran out
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    # Starts the index if needed; False if it is still not built after timeout seconds
+    async def wait_ready(self, timeout: float) -> bool:
+        await self.start()
+        try:
+            await asyncio.wait_for(self._built.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.ready
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "items": len(self._docs),
+            "terms": len(self._postings),
+            "trigrams": len(self._trigrams),
+            "build_ms": self.build_ms,
+            "age_seconds": round(time.time() - self.built_at, 1) if self.built_at else None,
+            "queries": self.queries,
+            "avg_query_ms": round(self.query_seconds / self.queries * 1000, 3) if self.queries else 0.0,
+        }
+
+
+search_index = SearchIndex()
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+
+# Request coalescing: concurrent calls with the same key share one in-flight call and its result.
+# Nothing is kept after the call finishes, so callers never see data older than the in-flight window.
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0 # calls actually made
+        self.followers = 0 # callers that joined an in-flight call instead
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        future = self._calls.get(key)
+        if future is not None:
+            self.followers += 1
+            return await asyncio.shield(future) # a follower disconnecting doesn't cancel the shared call
+
+        self.leaders += 1
+        future = asyncio.ensure_future(fn()) # own task: the leader's client going away doesn't fail the followers
+        self._calls[key] = future
+        future.add_done_callback(lambda _, key=key: self._finished(key, future))
+        return await asyncio.shield(future)
+
+    def _finished(self, key: Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            future.exception() # mark retrieved: nobody may be waiting anymore
+
+    # Callers arriving after a write must not join a read that started before it
+    def forget(self, scope: Hashable):
+        for key in [key for key in self._calls if key[0] == scope]:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        total = self.leaders + self.followers
+        return {
+            "name": self.name,
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced": self.followers,
+            "coalesced_ratio": round(self.followers / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+
+import httpx
+import jwt
+import pytest
+
+
+# Tests run against bench/fake_supabase.py in-process (no network, no real Supabase project).
+# Settings are read when the backend modules are imported, so they are set before any import.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "bench"))
+
+SERVICE_KEY = "test-service-key"
+JWT_SECRET = "test-jwt-secret-test-jwt-secret-00"
+os.environ.setdefault("SUPABASE_URL", "http://supabase.test")
+os.environ.setdefault("SUPABASE_KEY", SERVICE_KEY)
+os.environ.setdefault("SUPABASE_JWT_SECRET", JWT_SECRET)
+os.environ["FAKE_SUPABASE_SERVICE_KEY"] = os.environ["SUPABASE_KEY"]
+os.environ["FAKE_SUPABASE_LATENCY_MS"] = "2" # enough for concurrent calls to interleave
+os.environ["FAKE_SUPABASE_JITTER_MS"] = "2"
+
+import fake_supabase # noqa: E402
+import upstream # noqa: E402
+from auth import AuthUser # noqa: E402
+from metrics import InstrumentedTransport # noqa: E402
+from resilience import ConcurrencyLimitedTransport, ResilientTransport # noqa: E402
+
+
+def make_user(user_id: str) -> AuthUser:
+    claims = {"sub": user_id, "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + 3600}
+    return AuthUser(jwt.encode(claims, os.environ["SUPABASE_JWT_SECRET"]), user_id, "authenticated", claims["exp"], claims)
+
+
+# Shared Supabase client (same transport chain as production) pointed at the fake;
+# tests open and close it inside their event loop with upstream.open_client()/close_client()
+@pytest.fixture
+def supabase(monkeypatch):
+    def create_client() -> httpx.AsyncClient:
+        transport = httpx.ASGITransport(app=fake_supabase.app)
+        return httpx.AsyncClient(transport=ConcurrencyLimitedTransport(ResilientTransport(InstrumentedTransport(transport))))
+
+    monkeypatch.setattr(upstream, "create_client", create_client)
+    monkeypatch.setattr(upstream, "_client", None)
+    return fake_supabase
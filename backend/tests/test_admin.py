@@ -0,0 +1,36 @@
+import asyncio
+
+import httpx
+import pytest
+
+
+def post_update_archive(headers: dict) -> int:
+    import main
+
+    async def call():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://backend.test") as client:
+            return (await client.post("/update-archive", headers=headers)).status_code
+
+    return asyncio.run(call())
+
+
+# The token is checked before the handler runs, so none of these reach Supabase
+@pytest.mark.parametrize("token, headers, status", [
+    (None, {"Authorization": "Bearer anything"}, 404), # no ADMIN_TOKEN: endpoint off
+    ("admin-secret", {}, 401),
+    ("admin-secret", {"Authorization": "Bearer wrong"}, 401),
+    ("admin-secret", {"Authorization": "admin-secret"}, 401), # scheme required
+])
+def test_update_archive_requires_admin_token(monkeypatch, token, headers, status):
+    from routers import admin
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", token)
+    assert post_update_archive(headers) == status
+
+
+def test_metrics_token_does_not_open_update_archive(monkeypatch):
+    from routers import admin
+
+    monkeypatch.setattr(admin, "METRICS_TOKEN", "scrape-secret")
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "admin-secret")
+    assert post_update_archive({"Authorization": "Bearer scrape-secret"}) == 401
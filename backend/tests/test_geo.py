@@ -0,0 +1,68 @@
+import asyncio
+
+import orjson
+
+from conftest import make_user
+
+
+LAT, LNG = -12.0464, -77.0428
+RADIUS_KM = 50.0 # covers every seeded restaurant
+
+
+def collect_nearby(fixtures: dict) -> tuple[list[str], set]:
+    import upstream
+    from catalog import catalog_cache
+    from routers import items
+
+    user = make_user(fixtures["customers"][0])
+    catalog_cache.clear()
+
+    async def scenario():
+        await upstream.open_client()
+        try:
+            ids, flags, cursor = [], set(), None
+            while True:
+                response = await items.get_nearby_items(user=user, lat=LAT, lng=LNG, radius_km=RADIUS_KM, cursor=cursor, limit=25)
+                page = orjson.loads(response.body)
+                ids += [item["id"] for item in page["items"]]
+                flags.add(page["truncated"])
+                cursor = page["next_cursor"]
+                if not cursor:
+                    return ids, flags
+        finally:
+            await upstream.close_client()
+
+    return asyncio.run(scenario())
+
+
+def expected(rows: list[dict]) -> list[str]:
+    import geo
+
+    ranked = sorted((geo.distance_m(LAT, LNG, row["latitude"], row["longitude"]), row["id"]) for row in rows)
+    return [item_id for distance, item_id in ranked if distance <= RADIUS_KM * 1000]
+
+
+def test_nearby_under_the_cap_is_complete(supabase, monkeypatch):
+    import geo
+
+    fixtures = supabase.seed(restaurants=40, customers=1, items_per_restaurant=5, notifications_per_user=0)
+    monkeypatch.setattr(geo, "NEARBY_MAX_CANDIDATES", 200) # exactly the catalog: not truncated
+
+    ids, flags = collect_nearby(fixtures)
+    assert ids == expected(supabase.store.rows("items"))
+    assert flags == {False}
+
+
+# Past the cap the kept candidates are the first ones in (geohash, id) order, the same on every
+# page and every query, and the response says so instead of silently dropping offers
+def test_nearby_over_the_cap_is_stable_and_flagged(supabase, monkeypatch):
+    import geo
+
+    fixtures = supabase.seed(restaurants=40, customers=1, items_per_restaurant=5, notifications_per_user=0)
+    monkeypatch.setattr(geo, "NEARBY_MAX_CANDIDATES", 60)
+
+    ids, flags = collect_nearby(fixtures)
+    kept = sorted(supabase.store.rows("items"), key=lambda row: (row["geohash"], row["id"]))[:60]
+    assert ids == expected(kept)
+    assert flags == {True}
+    assert collect_nearby(fixtures)[0] == ids
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import make_user
+
+
+SPOTS = 7
+ATTEMPTS = 60
+
+
+# N customers reserve the same item at once through the route's reserve(): exactly SPOTS succeed,
+# the rest get 409, spots left never go negative, and once sold out admission answers without
+# calling reserve_item at all
+def test_concurrent_reservations_never_oversell(supabase):
+    import upstream
+    from admission import AvailabilityTracker
+    from routers import reservations
+
+    fixtures = supabase.seed(restaurants=1, customers=ATTEMPTS, items_per_restaurant=1, spots=SPOTS, notifications_per_user=0)
+    item_id = fixtures["items"][0]["id"]
+    item = supabase.store.tables["items"][item_id]
+    tracker = AvailabilityTracker() # fresh counts: nothing cached from other tests
+    lowest = [item["available_spots"]]
+
+    async def reserve(customer_id: str):
+        reservation = reservations.Reservation(customer_id=customer_id, item_id=item_id, timestamp=datetime.now(timezone.utc))
+        try:
+            await reservations.reserve(reservation, make_user(customer_id))
+            return 201
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            lowest[0] = min(lowest[0], item["available_spots"])
+
+    async def scenario():
+        await upstream.open_client()
+        try:
+            return await asyncio.gather(*(reserve(customer_id) for customer_id in fixtures["customers"]))
+        finally:
+            await upstream.close_client()
+
+    original = reservations.availability
+    reservations.availability = tracker
+    try:
+        statuses = asyncio.run(scenario())
+    finally:
+        reservations.availability = original
+
+    assert statuses.count(201) == SPOTS
+    assert statuses.count(409) == ATTEMPTS - SPOTS
+    assert lowest[0] >= 0
+    assert item["num_of_reservations"] == SPOTS and item["available_spots"] == 0
+    assert sum(1 for r in supabase.store.rows("reservations") if r["item_id"] == item_id) == SPOTS
+    # Held spots make the late arrivals wait, then fail fast: only winning attempts reach the RPC
+    assert supabase.store.calls["RPC reserve_item"] == SPOTS
+    assert tracker.rejected_fast == ATTEMPTS - SPOTS
+
+
+# The same guarantee from migrations/002_reserve_item.sql itself, on a real Postgres
+# (TEST_DATABASE_URL: a scratch database, see bench/reservation_concurrency.py)
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_reserve_item_sql_never_oversells():
+    import reservation_concurrency as bench
+
+    dsn = os.environ["TEST_DATABASE_URL"]
+    conn = bench.setup(dsn)
+    item_id = bench.create_item(conn, SPOTS)
+    try:
+        results, _ = bench.run(dsn, item_id, ATTEMPTS * 3, 20, 0.0, bench.reserve_atomic)
+        with conn.cursor() as cur:
+            cur.execute("select total_spots - num_of_reservations from items where id = %s", (item_id,))
+            spots_left = cur.fetchone()[0]
+            cur.execute("select count(*) from reservations where item_id = %s", (item_id,))
+            reserved = cur.fetchone()[0]
+        assert sum(ok for ok, _ in results) == SPOTS
+        assert reserved == SPOTS
+        assert spots_left == 0
+    finally:
+        bench.cleanup(conn, [str(item_id)])
+        conn.close()
+
+
+def test_reservation_for_another_customer_is_rejected(supabase):
+    import upstream
+    from routers import reservations
+
+    fixtures = supabase.seed(restaurants=1, customers=2, items_per_restaurant=1, notifications_per_user=0)
+    item_id = fixtures["items"][0]["id"]
+    caller, other = fixtures["customers"]
+
+    async def scenario():
+        await upstream.open_client()
+        try:
+            reservation = reservations.Reservation(customer_id=other, item_id=item_id, timestamp=datetime.now(timezone.utc))
+            await reservations.reserve(reservation, make_user(caller))
+        finally:
+            await upstream.close_client()
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 403
+    assert not any(r["customer_id"] == other for r in supabase.store.rows("reservations") if r["item_id"] == item_id)
+
+
+def test_unknown_item_is_404(supabase):
+    import upstream
+    from routers import reservations
+
+    fixtures = supabase.seed(restaurants=1, customers=1, items_per_restaurant=1, notifications_per_user=0)
+    customer_id = fixtures["customers"][0]
+
+    async def scenario():
+        await upstream.open_client()
+        try:
+            reservation = reservations.Reservation(customer_id=customer_id, item_id=uuid.uuid4(), timestamp=datetime.now(timezone.utc))
+            await reservations.reserve(reservation, make_user(customer_id))
+        finally:
+            await upstream.close_client()
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 404
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+
+# The first search starts the index from inside a request: later rebuilds must not run under
+# that request's deadline (they used to fail with DeadlineExceeded once its budget was spent)
+def test_rebuild_outlives_first_search_budget(supabase, monkeypatch):
+    import resilience
+    import search
+    import upstream
+
+    supabase.seed(restaurants=1, customers=1, items_per_restaurant=3, notifications_per_user=0)
+    monkeypatch.setattr(search, "SEARCH_REBUILD_INTERVAL", 0.05)
+    index = search.SearchIndex()
+
+    async def scenario():
+        await upstream.open_client()
+        try:
+            token = resilience._deadline.set(time.monotonic() + 0.2) # what DeadlineMiddleware sets
+            try:
+                assert await index.wait_ready(2)
+            finally:
+                resilience._deadline.reset(token)
+            await asyncio.sleep(0.3) # the first search's budget has run out
+            expired_build = index.built_at
+
+            # Written by "another instance" after that; only a later rebuild can pick it up
+            supabase.store.insert("items", {
+                "restaurant_id": "r", "information": "Quinua atamalada", "location": "Lima",
+                "pickup_time": "2030-01-01T00:00:00+00:00", "total_spots": 3,
+            })
+            await asyncio.sleep(0.3)
+            ranked, _ = index.search("quinua", None, 10)
+            return expired_build, index.built_at, ranked
+        finally:
+            await index.stop()
+            await upstream.close_client()
+
+    expired_build, last_build, ranked = asyncio.run(scenario())
+    assert last_build > expired_build
+    assert len(ranked) == 1
+
+
+def test_search_folds_accents_and_typos():
+    import search
+
+    index = search.SearchIndex()
+    index.add({"id": "1", "information": "Ají de gallina", "location": "Miraflores", "status": "active"})
+    index.add({"id": "2", "information": "Pan de piña", "location": "Barranco", "status": "active"})
+    index.add({"id": "3", "information": "Ají de gallina", "location": "Lima", "status": "cancelled"})
+
+    assert [item_id for _, item_id in index.search("aji", None, 10)[0]] == ["1"]
+    assert [item_id for _, item_id in index.search("gallna", None, 10)[0]] == ["1"] # typo
+    assert [item_id for _, item_id in index.search("pin", None, 10)[0]] == ["2"] # prefix of piña
+
@@ -0,0 +1,97 @@
+import os
+import httpx # (SUPABASE) HTTP client to send requests to Supabase REST API
+from dotenv import load_dotenv # To load Supabase keys from .env file
+
+from metrics import InstrumentedTransport # Per-call latency/error metrics
+from resilience import ConcurrencyLimitedTransport, ResilientTransport # Call cap, deadlines, hedging, retries, circuit breaker
+from singleflight import SingleFlight # Coalesces identical concurrent reads
+
+
+load_dotenv() # Load environment variables from the .env locally or from Render's env vars
+
+SUPABASE_URL = os.getenv("SUPABASE_URL") # Supabase url
+SUPABASE_KEY = os.getenv("SUPABASE_KEY") # Supabase service key
+
+if not SUPABASE_URL or not SUPABASE_KEY:
+    raise RuntimeError("Missing SUPABASE_URL or SUPABASE_KEY in .env")
+
+
+# Connection pool settings for the shared Supabase client (override with env vars on Render)
+POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "100")) # Max open connections to Supabase
+POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "20")) # Idle connections kept warm between requests
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "60")) # Seconds an idle connection is kept open
+CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5")) # Seconds to open a TCP+TLS connection
+READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "15")) # Seconds to wait for a Supabase response
+POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", "5")) # Seconds to wait for a free connection from the pool
+HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() in ("1", "true", "yes") # Multiplex requests over one connection
+
+
+_client: httpx.AsyncClient | None = None # One client for the whole app lifetime (reuses TCP+TLS connections)
+
+
+def create_client() -> httpx.AsyncClient:
+    transport = httpx.AsyncHTTPTransport(
+        http2=HTTP2,
+        limits=httpx.Limits(
+            max_connections=POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=POOL_MAX_KEEPALIVE,
+            keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return httpx.AsyncClient(
+        # metrics see every attempt, hedges included; the cap counts each logical call once
+        transport=ConcurrencyLimitedTransport(ResilientTransport(InstrumentedTransport(transport))),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT, pool=POOL_TIMEOUT),
+    )
+
+
+# Called from the FastAPI lifespan handler on startup
+async def open_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+
+# Called from the FastAPI lifespan handler on shutdown
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# Shared client used by every endpoint
+def get_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise RuntimeError("Supabase client is not open (lifespan not started)")
+    return _client
+
+
+#Authorization Headers for Supabase
+def get_auth_headers(jwt: str):
+    return {
+        "apikey": SUPABASE_KEY, # Required for Supabase REST access
+        "Authorization": f"Bearer {jwt}", # User JWT (JSON Web Token) passed from frontend. JWT represents user identity and permissions (acts as ID card)
+        "Content-Type": "application/json",
+        "Prefer": "return=representation", # Ask Supabase to return inserted row
+    }
+
+
+# Identical concurrent GETs share one upstream call (the burst of customers loading the same catalog page)
+inflight = SingleFlight("supabase_get")
+
+
+def _params_key(params) -> tuple:
+    if not params:
+        return ()
+    items = params.items() if isinstance(params, dict) else params
+    return tuple((str(key), str(value)) for key, value in items)
+
+
+# GET that joins an identical in-flight GET from the same auth scope instead of sending its own.
+# scope = whose rows the query returns under RLS: the user id for per-user reads, or a shared
+# scope (catalog.CATALOG_SCOPE) for rows every authenticated user sees. The first caller's headers are used.
+async def coalesced_get(url: str, *, headers: dict, params=None, scope: str) -> httpx.Response:
+    key = (scope, url, _params_key(params))
+    return await inflight.do(key, lambda: get_client().get(url, headers=headers, params=params))
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from auth import JWT_SECRET, refresh_jwks
+from upstream import SUPABASE_URL, SUPABASE_KEY, get_client
+
+
+logger = logging.getLogger(__name__)
+
+# The instance spins down when idle, so the first request after waking used to pay for the TLS
+# handshakes to Supabase and the JWKS download on top of its own work. Right after startup this
+# opens the pool's connections and loads the signing keys; GET /ready answers 503 until it is done.
+# Caches are not pre-filled: the only key the backend holds is the service key, which bypasses RLS,
+# and rows read with it must never end up in a cache that user requests are answered from.
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "2")) # Connections opened ahead of traffic
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "10")) # Seconds before /ready passes anyway
+
+
+def service_headers() -> dict:
+    return {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
+
+
+class Warmup:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+        self.started_at = 0.0
+        self.seconds: Optional[float] = None
+        self.steps: dict[str, str] = {} # step -> "ok" or the error
+
+    async def _step(self, name: str, action):
+        try:
+            await action
+            self.steps[name] = "ok"
+        except Exception as e: # a cold path is slower, not broken: serve anyway
+            self.steps[name] = f"{type(e).__name__}: {e}"
+            logger.warning("Warm-up step %s failed: %s", name, e)
+
+    # Concurrent cheap reads: each one leaves an open (TLS) connection in the pool. The responses are
+    # discarded (service key), only the connections are kept
+    async def _connections(self):
+        client = get_client()
+        responses = await asyncio.gather(*(
+            client.get(f"{SUPABASE_URL}/rest/v1/items", headers=service_headers(), params={"select": "id", "limit": "1"})
+            for _ in range(WARMUP_CONNECTIONS)
+        ))
+        for response in responses:
+            response.raise_for_status()
+
+    async def _run(self):
+        steps = [self._step("connections", self._connections())]
+        if JWT_SECRET is None:
+            steps.append(self._step("jwks", refresh_jwks())) # no-op if the refresh task just loaded them
+        try:
+            await asyncio.wait_for(asyncio.gather(*steps), WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Warm-up did not finish in %.0fs, serving anyway", WARMUP_TIMEOUT)
+        self.seconds = round(time.monotonic() - self.started_at, 3)
+        self.ready = True
+
+    # Called from the FastAPI lifespan handler; runs in the background so / answers right away
+    async def start(self):
+        if self._task is None:
+            self.started_at = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.ready = False
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "seconds": self.seconds, "steps": self.steps}
+
+
+warmup = Warmup()
@@ -21,6 +21,25 @@ export const getAccessToken = async (supabase) => { //supabase.auth.getSession()
 
 
 
+// POST with an Idempotency-Key: timeouts and network errors are retried with the same key,
+// so the backend performs the write once and answers the retries with the first response
+const postIdempotent = async (url, body, headers, { retries = 2, timeout = 10000 } = {}) => {
+  const key = crypto.randomUUID();
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await axios.post(url, body, { headers: { ...headers, "Idempotency-Key": key }, timeout });
+    } catch (err) {
+      const status = err.response?.status;
+      const retryAfter = Number(err.response?.headers?.["retry-after"]); // 429/503: wait as long as the backend asks
+      const retryable = !err.response || status >= 502 || retryAfter > 0;
+      if (!retryable || attempt >= retries) throw err;
+      await new Promise((resolve) => setTimeout(resolve, retryAfter > 0 ? retryAfter * 1000 : 500 * 2 ** attempt));
+    }
+  }
+};
+
+
+
 //USER FUNCTIONS
 
 // Fetch the profile of the logged-in user
@@ -85,10 +104,33 @@ export const markNotificationAsRead = async (supabase, notificationId) => {
 };
 
 
+// Mark many notifications as read in one request
+// selector: { ids: [...] } and/or { before: ISO timestamp } (all unread created before it)
+// returns { updated: [ids] }
+export const markNotificationsAsRead = async (supabase, selector) => {
+  const token = await getAccessToken(supabase);
+  if (!token) throw new Error("No autenticado");
+
+  try {
+    const res = await axios.patch(`${API_BASE_URL}/notifications/read`, selector, {
+      headers: {
+        Authorization: `Bearer ${token}`,
+        "Content-Type": "application/json",
+      },
+    });
+    return res.data;
+  } catch (err) {
+    console.error("Error marking notifications as read:", err);
+    throw new Error(err.response?.data?.detail || "Error al marcar notificaciones como leídas");
+  }
+};
+
 
 //CUSTOMER FUNCTIONS
-// Fetch all available food items (for customers)
-export const fetchItems = async (supabase) => {
+// Fetch a page of food items (for customers)
+// params: status, available, q, pickup_from, pickup_to, sort, fields, cursor, limit
+// returns { items, next_cursor }
+export const fetchItems = async (supabase, params = {}) => {
   //Gets the access token. If the user is not logged in, throws an error
   const token = await getAccessToken(supabase);
   if (!token) throw new Error("No autenticado");
@@ -96,8 +138,9 @@ export const fetchItems = async (supabase) => {
   try {
     const res = await axios.get(`${API_BASE_URL}/items`, { // Make a GET request to the /items route in FastAPI backend
       headers: { Authorization: `Bearer ${token}` }, // with an Authorization header
+      params, // filters + pagination are applied by the backend
     });
-    return res.data; //Returns the data from the response (the food items)
+    return res.data; //Returns the data from the response (page of food items + next_cursor)
   }
   //If the request fails, logs the error and throws a readable error 
   catch (err) {
@@ -106,6 +149,58 @@ export const fetchItems = async (supabase) => {
   }
 };
 
+// Everything a dashboard shows at mount, in one request
+// role "customer" -> { profile, items: { items, next_cursor }, reservations: { reservations, next_cursor }, notifications }
+// role "restaurant" -> { profile, items, notifications }
+export const fetchDashboard = async (supabase, role) => {
+  const token = await getAccessToken(supabase);
+  if (!token) throw new Error("No autenticado");
+
+  try {
+    const res = await axios.get(`${API_BASE_URL}/dashboard/${role}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    return res.data;
+  } catch (err) {
+    console.error("Error fetching dashboard:", err);
+    throw new Error(err.response?.data?.detail || "Error cargando el panel");
+  }
+};
+
+// Fetch active offers near a point, nearest first (each item carries distance_m)
+export const fetchNearbyItems = async (supabase, { lat, lng, radiusKm = 5, cursor } = {}) => {
+  const token = await getAccessToken(supabase);
+  if (!token) throw new Error("No autenticado");
+
+  try {
+    const res = await axios.get(`${API_BASE_URL}/items/nearby`, {
+      headers: { Authorization: `Bearer ${token}` },
+      params: { lat, lng, radius_km: radiusKm, ...(cursor ? { cursor } : {}) },
+    });
+    return res.data; // page of items + next_cursor
+  } catch (err) {
+    console.error("Error fetching nearby items:", err);
+    throw new Error(err.response?.data?.detail || "Error encontrando ofertas cercanas");
+  }
+};
+
+// Search active offers by text (accents and small typos are ignored), best match first
+export const searchItems = async (supabase, q, cursor) => {
+  const token = await getAccessToken(supabase);
+  if (!token) throw new Error("No autenticado");
+
+  try {
+    const res = await axios.get(`${API_BASE_URL}/items/search`, {
+      headers: { Authorization: `Bearer ${token}` },
+      params: { q, ...(cursor ? { cursor } : {}) },
+    });
+    return res.data; // page of items + next_cursor
+  } catch (err) {
+    console.error("Error searching items:", err);
+    throw new Error(err.response?.data?.detail || "Error buscando ofertas");
+  }
+};
+
 // Create a reservation
 export const createReservation = async (supabase, payload) => {
   const token = await getAccessToken(supabase);
@@ -121,8 +216,8 @@ export const createReservation = async (supabase, payload) => {
       quantity: payload.quantity || 1,
     };
 
-    const res = await axios.post(`${API_BASE_URL}/reservations`, fullPayload, {
-      headers: { Authorization: `Bearer ${token}` },
+    const res = await postIdempotent(`${API_BASE_URL}/reservations`, fullPayload, {
+      Authorization: `Bearer ${token}`,
     });
 
     return res.data;
@@ -133,8 +228,9 @@ export const createReservation = async (supabase, payload) => {
 };
 
 
-// Get user reservations
-export const fetchReservations = async (supabase) => {
+// Get user reservations, newest first
+// params: { status: "active" | "cancelled,completed", cursor, limit } -> { reservations, next_cursor }
+export const fetchReservations = async (supabase, params = {}) => {
   //Gets the access token. If the user is not logged in, throws an error
   const token = await getAccessToken(supabase);
   if (!token) throw new Error("No autenticado");
@@ -142,6 +238,7 @@ export const fetchReservations = async (supabase) => {
   try {
     const res = await axios.get(`${API_BASE_URL}/reservations`, { //Make a GET request /reservations to retrieve reservations for the authenticated user.
       headers: { Authorization: `Bearer ${token}` },
+      params,
     });
     return res.data; //Returns the data from the response
   } 
@@ -152,6 +249,23 @@ export const fetchReservations = async (supabase) => {
   }
 };
 
+// Get the reservations of one of the restaurant's offers
+export const fetchItemReservations = async (supabase, itemId, params = {}) => {
+  const token = await getAccessToken(supabase);
+  if (!token) throw new Error("No autenticado");
+
+  try {
+    const res = await axios.get(`${API_BASE_URL}/restaurant/items/${itemId}/reservations`, {
+      headers: { Authorization: `Bearer ${token}` },
+      params,
+    });
+    return res.data; // { reservations, next_cursor }
+  } catch (err) {
+    console.error("Error fetching item reservations:", err);
+    throw new Error(err.response?.data?.detail || "Error encontrando reservaciones");
+  }
+};
+
 // Cancel a reservation
 export const cancelReservation = async (supabase, reservation_id) => {
   const session = await supabase.auth.getSession();
@@ -227,11 +341,9 @@ export const createRestaurantItem = async (supabase, itemData) => {
   if (!token) throw new Error("No autenticado");
 
   try {
-    const res = await axios.post(`${API_BASE_URL}/restaurant/items`, itemData, {
-      headers: {
-        "Content-Type": "application/json",
-        Authorization: `Bearer ${token}`,
-      },
+    const res = await postIdempotent(`${API_BASE_URL}/restaurant/items`, itemData, {
+      "Content-Type": "application/json",
+      Authorization: `Bearer ${token}`,
     });
 
     // If res.data is a list, return the first item
@@ -292,28 +404,33 @@ export const completeRestaurantItem = async (supabase, itemId) => {
 };
 
 
-// Upload an image to Supabase Storage and return its public URL
+// Upload an item photo to the backend, which stores resized variants and points the item at them.
+// Returns the updated item (image_url + image_variants)
 export const uploadItemImage = async (supabase, file, itemId) => {
   if (!file) throw new Error("Error encontrando archivo");
+  const token = await getAccessToken(supabase);
+  if (!token) throw new Error("No autenticado");
 
-  const fileExt = file.name.split(".").pop();
-  const filePath = `item-images/${itemId}-${Date.now()}.${fileExt}`;
-
-  const { error } = await supabase.storage
-    .from("item-images")
-    .upload(filePath, file, {
-      cacheControl: "3600",
-      upsert: true,
+  try {
+    const res = await axios.put(`${API_BASE_URL}/restaurant/items/${itemId}/image`, file, {
+      headers: { Authorization: `Bearer ${token}`, "Content-Type": file.type },
     });
-
-  if (error) {
-    throw new Error("Error en subir imagen: " + error.message);
+    return res.data;
+  } catch (err) {
+    console.error("Error uploading item image:", err);
+    throw new Error("Error en subir imagen: " + (err.response?.data?.detail || err.message));
   }
-
-  const { data } = supabase.storage.from("item-images").getPublicUrl(filePath);
-  return data.publicUrl;
 };
 
+// srcSet for an item/profile image from its resized variants (WebP, every browser we support reads it)
+export const imageSrcSet = (variants) =>
+  variants
+    ? ["thumb", "card", "full"]
+        .filter((name) => variants[name])
+        .map((name) => `${variants[name].webp} ${variants[name].width}w`)
+        .join(", ")
+    : undefined;
+
 // Update the restaurant item with the uploaded image URL
 export const updateRestaurantItemImage = async (itemId, imageUrl, supabase) => {
   const token = await getAccessToken(supabase);
@@ -379,6 +496,44 @@ export const fetchNotifications = async (supabase) => {
 };
 
 
+// Subscribe to live notifications (Server-Sent Events) instead of polling /notifications
+// onNotification(notification) for each new one; onReset() when the list must be reloaded
+// returns an unsubscribe function
+export const subscribeNotifications = (supabase, onNotification, onReset) => {
+  let source = null;
+  let closed = false;
+  let lastEventId = null; // resume token, so reconnects replay what was missed
+
+  const connect = async () => {
+    const token = await getAccessToken(supabase); // fresh token on every (re)connect
+    if (!token || closed) return;
+
+    const params = new URLSearchParams({ access_token: token });
+    if (lastEventId) params.set("resume", lastEventId);
+    source = new EventSource(`${API_BASE_URL}/notifications/stream?${params}`);
+
+    source.addEventListener("ready", (e) => { lastEventId = e.lastEventId || lastEventId; });
+    source.addEventListener("notification", (e) => {
+      lastEventId = e.lastEventId || lastEventId;
+      onNotification(JSON.parse(e.data));
+    });
+    source.addEventListener("reset", () => { if (onReset) onReset(); });
+    source.onerror = () => {
+      // EventSource retries by itself; if it gave up (e.g. expired token), reconnect with a new token
+      if (source.readyState === EventSource.CLOSED && !closed) {
+        setTimeout(connect, 2000);
+      }
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    if (source) source.close();
+  };
+};
+
+
 // (Optional) Create a notification (mostly for admin/testing purposes)
 export const createNotification = async (supabase, notificationData) => {
   const token = await getAccessToken(supabase);
@@ -399,25 +554,22 @@ export const createNotification = async (supabase, notificationData) => {
 };
 
 
-export const uploadProfilePicture = async (supabase, file, userId) => {
+// Upload a profile picture to the backend; the profile is updated with the resized variants.
+// Returns the new profile_picture URL
+export const uploadProfilePicture = async (supabase, file) => {
   if (!file) throw new Error("No file provided");
+  const token = await getAccessToken(supabase);
+  if (!token) throw new Error("No autenticado");
 
-  const fileExt = file.name.split(".").pop();
-  const filePath = `item-images/${userId}-profile-${Date.now()}.${fileExt}`;
-
-  const { error } = await supabase.storage
-    .from("item-images")
-    .upload(filePath, file, {
-      cacheControl: "3600",
-      upsert: true,
+  try {
+    const res = await axios.put(`${API_BASE_URL}/profile/picture/image`, file, {
+      headers: { Authorization: `Bearer ${token}`, "Content-Type": file.type },
     });
-
-  if (error) {
-    throw new Error("Failed to upload image: " + error.message);
+    return res.data.profile_picture;
+  } catch (err) {
+    console.error("Error uploading profile picture:", err);
+    throw new Error("Failed to upload image: " + (err.response?.data?.detail || err.message));
   }
-
-  const { data } = supabase.storage.from("item-images").getPublicUrl(filePath);
-  return data.publicUrl;
 };
 
 export const updateProfilePictureUrl = async (supabase, imageUrl) => {
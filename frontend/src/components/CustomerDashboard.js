@@ -1,26 +1,37 @@
 //NOTES: CustomerDashboard.js goes through fastAPI backend, doesn't talk directly to Supabase
 
 
-import { useEffect, useState } from "react"; //useEffect: runs side-effects (e.g., fetching data after component mounts), useState: allows you to create reactive variables (items, loading, etc.)
+import { useEffect, useRef, useState } from "react"; //useEffect: runs side-effects (e.g., fetching data after component mounts), useState: allows you to create reactive variables (items, loading, etc.)
 import { supabase } from "./supabaseClient"; //initialize Supabase client, used to get the user session and token
 import { Link } from "react-router-dom"; //Link for navigation
 import { 
+  fetchDashboard,
   fetchItems, 
+  fetchNearbyItems,
+  searchItems,
+  imageSrcSet,
   fetchReservations, 
   createReservation, 
   cancelReservation, 
   completeReservation,
   fetchNotifications,
-  markNotificationAsRead } from "../api"; //helper functions that make HTTP requests to FastAPI backend
+  subscribeNotifications,
+  markNotificationAsRead,
+  markNotificationsAsRead } from "../api"; //helper functions that make HTTP requests to FastAPI backend
 
 export default function CustomerDashboard({ user }) { //main react component
   //state setup
   const [items, setItems] = useState([]); //food items pulled from the backend
-  const [reservations, setReservations] = useState([]); //current user’s reservations
+  const [reservations, setReservations] = useState([]); //current user’s active reservations
+  const [history, setHistory] = useState([]); //cancelled/completed reservations, loaded on demand
+  const [historyCursor, setHistoryCursor] = useState(null); //next page of the history (null = none/not loaded)
+  const [historyLoaded, setHistoryLoaded] = useState(false);
   const [notifications, setNotifications] = useState([]); //// Notifications state
   const [loading, setLoading] = useState(false); //loading tracks if app is currently fetching data
   const [error, setError] = useState(""); //error messaging if error encountered during processes
   const [searchTerm, setSearchTerm] = useState(""); //search terms
+  const [nearMe, setNearMe] = useState(null); //{ lat, lng } when showing offers near the customer
+  const [searchResults, setSearchResults] = useState(null); //backend search results for searchTerm (null = not searching)
   const [showOffers, setShowOffers] = useState(true);
   const [showReservations, setShowReservations] = useState(true);
   const [showNotifications, setShowNotifications] = useState(true);
@@ -29,8 +40,10 @@ export default function CustomerDashboard({ user }) { //main react component
   // Load available items from backend
   const loadItems = async () => {
     try {
-      const data = await fetchItems(supabase); //HTTP request to your backend (using Supabase for token)
-      setItems(data); //data is set to items state
+      const data = nearMe
+        ? await fetchNearbyItems(supabase, nearMe) //offers within 5 km, nearest first
+        : await fetchItems(supabase, { status: "active", available: true }); //HTTP request to your backend (using Supabase for token), only offers with spots left
+      setItems(data.items); //page of items is set to items state
       setError("");
     } catch (err) {
       //handle errors
@@ -46,8 +59,11 @@ export default function CustomerDashboard({ user }) { //main react component
         setReservations([]);
         return;
       }
-      const data = await fetchReservations(supabase); //HTTP request to your backend (using Supabase for token)
-      setReservations(data);
+      const data = await fetchReservations(supabase, { status: "active" }); //HTTP request to your backend (using Supabase for token)
+      setReservations(data.reservations);
+      setHistory([]); //statuses may have changed: reload the history on demand
+      setHistoryCursor(null);
+      setHistoryLoaded(false);
       setError("");
     } catch (err) {
       //handle errors
@@ -56,6 +72,21 @@ export default function CustomerDashboard({ user }) { //main react component
     }
   };
 
+  // Load the next page of past (cancelled/completed) reservations
+  const loadHistory = async () => {
+    try {
+      const params = { status: "cancelled,completed" };
+      if (historyCursor) params.cursor = historyCursor;
+      const data = await fetchReservations(supabase, params);
+      setHistory((prev) => [...prev, ...data.reservations]);
+      setHistoryCursor(data.next_cursor);
+      setHistoryLoaded(true);
+    } catch (err) {
+      console.error(err);
+      setError(err.message || "Failed to load your reservations.");
+    }
+  };
+
   
   // Load customer notifications
   const loadNotifications = async () => {
@@ -78,37 +109,93 @@ export default function CustomerDashboard({ user }) { //main react component
   };
 
 
+  // Everything shown at mount (offers, reservations, notifications) in one request
+  const loadDashboard = async () => {
+    try {
+      const data = await fetchDashboard(supabase, "customer");
+      setItems(data.items.items);
+      setReservations(data.reservations.reservations);
+      setNotifications(data.notifications);
+      setHistory([]);
+      setHistoryCursor(null);
+      setHistoryLoaded(false);
+      setError("");
+    } catch (err) {
+      console.error(err);
+      // fall back to the individual endpoints
+      loadItems();
+      loadReservations();
+      loadNotifications();
+    }
+  };
+
+  const itemsToggled = useRef(false);
   useEffect(() => {
+    if (!itemsToggled.current) { // the first page comes with the dashboard bootstrap
+      itemsToggled.current = true;
+      return;
+    }
     loadItems(); 
-  }, []); //Run loadItems() when the component first mounts (empty [] dependency)
+  }, [nearMe]); //Run loadItems() when "near me" is toggled
 
+  // Search on the backend while typing (debounced); if it fails the list below is filtered locally
   useEffect(() => {
-    loadReservations();
-    loadNotifications(); // load notifications on user change
-
-    if (!user?.id) return;
-
-    // Subscribe to realtime notifications for this customer
-    const channel = supabase
-      .channel("customer-notifications")
-      .on(
-        "postgres_changes",
-        {
-          event: "INSERT",
-          schema: "public",
-          table: "notifications",
-          filter: `customer_id=eq.${user.id}`,
-        },
-        (payload) => {
-          // Prepend new notification to the list
-          setNotifications((prev) => [payload.new, ...prev]);
-        }
-      )
-      .subscribe();
-
+    const term = searchTerm.trim();
+    if (!term) {
+      setSearchResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const data = await searchItems(supabase, term);
+        if (!cancelled) setSearchResults(data.items);
+      } catch (err) {
+        console.error(err);
+        if (!cancelled) setSearchResults(null);
+      }
+    }, 250);
     return () => {
-      supabase.removeChannel(channel);
+      cancelled = true;
+      clearTimeout(timer);
     };
+  }, [searchTerm]);
+
+  // Toggle "near me" using the browser's location
+  const toggleNearMe = () => {
+    if (nearMe) {
+      setNearMe(null);
+      return;
+    }
+    if (!navigator.geolocation) {
+      setError("Tu navegador no permite obtener la ubicación.");
+      return;
+    }
+    navigator.geolocation.getCurrentPosition(
+      (position) => setNearMe({ lat: position.coords.latitude, lng: position.coords.longitude }),
+      () => setError("No pudimos obtener tu ubicación.")
+    );
+  };
+
+  useEffect(() => {
+    if (!user?.id) {
+      setReservations([]);
+      setNotifications([]);
+      return;
+    }
+    loadDashboard(); // reload everything on user change
+
+    // Subscribe to live notifications for this customer (pushed by the backend)
+    const unsubscribe = subscribeNotifications(
+      supabase,
+      (notification) => {
+        // Prepend new notification to the list
+        setNotifications((prev) => [notification, ...prev.filter((n) => n.id !== notification.id)]);
+      },
+      loadNotifications // missed too many while disconnected: reload the list
+    );
+
+    return unsubscribe;
   }, [user?.id]);
   
 
@@ -225,11 +312,22 @@ const complete = async (reservation_id) => {
   }
 };
 
+// mark every unread notification as read in one request
+  const handleMarkAllNotificationsAsRead = async () => {
+  try {
+    const { updated } = await markNotificationsAsRead(supabase, { before: new Date().toISOString() });
+    setNotifications((prev) => prev.filter((n) => !updated.includes(n.id)));
+  } catch (err) {
+    console.error("Error al marcar todas como leídas:", err);
+    alert("Error al marcar las notificaciones como leídas.");
+  }
+};
+
 
 
 
   //Filter items based on search input
-  const filteredItems = items
+  const filteredItems = (searchResults ?? items)
     .map(item => ({
       ...item,
       available: item.total_spots - (item.num_of_reservations || 0)
@@ -237,8 +335,9 @@ const complete = async (reservation_id) => {
     .filter(item => item.available > 0)
     .filter(item => item.status === "active")
     .filter(item =>
+      searchResults !== null || // already matched (and ranked) by the backend
       item.information.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      item.location.toLowerCase().includes(searchTerm.toLowerCase())
+      (item.location || "").toLowerCase().includes(searchTerm.toLowerCase())
     );
 
 
@@ -480,6 +579,9 @@ return (
           e.target.style.boxShadow = "0 2px 8px rgba(0, 0, 0, 0.06)";
         }}
       />
+      <button onClick={toggleNearMe} style={{ ...styles.button, marginBottom: "24px" }}>
+        {nearMe ? "Ver todas las ofertas" : "📍 Cerca de mí"}
+      </button>
 
       {/* Available Food Offers */}
       <h3 style={styles.sectionTitle} onClick={() => setShowOffers(!showOffers)}>
@@ -519,6 +621,9 @@ return (
                   {item.image_url && (
                     <img
                       src={item.image_url}
+                      srcSet={imageSrcSet(item.image_variants)} //browser picks the smallest variant that fits
+                      sizes="(max-width: 600px) 100vw, 480px"
+                      loading="lazy"
                       alt={item.information}
                       style={styles.cardImage}
                     />
@@ -538,6 +643,7 @@ return (
                     </p>
                     <p style={styles.cardText}>
                       <strong>Ubicación:</strong> {item.location}
+                      {item.distance_m != null && ` (${(item.distance_m / 1000).toFixed(1)} km)`}
                     </p>
                     <label
                       htmlFor={`quantity-select-${item.id}`}
@@ -611,7 +717,7 @@ return (
 
         {showReservations && (
           <>
-            {reservations.length === 0 ? (
+            {reservations.length === 0 && history.length === 0 ? (
               <div
                 style={{
                   ...styles.card,
@@ -623,7 +729,7 @@ return (
               </div>
             ) : (
               <div style={styles.grid}>
-                {reservations.map((r) => (
+                {[...reservations, ...history].map((r) => (
                   <div
                     key={r.id}
                     style={styles.card}
@@ -642,7 +748,8 @@ return (
                       <div style={{ display: "flex", gap: "20px", alignItems: "center" }}>
                         {r.item.image_url && (
                           <img
-                            src={r.item.image_url}
+                            src={r.item.image_variants?.thumb?.webp || r.item.image_url}
+                            loading="lazy"
                             alt={r.item.information}
                             style={{
                               width: 120,
@@ -762,6 +869,11 @@ return (
                 ))}
               </div>
             )}
+            {(!historyLoaded || historyCursor) && (
+              <button style={{ ...styles.button, marginTop: "16px" }} onClick={loadHistory}>
+                {historyLoaded ? "Ver más" : "Ver historial"}
+              </button>
+            )}
           </>
         )}
 
@@ -790,6 +902,20 @@ return (
               </div>
             ) : (
               <div style={{ display: "grid", gap: "12px", marginBottom: "48px" }}>
+                <button
+                  onClick={handleMarkAllNotificationsAsRead}
+                  style={{
+                    justifySelf: "end",
+                    padding: "4px 8px",
+                    fontSize: "0.75rem",
+                    backgroundColor: "#e0e0e0",
+                    border: "none",
+                    borderRadius: "4px",
+                    cursor: "pointer",
+                  }}
+                >
+                  Marcar todas como leídas
+                </button>
                 {notifications.filter(n => !n.read).map((note) => (
                   <div key={note.id} style={styles.notification}>
                     <p
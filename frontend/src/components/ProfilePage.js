@@ -5,7 +5,6 @@ import {
   fetchUserProfile,
   updateUserProfile,
   uploadProfilePicture,
-  updateProfilePictureUrl,
 } from "../api";
 
 export default function ProfilePage() {
@@ -46,15 +45,12 @@ export default function ProfilePage() {
       let imageUrl = form.profile_picture;
 
       if (imageFile) {
-        const {
-          data: { user },
-        } = await supabase.auth.getUser();
-        imageUrl = await uploadProfilePicture(supabase, imageFile, user.id);
-        await updateProfilePictureUrl(supabase, imageUrl);
+        imageUrl = await uploadProfilePicture(supabase, imageFile); //backend resizes it and saves it on the profile
       }
 
+      const { picture_variants, ...fields } = form; //variants are only written by the upload
       await updateUserProfile(supabase, {
-        ...form,
+        ...fields,
         profile_picture: imageUrl,
       });
 
@@ -68,6 +64,18 @@ export default function ProfilePage() {
     }
   };
 
+  // Restaurants: fill latitude/longitude from the browser, saved with the rest of the form
+  const fillCurrentLocation = () => {
+    if (!navigator.geolocation) {
+      setMessage("Tu navegador no permite obtener la ubicación.");
+      return;
+    }
+    navigator.geolocation.getCurrentPosition(
+      (position) => setForm({ ...form, latitude: position.coords.latitude, longitude: position.coords.longitude }),
+      () => setMessage("No pudimos obtener tu ubicación.")
+    );
+  };
+
   const handleCredentialChange = async (e) => {
     e.preventDefault();
     setLoading(true);
@@ -323,6 +331,12 @@ export default function ProfilePage() {
                   e.target.style.boxShadow = "none";
                 }}
               />
+              {profile.role === "restaurant" && (
+                // Coordinates let customers find this restaurant's offers with "Cerca de mí"
+                <button type="button" onClick={fillCurrentLocation} style={{ ...styles.button, marginTop: "8px", minHeight: "auto", padding: "10px 16px" }}>
+                  {form.latitude != null ? "📍 Ubicación guardada (actualizar)" : "📍 Usar mi ubicación actual"}
+                </button>
+              )}
             </div>
 
             <div>
@@ -2,13 +2,18 @@ import { useState, useEffect } from "react";
 import { supabase } from "./supabaseClient";
 import { Link } from "react-router-dom"; //Link for navigation
 import {
+  fetchDashboard,
   fetchRestaurantItems,
   createRestaurantItem,
   fetchNotifications,
+  subscribeNotifications,
   getProfilePicture,
   cancelRestaurantItem,
   completeRestaurantItem,
-  markNotificationAsRead 
+  markNotificationAsRead,
+  markNotificationsAsRead,
+  imageSrcSet,
+  fetchItemReservations,
 } from "../api.js";
 
 export default function RestaurantDashboard({ user }) {
@@ -26,6 +31,7 @@ export default function RestaurantDashboard({ user }) {
   const [showOffers, setShowOffers] = useState(true);
   const [showNotifications, setShowNotifications] = useState(true);
   const [profilePicture, setProfilePicture] = useState(null);
+  const [itemReservations, setItemReservations] = useState({}); //itemId -> { reservations, next_cursor } for opened offers
 
   const loadItems = async () => {
     if (!user?.id) {
@@ -71,32 +77,41 @@ export default function RestaurantDashboard({ user }) {
     }
   };
 
+  // Items, notifications and profile picture in one request
+  const loadDashboard = async () => {
+    setLoading(true);
+    setError(null);
+    try {
+      const data = await fetchDashboard(supabase, "restaurant");
+      setItems(data.items || []);
+      setNotifications(data.notifications || []);
+      setProfilePicture(data.profile.profile_picture || null);
+    } catch (err) {
+      console.error("Failed to load dashboard:", err);
+      // fall back to the individual endpoints
+      loadItems();
+      loadNotifications();
+      loadProfilePicture();
+    } finally {
+      setLoading(false);
+    }
+  };
+
   useEffect(() => {
     if (!user?.id) return;
 
-    loadItems();
-    loadNotifications();
-    loadProfilePicture();
-
-    const channel = supabase
-      .channel("restaurant-notifications")
-      .on(
-        "postgres_changes",
-        {
-          event: "INSERT",
-          schema: "public",
-          table: "notifications",
-          filter: `restaurant_id=eq.${user.id}`,
-        },
-        (payload) => {
-          setNotifications((prev) => [payload.new, ...prev]);
-        }
-      )
-      .subscribe();
-
-    return () => {
-      supabase.removeChannel(channel);
-    };
+    loadDashboard();
+
+    const unsubscribe = subscribeNotifications(
+      supabase,
+      (notification) => {
+        // Prepend new notification to the list
+        setNotifications((prev) => [notification, ...prev.filter((n) => n.id !== notification.id)]);
+      },
+      loadNotifications // missed too many while disconnected: reload the list
+    );
+
+    return unsubscribe;
   }, [user?.id]);
 
   const handleChange = (e) => {
@@ -188,6 +203,29 @@ export default function RestaurantDashboard({ user }) {
     }
   };
 
+  // Show/hide the reservations of an offer; "more" loads the next page
+  const toggleReservations = async (itemId, more = false) => {
+    const current = itemReservations[itemId];
+    if (current && !more) {
+      setItemReservations(({ [itemId]: _, ...rest }) => rest);
+      return;
+    }
+    try {
+      const params = more ? { cursor: current.next_cursor } : {};
+      const data = await fetchItemReservations(supabase, itemId, params);
+      setItemReservations((prev) => ({
+        ...prev,
+        [itemId]: {
+          reservations: [...(more ? current.reservations : []), ...data.reservations],
+          next_cursor: data.next_cursor,
+        },
+      }));
+    } catch (err) {
+      console.error("Failed to load reservations:", err);
+      alert("Failed to load reservations: " + (err.message || "Unknown error"));
+    }
+  };
+
 // notif read handler
   const handleMarkNotificationAsRead = async (notificationId) => {
   try {
@@ -199,6 +237,17 @@ export default function RestaurantDashboard({ user }) {
   }
 };
 
+// mark every unread notification as read in one request
+  const handleMarkAllNotificationsAsRead = async () => {
+  try {
+    const { updated } = await markNotificationsAsRead(supabase, { before: new Date().toISOString() });
+    setNotifications((prev) => prev.filter((n) => !updated.includes(n.id)));
+  } catch (err) {
+    console.error("Error al marcar todas como leídas:", err);
+    alert("Error al marcar las notificaciones como leídas.");
+  }
+};
+
   const styles = {
     container: {
       backgroundColor: "#fafafa",
@@ -458,6 +507,20 @@ export default function RestaurantDashboard({ user }) {
                 </div>
               ) : (
                 <div style={{ display: "grid", gap: "12px", marginBottom: "48px" }}>
+                  <button
+                    onClick={handleMarkAllNotificationsAsRead}
+                    style={{
+                      justifySelf: "end",
+                      padding: "4px 8px",
+                      fontSize: "0.75rem",
+                      backgroundColor: "#e0e0e0",
+                      border: "none",
+                      borderRadius: "4px",
+                      cursor: "pointer",
+                    }}
+                  >
+                    Marcar todas como leídas
+                  </button>
                   {notifications.map((note) => (
                     <div key={note.id} style={styles.notification}>
                       <p
@@ -619,6 +682,9 @@ export default function RestaurantDashboard({ user }) {
                       {item.image_url ? (
                         <img
                           src={item.image_url}
+                          srcSet={imageSrcSet(item.image_variants)}
+                          sizes="(max-width: 600px) 100vw, 480px"
+                          loading="lazy"
                           alt="Item"
                           style={styles.cardImage}
                         />
@@ -685,6 +751,36 @@ export default function RestaurantDashboard({ user }) {
                             </p>
                           )}
                         </div>
+
+                        <button
+                          onClick={() => toggleReservations(item.id)}
+                          style={{ ...styles.button, marginTop: "8px" }}
+                        >
+                          {itemReservations[item.id] ? "Ocultar reservas" : "Ver reservas"}
+                        </button>
+                        {itemReservations[item.id] && (
+                          <div style={{ marginTop: "8px" }}>
+                            {itemReservations[item.id].reservations.length === 0 ? (
+                              <p style={styles.cardText}>Sin reservas.</p>
+                            ) : (
+                              itemReservations[item.id].reservations.map((r) => (
+                                <p key={r.id} style={styles.cardText}>
+                                  {new Date(r.timestamp).toLocaleString("es-PE", {
+                                    timeZone: "America/Lima",
+                                    dateStyle: "short",
+                                    timeStyle: "short",
+                                  })}{" "}
+                                  · <strong>{r.quantity}</strong> · {r.status}
+                                </p>
+                              ))
+                            )}
+                            {itemReservations[item.id].next_cursor && (
+                              <button onClick={() => toggleReservations(item.id, true)} style={styles.button}>
+                                Ver más
+                              </button>
+                            )}
+                          </div>
+                        )}
                       </div>
                     </div>
                   ))}